@@ -1,20 +1,15 @@
-from langchain_community.llms import Ollama
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
-from pydantic import BaseModel, Field # Ensure pydantic is installed (`pip install pydantic`) if not already a dependency of langchain
+from pydantic import BaseModel, Field, create_model # Ensure pydantic is installed (`pip install pydantic`) if not already a dependency of langchain
 import json
-from utils.config import OLLAMA_BASE_URL, OLLAMA_MODEL
-import re # Import regular expressions for email fallback
+from functools import lru_cache
+from utils.llm_client import get_llm # Shared, pooled Ollama client
+from utils import cv_rules, prompt_budget # Rule-based contact details; CV text sized to the prompt budget
+from utils import metrics, model_router
+from utils.config import CV_PROMPT_TOKEN_BUDGET
 
-def get_llm():
-    """Initializes and returns the Ollama LLM instance."""
-    try:
-        llm = Ollama(base_url=OLLAMA_BASE_URL, model=OLLAMA_MODEL)
-        llm.invoke("Test connection") # Simple test
-        return llm
-    except Exception as e:
-        print(f"Error connecting to Ollama: {e}")
-        return None
+# Bump whenever the extraction prompt, schema or cv_rules change, so cached extractions are re-run
+PROMPT_VERSION = "7"
 
 # Define the desired structured output using Pydantic
 class CandidateInfo(BaseModel):
@@ -27,25 +22,50 @@ class CandidateInfo(BaseModel):
 
 def extract_email_fallback(text: str) -> str | None:
     """Fallback function to find email using regex if LLM fails."""
-    # Simple regex for finding email addresses
-    email_regex = r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"
-    matches = re.findall(email_regex, text)
-    if matches:
-        # Return the first found email, prioritizing common domain patterns if multiple exist
-        return matches[0]
-    return None
+    return cv_rules.extract_email(text)
+
+@lru_cache(maxsize=None)
+def _schema_for(fields):
+    """Returns a pydantic model with only the given CandidateInfo fields, so the prompt asks for nothing else."""
+    return create_model("CandidateInfo", **{
+        field: (CandidateInfo.model_fields[field].annotation, CandidateInfo.model_fields[field]) for field in fields
+    })
+
+def _result(data, error=None, prompt_report=None, model=None):
+    return {
+        "name": data.get('name'),
+        "email": data.get('email'),
+        "phone": data.get('phone'),
+        "skills": data.get('skills_summary'),
+        "experience": data.get('experience_summary'),
+        "education": data.get('education_summary'),
+        "error": error,
+        # Sections (and estimated tokens) cut to fit CV_PROMPT_TOKEN_BUDGET, if any
+        "prompt_dropped": prompt_report["dropped"] if prompt_report and prompt_report["dropped"] else None,
+        "model": model, # LLM that produced the non-rule fields, None if none did
+    }
 
 def extract_cv_details(cv_text):
     """
-    Uses an LLM to extract structured information from CV text.
+    Extracts structured information from CV text. Contact details the rules in cv_rules can
+    find are taken verbatim; the LLM is only asked for the remaining fields, from CV text
+    cleaned and packed into CV_PROMPT_TOKEN_BUDGET tokens. Output that isn't valid JSON is
+    re-extracted with the escalation model, if one is configured.
     Returns a dictionary with extracted data.
     """
-    llm = get_llm()
-    if not llm or not cv_text:
+    if not cv_text:
         return {"error": "Could not connect to LLM or CV text is empty."}
+    known = {field: value for field, value in cv_rules.extract_contact_fields(cv_text).items() if value}
+    missing = tuple(field for field in CandidateInfo.model_fields if field not in known)
+    if not missing:
+        return _result(known)
+
+    models = model_router.models_for("extract")
+    if not get_llm(models[0]):
+        return _result(known, "Could not connect to LLM or CV text is empty.")
 
     # Using JsonOutputParser for structured output
-    parser = JsonOutputParser(pydantic_object=CandidateInfo)
+    parser = JsonOutputParser(pydantic_object=_schema_for(missing))
 
     prompt = PromptTemplate(
         template="""
@@ -67,42 +87,34 @@ def extract_cv_details(cv_text):
         partial_variables={"format_instructions": parser.get_format_instructions()},
     )
 
-    chain = prompt | llm | parser
+    cv_content, prompt_report = prompt_budget.fit_cv_text(cv_text, CV_PROMPT_TOKEN_BUDGET)
 
     try:
-        extracted_data = chain.invoke({"cv_content": cv_text})
-        # Basic validation and cleanup
-        if not isinstance(extracted_data, dict):
-            raise ValueError("LLM did not return a valid dictionary.")
-
-        # Ensure email is extracted, attempt fallback if needed
-        if not extracted_data.get('email'):
-            print("LLM failed to extract email, attempting regex fallback...")
-            extracted_data['email'] = extract_email_fallback(cv_text)
-            if extracted_data['email']:
-                print(f"Fallback successful: Found email {extracted_data['email']}")
-            else:
-                 print("Fallback failed: Could not find email with regex.")
-
-        # Handle potential None values returned by the LLM/Pydantic if not found
-        result = {
-            "name": extracted_data.get('name'),
-            "email": extracted_data.get('email'),
-            "phone": extracted_data.get('phone'),
-            "skills": extracted_data.get('skills_summary'),
-            "experience": extracted_data.get('experience_summary'),
-            "education": extracted_data.get('education_summary'),
-            "error": None
-        }
-        return result
+        for model in models:
+            try:
+                extracted_data = (prompt | get_llm(model) | parser).invoke({"cv_content": cv_content})
+                # Basic validation and cleanup
+                if not isinstance(extracted_data, dict):
+                    raise ValueError("LLM did not return a valid dictionary.")
+                break
+            except ValueError as e: # Includes the parser's OutputParserException for invalid JSON
+                if model == models[-1] or not get_llm(models[-1]):
+                    raise
+                print(f"CV extraction with {model} failed ({e}); escalating to {models[-1]}.")
+                metrics.record("escalate.extract", retries=1)
+
+        data = {field: extracted_data.get(field) for field in missing}
+        # Normalize what the LLM found the same way as the rules, so the email key stays stable
+        if data.get('email'):
+            data['email'] = cv_rules.normalize_email(str(data['email']))
+        if data.get('phone'):
+            data['phone'] = cv_rules.normalize_phone(str(data['phone'])) or data['phone']
+        if 'email' in missing and not data.get('email'):
+            print("Could not find an email address in the CV.")
+        data.update(known)
+        return _result(data, prompt_report=prompt_report, model=model)
 
     except Exception as e:
         print(f"Error during CV parsing: {e}")
-        print("Attempting fallback email extraction on raw text...")
-        # If JSON parsing fails entirely, still try to get the email
-        fallback_email = extract_email_fallback(cv_text)
-        return {
-            "name": None, "email": fallback_email, "phone": None, "skills": None,
-            "experience": None, "education": None,
-            "error": f"LLM parsing failed. Details: {e}. Attempted email fallback."
-        }
\ No newline at end of file
+        # Rule-based fields (including the email) survive a failed LLM call
+        return _result(known, f"LLM parsing failed. Details: {e}. Kept rule-based fields.", prompt_report)
@@ -1,27 +1,14 @@
-from langchain_community.llms import Ollama
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from utils.config import OLLAMA_BASE_URL, OLLAMA_MODEL
-
-def get_llm():
-    """Initializes and returns the Ollama LLM instance."""
-    try:
-        llm = Ollama(base_url=OLLAMA_BASE_URL, model=OLLAMA_MODEL)
-        # Perform a simple test invocation
-        llm.invoke("Test connection")
-        print(f"Successfully connected to Ollama model: {OLLAMA_MODEL} at {OLLAMA_BASE_URL}")
-        return llm
-    except Exception as e:
-        print(f"Error connecting to Ollama: {e}")
-        print(f"Please ensure Ollama is running and the model '{OLLAMA_MODEL}' is available at {OLLAMA_BASE_URL}")
-        return None
+from utils.llm_client import get_llm # Shared, pooled Ollama client
+from utils import model_router
 
 def summarize_job_description(jd_text):
     """
     Uses an LLM to summarize the key aspects of a job description.
     Returns a structured summary string.
     """
-    llm = get_llm()
+    llm = get_llm(model_router.model_for("jd"))
     if not llm or not jd_text:
         return "Error: Could not connect to LLM or JD text is empty."
 
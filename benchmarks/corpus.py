@@ -0,0 +1,89 @@
+"""
+Generates a synthetic corpus of one-page resume PDFs with distinct contents, so runs are
+not short-circuited by the content-hash cache. The PDFs are written by hand (Helvetica text
+objects), so no PDF library is needed and pdfplumber reads them like real exports.
+
+Usage: python -m benchmarks.corpus OUTPUT_FOLDER [--count 100] [--seed 0]
+"""
+import argparse
+import os
+import random
+
+FIRST_NAMES = ("Aisha", "Ben", "Carla", "Dmitri", "Elena", "Farid", "Grace", "Hiro", "Ines", "Jonas", "Kemi", "Luca")
+LAST_NAMES = ("Okafor", "Schmidt", "Nguyen", "Silva", "Kowalski", "Haddad", "Tanaka", "Moreau", "Patel", "Larsen")
+SKILLS = ("Python", "SQL", "Django", "FastAPI", "React", "TypeScript", "Docker", "Kubernetes", "AWS", "GCP",
+          "Terraform", "Spark", "Airflow", "Pandas", "PyTorch", "Go", "Java", "Kafka", "PostgreSQL", "Redis",
+          "CI/CD", "Linux", "GraphQL", "Scrum", "Stakeholder management", "Technical writing")
+ROLES = ("Software Engineer", "Backend Developer", "Data Engineer", "Machine Learning Engineer",
+         "DevOps Engineer", "Frontend Developer", "Engineering Manager", "QA Engineer")
+COMPANIES = ("Acme Corp", "Globex", "Initech", "Umbrella Analytics", "Hooli", "Stark Industries", "Wayne Tech")
+SCHOOLS = ("University of Lagos", "Technical University of Munich", "University of Toronto",
+           "Imperial College London", "National University of Singapore", "Politecnico di Milano")
+
+def resume_lines(index, rng):
+    """Returns the text lines of one synthetic resume."""
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    lines = [
+        f"{first} {last}",
+        f"Email: {first.lower()}.{last.lower()}{index}@example.com",
+        f"Phone: +1 555 {rng.randint(100, 999)} {index % 10000:04d}",
+        "",
+        "Summary",
+        f"{rng.choice(ROLES)} with {rng.randint(1, 15)} years of experience building reliable systems.",
+        "",
+        "Skills: " + ", ".join(rng.sample(SKILLS, rng.randint(4, 9))),
+        "",
+        "Experience",
+    ]
+    year = 2024
+    for _ in range(rng.randint(1, 4)):
+        start = year - rng.randint(1, 4)
+        lines.append(f"{rng.choice(ROLES)} at {rng.choice(COMPANIES)} ({start} - {year})")
+        lines.append(f"  Delivered {rng.choice(SKILLS)} and {rng.choice(SKILLS)} projects for {rng.randint(2, 40)} clients.")
+        year = start
+    lines += ["", "Education", f"BSc Computer Science, {rng.choice(SCHOOLS)} ({year - 4} - {year})"]
+    return lines
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def pdf_bytes(lines):
+    """Builds a minimal single-page PDF showing the given lines of text."""
+    content = "BT /F1 10 Tf 14 TL 50 760 Td " + " ".join(f"({_escape(line)}) '" for line in lines) + " ET"
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        f"<< /Length {len(content.encode('latin-1'))} >>\nstream\n{content}\nendstream",
+    ]
+    output = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref_offset = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    output += b"".join(f"{offset:010d} 00000 n \n".encode("latin-1") for offset in offsets)
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode("latin-1")
+    return output
+
+def write_corpus(folder, count, seed=0):
+    """Writes `count` resumes named R00000.pdf, R00001.pdf, ... into folder and returns their filenames."""
+    os.makedirs(folder, exist_ok=True)
+    rng = random.Random(seed)
+    filenames = []
+    for index in range(count):
+        filename = f"R{index:05d}.pdf"
+        with open(os.path.join(folder, filename), "wb") as f:
+            f.write(pdf_bytes(resume_lines(index, rng)))
+        filenames.append(filename)
+    return filenames
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("folder", help="Folder to write the PDFs into")
+    parser.add_argument("--count", type=int, default=100, help="Number of resumes to generate")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (same seed, same corpus)")
+    args = parser.parse_args()
+    print(f"Wrote {len(write_corpus(args.folder, args.count, args.seed))} resumes to {args.folder}.")
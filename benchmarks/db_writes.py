@@ -0,0 +1,91 @@
+"""
+Compares candidate/match write throughput of the old per-row path (new connection,
+rollback journal, commit and extra SELECT per row) with the pooled WAL connection
+and the executemany bulk APIs in utils/database.py.
+
+Usage: python -m benchmarks.db_writes [--rows 2000]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from utils import database
+
+def _legacy_connection(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def _legacy_add_candidate(db_path, row):
+    # Mirrors the original implementation: one connection and commit per call plus a second lookup
+    conn = _legacy_connection(db_path)
+    cursor = conn.cursor()
+    cursor.execute(database.CANDIDATE_UPSERT_SQL, tuple(row) + (None,)) # No extraction_model
+    conn.commit()
+    cursor.execute("SELECT id FROM candidates WHERE email = ?", (row[1],))
+    candidate_id = cursor.fetchone()['id']
+    conn.close()
+    return candidate_id
+
+def _legacy_add_match(db_path, row):
+    conn = _legacy_connection(db_path)
+    conn.execute(database.MATCH_UPSERT_SQL, row)
+    conn.commit()
+    conn.close()
+
+def _candidate_rows(count):
+    return [
+        (f"Candidate {i}", f"candidate{i}@example.com", "555-0100", f"C{i}.pdf", "cv text " * 200,
+         "python, sql", "5 years backend", "BSc Computer Science")
+        for i in range(count)
+    ]
+
+def _fresh_database(directory, name, wal):
+    database.close_db_connection()
+    database.DB_PATH = os.path.join(directory, name)
+    database.setup_database()
+    if not wal:
+        database.get_db_connection().execute("PRAGMA journal_mode=DELETE")
+        database.close_db_connection()
+    return database.DB_PATH
+
+def run(rows):
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        candidate_rows = _candidate_rows(rows)
+
+        db_path = _fresh_database(directory, "legacy.db", wal=False)
+        start = time.perf_counter()
+        ids = [_legacy_add_candidate(db_path, row) for row in candidate_rows]
+        for candidate_id in ids:
+            _legacy_add_match(db_path, (1, candidate_id, 80, True, None, None, None))
+        results["legacy_per_row"] = time.perf_counter() - start
+
+        _fresh_database(directory, "pooled.db", wal=True)
+        start = time.perf_counter()
+        ids = [database.add_candidate(*row) for row in candidate_rows]
+        for candidate_id in ids:
+            database.add_or_update_match(1, candidate_id, 80, True)
+        results["pooled_wal_per_row"] = time.perf_counter() - start
+
+        _fresh_database(directory, "bulk.db", wal=True)
+        start = time.perf_counter()
+        keys = ("name", "email", "phone", "cv_filename", "cv_text", "skills", "experience", "education")
+        ids = database.add_candidates_bulk([dict(zip(keys, row)) for row in candidate_rows])
+        database.add_matches_bulk((1, candidate_id, 80, True, None, None) for candidate_id in ids.values())
+        results["bulk_wal"] = time.perf_counter() - start
+        database.close_db_connection()
+
+    return {
+        "rows": rows,
+        "seconds": {name: round(seconds, 4) for name, seconds in results.items()},
+        "rows_per_second": {name: round(rows / seconds, 1) for name, seconds in results.items()},
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000, help="Candidates (and matches) to write per scenario")
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows), indent=2))
@@ -0,0 +1,56 @@
+"""
+Compares sending interview invitations one connection per message (the old path) with the
+pooled, rate-limited batch sender, against the local SMTP stand-in in benchmarks/fake_smtp.py,
+which simulates connection set-up (TLS + login) and per-message latency and can inject
+transient 451 replies.
+
+Usage: python -m benchmarks.email_dispatch [--messages 100] [--pool-size 3] [--rate 0] [--fail-every 0]
+"""
+import argparse
+import json
+import time
+from benchmarks.fake_smtp import StandInSMTPServer
+from utils import email_sender
+
+def _candidates(count):
+    return [{"match_id": i, "email": f"candidate{i}@example.com", "name": f"Candidate {i}"} for i in range(count)]
+
+def run(messages, pool_size, rate, fail_every):
+    server = StandInSMTPServer(fail_every=fail_every).start()
+    # Point the sender at the stand-in: plain SMTP, no TLS or login
+    email_sender.SMTP_SERVER, email_sender.SMTP_PORT = server.server_address
+    email_sender.SMTP_USE_TLS = email_sender.SMTP_AUTH = False
+    candidates = _candidates(messages)
+    results = {}
+    try:
+        start = time.perf_counter()
+        sent = sum(email_sender.send_interview_email(c["email"], c["name"], "Engineer") for c in candidates)
+        results["connection_per_message"] = {
+            "seconds": round(time.perf_counter() - start, 3), "sent": sent, "connections": server.connections
+        }
+
+        server.reset_counters()
+        start = time.perf_counter()
+        outcomes = []
+        batch = [(c["match_id"], email_sender.build_interview_email(c["email"], c["name"], "Engineer"))
+                    for c in candidates]
+        email_sender.send_messages(batch, pool_size=pool_size, rate=rate, retry_backoff=0.05,
+                                   on_result=lambda key, error, transient: outcomes.append(error))
+        results["pooled_batch"] = {
+            "seconds": round(time.perf_counter() - start, 3), "sent": outcomes.count(None),
+            "failed": len(outcomes) - outcomes.count(None),
+            "connections": server.connections, "delivered": server.delivered
+        }
+    finally:
+        server.stop()
+    return {"messages": messages, "pool_size": pool_size, "rate_per_second": rate, "fail_every": fail_every,
+            "results": results}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=100, help="Invitations to send per scenario")
+    parser.add_argument("--pool-size", type=int, default=3, help="SMTP connections used by the batch sender")
+    parser.add_argument("--rate", type=float, default=0, help="Batch sender messages per second (0 = unlimited)")
+    parser.add_argument("--fail-every", type=int, default=0, help="Answer every Nth RCPT with a transient 451")
+    args = parser.parse_args()
+    print(json.dumps(run(args.messages, args.pool_size, args.rate, args.fail_every), indent=2))
@@ -0,0 +1,213 @@
+"""
+A local stand-in for the Ollama HTTP API, so the pipeline can be benchmarked without a model.
+Serves /api/generate, /api/chat, /api/embed, /api/tags and /api/version with canned answers
+shaped like the real ones: CV extraction JSON built from the CV text in the prompt (only the
+fields its schema names), batch and single match scores, and fixed-size embeddings. Each
+request waits `latency` seconds, plus `per_prompt_token` seconds per evaluated prompt token
+and `per_token` seconds per output token, in one of `parallel` slots (like OLLAMA_NUM_PARALLEL).
+Like Ollama, each slot remembers its last prompt, so the longest prefix a new prompt shares
+with one of them is not evaluated again; num_predict and stop options cut the answer.
+
+Usage: python -m benchmarks.fake_ollama [--port 11434] [--latency 0.05] [--parallel 4]
+  then run the app or CLI with OLLAMA_BASE_URL=http://127.0.0.1:<port>
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EMBEDDING_DIM = 64
+EMAIL_PATTERN = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+
+def _count_tokens(text):
+    # Close enough to a real tokenizer for relative comparisons: ~4 characters per token
+    return max(1, len(text) // 4)
+
+def _stable_number(text, modulo):
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16) % modulo
+
+def _cv_text(prompt):
+    """Returns the CV section of an extraction prompt (after "CV Text:", between --- delimiters if present)."""
+    text = prompt.split("CV Text:", 1)[-1]
+    parts = text.split("---")
+    return parts[1] if len(parts) >= 3 else text
+
+def canned_answer(prompt):
+    """Answers a prompt the way the app's prompts expect: extraction JSON, score JSON or a bare score."""
+    if '"scores"' in prompt:
+        ids = re.findall(r"ID: (\S+)", prompt)
+        return json.dumps({"scores": [{"id": label, "score": _stable_number(prompt + label, 101)} for label in ids]})
+    if "CV" in prompt and ("JSON" in prompt or "json" in prompt):
+        cv_text = _cv_text(prompt)
+        lines = [line.strip() for line in cv_text.splitlines() if line.strip()]
+        email = EMAIL_PATTERN.search(cv_text)
+        phone = re.search(r"\+?\d[\d ()-]{7,}\d", cv_text)
+        skills = next((line.split(":", 1)[1].strip() for line in lines if line.lower().startswith("skills:")), None)
+        answer = {
+            "name": lines[0] if lines else None,
+            "email": email.group(0) if email else None,
+            "phone": phone.group(0) if phone else None,
+            "skills_summary": skills,
+            "experience_summary": " ".join(line for line in lines if " at " in line)[:300] or None,
+            "education_summary": next((line for line in lines if "University" in line or "College" in line), None),
+        }
+        # Like a model following the schema, answer only the fields the prompt asks for
+        return json.dumps({field: value for field, value in answer.items() if f'"{field}"' in prompt})
+    if "match score" in prompt:
+        return str(_stable_number(prompt, 101))
+    return "Summary: " + " ".join(prompt.split()[:40])
+
+class _OllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive, like the real server, so client connection pooling is exercised
+    disable_nagle_algorithm = True # Headers and body are separate writes; don't let Nagle add ~40 ms per reply
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.startswith("/api/tags"):
+            model = {"name": self.server.model, "model": self.server.model, "size": 0, "digest": "0" * 64}
+            self.send_json({"models": [model]})
+        elif self.path.startswith("/api/version"):
+            self.send_json({"version": "0.0.0-benchmark"})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        server = self.server
+        if self.path.startswith("/api/embed"):
+            texts = request.get("input", [])
+            texts = [texts] if isinstance(texts, str) else texts
+            prompt_tokens = sum(_count_tokens(text) for text in texts)
+            server.record("/api/embed", prompt_tokens, 0)
+            self.send_json({"model": request.get("model"), "prompt_eval_count": prompt_tokens, "embeddings": [
+                [((_stable_number(f"{text}:{i}", 2000) / 1000.0) - 1.0) for i in range(EMBEDDING_DIM)]
+                for text in texts
+            ]})
+            return
+        if self.path.startswith("/api/chat"):
+            prompt = "\n".join(str(message.get("content", "")) for message in request.get("messages", []))
+        elif self.path.startswith("/api/generate"):
+            prompt = request.get("prompt") or ""
+        else:
+            self.send_error(404)
+            return
+
+        # An empty prompt only loads the model, as the app's warm-up does
+        answer = canned_answer(prompt) if prompt else ""
+        options = request.get("options") or {}
+        for stop in options.get("stop") or []:
+            answer = answer.split(stop, 1)[0]
+        if options.get("num_predict") and options["num_predict"] > 0:
+            answer = answer[:options["num_predict"] * 4]
+        prompt_tokens = _count_tokens(prompt) if prompt else 0
+        cached_tokens = min(server.reuse_prefix(prompt) // 4, prompt_tokens - 1) if prompt else 0
+        evaluated_tokens, output_tokens = prompt_tokens - cached_tokens, _count_tokens(answer) if answer else 0
+        prompt_eval_seconds = server.per_prompt_token * evaluated_tokens
+        start = time.perf_counter()
+        with server.slots:
+            time.sleep(server.latency + prompt_eval_seconds + server.per_token * output_tokens if prompt else 0)
+        elapsed_ns = int((time.perf_counter() - start) * 1e9)
+        server.record(self.path.split("?")[0], evaluated_tokens, output_tokens, cached_tokens)
+        response = {
+            "model": request.get("model"), "created_at": "2024-01-01T00:00:00Z", "done": True, "done_reason": "stop",
+            "total_duration": elapsed_ns, "load_duration": 0,
+            # Like Ollama, only the tokens that missed the prefix cache count as evaluated
+            "prompt_eval_count": evaluated_tokens, "prompt_eval_duration": int(prompt_eval_seconds * 1e9),
+            "eval_count": output_tokens, "eval_duration": max(0, elapsed_ns - int(prompt_eval_seconds * 1e9)),
+        }
+        if self.path.startswith("/api/chat"):
+            response["message"] = {"role": "assistant", "content": answer}
+        else:
+            response["response"] = answer
+        self.send_json(response)
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port=0, latency=0.05, per_token=0.0, parallel=4, model="llama3.2:latest",
+                 per_prompt_token=0.0, prefix_cache=True):
+        super().__init__(("127.0.0.1", port), _OllamaHandler)
+        self.latency, self.per_token, self.per_prompt_token, self.model = latency, per_token, per_prompt_token, model
+        self.slots = threading.Semaphore(parallel)
+        self.lock = threading.Lock()
+        self.prefix_cache = prefix_cache
+        self.slot_prompts = [""] * parallel # Last prompt each slot evaluated, least recently used first
+        self.reset_counters()
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def reuse_prefix(self, prompt):
+        """
+        Returns how many leading characters of prompt a slot already holds, and hands the prompt
+        to that slot (or to the least recently used one if none shares a prefix).
+        """
+        if not self.prefix_cache:
+            return 0
+        with self.lock:
+            shared = [len(os.path.commonprefix([prompt, cached])) for cached in self.slot_prompts]
+            best = max(range(len(shared)), key=shared.__getitem__)
+            slot = best if shared[best] else 0
+            del self.slot_prompts[slot]
+            self.slot_prompts.append(prompt)
+            return shared[slot]
+
+    def record(self, path, prompt_tokens, output_tokens, cached_tokens=0):
+        with self.lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+            self.prompt_tokens += prompt_tokens
+            self.output_tokens += output_tokens
+            self.cached_tokens += cached_tokens
+
+    def reset_counters(self):
+        with self.lock:
+            self.requests, self.prompt_tokens, self.output_tokens, self.cached_tokens = {}, 0, 0, 0
+
+    def counters(self):
+        """Requests per endpoint and token totals; prompt_tokens counts only evaluated (uncached) tokens."""
+        with self.lock:
+            return {"requests": dict(self.requests), "prompt_tokens": self.prompt_tokens,
+                    "cached_prompt_tokens": self.cached_tokens, "output_tokens": self.output_tokens}
+
+    def start(self):
+        """Serves requests from a daemon thread and returns self."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=11434, help="Port to listen on")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds each generate/chat request takes")
+    parser.add_argument("--per-token", type=float, default=0.0, help="Extra seconds per output token")
+    parser.add_argument("--per-prompt-token", type=float, default=0.0, help="Extra seconds per evaluated prompt token")
+    parser.add_argument("--no-prefix-cache", action="store_true", help="Evaluate every prompt in full")
+    parser.add_argument("--parallel", type=int, default=4, help="Requests served at once (OLLAMA_NUM_PARALLEL)")
+    args = parser.parse_args()
+    server = FakeOllamaServer(args.port, args.latency, args.per_token, args.parallel,
+                              per_prompt_token=args.per_prompt_token, prefix_cache=not args.no_prefix_cache)
+    print(f"Fake Ollama listening on {server.url} (Ctrl+C to stop)...")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -0,0 +1,99 @@
+"""
+A local stand-in for an SMTP server, so the batch email sender can be benchmarked and tested
+without a mail provider. Speaks just enough SMTP for smtplib, simulates connection set-up
+(TLS + login) and per-message latency, and can inject failures: a transient 451 for every
+Nth recipient, a permanent 550 for recipients containing `reject_substring`, and a 535 for
+every login when reject_login is set (logins are only offered with auth=True).
+
+Usage: python -m benchmarks.fake_smtp [--port 2525]
+  then run the email worker with SMTP_SERVER=127.0.0.1 SMTP_PORT=<port> SMTP_USE_TLS=false SMTP_AUTH=false
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Handles EHLO/HELO, AUTH, MAIL, RCPT, DATA, RSET, NOOP and QUIT."""
+
+    def reply(self, text):
+        self.wfile.write(text.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        time.sleep(server.connect_latency) # Stands in for the TCP/TLS handshake and login round trips
+        self.reply("220 localhost SMTP stand-in")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            verb = line[:4].decode(errors="replace").upper()
+            if verb == "EHLO":
+                self.reply("250-localhost\r\n250-AUTH PLAIN LOGIN\r\n250 SIZE 10485760" if server.auth
+                           else "250-localhost\r\n250 SIZE 10485760")
+            elif verb == "AUTH":
+                with server.lock:
+                    server.logins += 1
+                self.reply("535 Authentication credentials invalid" if server.reject_login else "235 Accepted")
+            elif verb == "RCPT":
+                with server.lock:
+                    server.recipients += 1
+                    refuse = server.fail_every and server.recipients % server.fail_every == 0
+                if server.reject_substring and server.reject_substring in line.decode(errors="replace"):
+                    self.reply("550 No such user")
+                else:
+                    self.reply("451 Try again later" if refuse else "250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                time.sleep(server.message_latency)
+                with server.lock:
+                    server.delivered += 1
+                self.reply("250 Queued")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            elif verb in ("HELO", "MAIL", "RSET", "NOOP"):
+                self.reply("250 OK")
+            else:
+                self.reply("502 Command not implemented")
+
+class StandInSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port=0, connect_latency=0.05, message_latency=0.02, fail_every=0, reject_substring=None,
+                 auth=False, reject_login=False):
+        super().__init__(("127.0.0.1", port), _SMTPHandler)
+        self.lock = threading.Lock()
+        self.connect_latency, self.message_latency, self.fail_every = connect_latency, message_latency, fail_every
+        self.reject_substring, self.auth, self.reject_login = reject_substring, auth, reject_login
+        self.reset_counters()
+
+    def reset_counters(self):
+        with self.lock:
+            self.connections = self.logins = self.recipients = self.delivered = 0
+
+    def start(self):
+        """Serves connections from a daemon thread and returns self."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=2525, help="Port to listen on")
+    parser.add_argument("--fail-every", type=int, default=0, help="Answer every Nth RCPT with a transient 451")
+    args = parser.parse_args()
+    server = StandInSMTPServer(args.port, fail_every=args.fail_every)
+    print(f"SMTP stand-in listening on 127.0.0.1:{server.server_address[1]} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
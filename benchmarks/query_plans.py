@@ -0,0 +1,82 @@
+"""
+Checks that the dashboard's hot queries are served by their indexes (EXPLAIN QUERY PLAN)
+and times them on a synthetic database, with and without the migration-2 indexes.
+Exits non-zero if a plan regressed, so it can guard schema or query changes.
+
+Usage: python -m benchmarks.query_plans [--jds 20] [--candidates 20000]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from utils import database
+
+INDEXES = ("idx_matches_jd_score", "idx_matches_pending_email", "idx_job_descriptions_timestamp")
+
+def _populate(jds, candidates):
+    keys = ("name", "email", "phone", "cv_filename", "cv_text", "skills", "experience", "education")
+    ids = database.add_candidates_bulk(
+        dict(zip(keys, (f"Candidate {i}", f"candidate{i}@example.com", "555-0100", f"C{i}.pdf",
+                        "cv text", "python, sql", "5 years backend", "BSc")))
+        for i in range(candidates)
+    )
+    rng = random.Random(0)
+    for jd in range(jds):
+        jd_id = database.add_job_description(f"Role {jd}", "original", "summary")
+        database.add_matches_bulk(
+            (jd_id, candidate_id, score, score is not None and score >= 75, None, None)
+            for candidate_id in ids.values()
+            for score in [rng.choice([None, rng.randint(0, 100)])]
+        )
+    with database.transaction() as cursor:
+        # Most shortlisted candidates have already been emailed in a long-running deployment
+        cursor.execute("UPDATE matches SET interview_email_sent = TRUE WHERE is_shortlisted AND id % 10 != 0")
+    database.get_db_connection().execute("ANALYZE")
+
+def _time_queries(repeat):
+    timings = {}
+    for name, (sql, params, _) in database.HOT_QUERIES.items():
+        cursor = database.get_db_connection().cursor()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            cursor.execute(sql, params).fetchall()
+        timings[name] = round((time.perf_counter() - start) / repeat * 1000, 3)
+    return timings
+
+def run(jds, candidates, repeat=5):
+    with tempfile.TemporaryDirectory() as directory:
+        database.close_db_connection()
+        database.DB_PATH = os.path.join(directory, "plans.db")
+        database.setup_database()
+        _populate(jds, candidates)
+
+        problems = database.check_query_plans()
+        plans = {name: database.explain_query_plan(sql, params)
+                 for name, (sql, params, _) in database.HOT_QUERIES.items()}
+        indexed_ms = _time_queries(repeat)
+
+        with database.transaction() as cursor:
+            for index in INDEXES:
+                cursor.execute(f"DROP INDEX {index}")
+        unindexed_ms = _time_queries(repeat)
+        database.close_db_connection()
+
+    return {
+        "jds": jds,
+        "candidates": candidates,
+        "plans": plans,
+        "regressions": problems,
+        "ms_per_query": {"indexed": indexed_ms, "unindexed": unindexed_ms},
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--jds", type=int, default=20, help="Job descriptions to create")
+    parser.add_argument("--candidates", type=int, default=20000, help="Candidates matched against every JD")
+    args = parser.parse_args()
+    result = run(args.jds, args.candidates)
+    print(json.dumps(result, indent=2))
+    sys.exit(1 if result["regressions"] else 0)
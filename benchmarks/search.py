@@ -0,0 +1,100 @@
+"""
+Times full-text candidate search (database.search_candidates) on a synthetic database of
+resumes from benchmarks/corpus.py, for rare, common, boolean, prefix and phrase queries.
+Queries whose median time exceeds --target-ms are listed under over_target; every match is
+ranked, so the broadest ones (most of the corpus) cost the most. Exits non-zero if the search
+is not served by the full-text index.
+
+Usage: python -m benchmarks.search [--candidates 100000] [--target-ms 100]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from benchmarks import corpus
+from utils import database
+
+QUERIES = (
+    "kubernetes AND terraform",
+    "python",
+    "kafka OR spark",
+    "pyth*",
+    '"data engineer"',
+    "postgresql NOT java",
+    "ci/cd",
+    "acme AND kubernetes AND aws AND airflow",
+)
+
+def _populate(candidates, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for index in range(candidates):
+        lines = corpus.resume_lines(index, rng)
+        skills = next(line.split(":", 1)[1].strip() for line in lines if line.startswith("Skills:"))
+        experience = " ".join(line.strip() for line in lines if " at " in line or line.startswith("  "))
+        rows.append({
+            "name": lines[0], "email": f"candidate{index}@example.com", "phone": lines[2], "cv_filename": f"R{index:06d}.pdf",
+            "cv_text": "\n".join(lines), "skills": skills, "experience": experience, "education": lines[-1],
+        })
+    start = time.perf_counter()
+    database.add_candidates_bulk(rows)
+    return time.perf_counter() - start
+
+def _count_matches(query):
+    connection = database.get_db_connection()
+    try:
+        return connection.execute("SELECT COUNT(*) FROM candidates_fts WHERE candidates_fts MATCH ?", (query,)).fetchone()[0]
+    except database.sqlite3.OperationalError: # Searched as literal words, like search_candidates() does
+        return connection.execute("SELECT COUNT(*) FROM candidates_fts WHERE candidates_fts MATCH ?",
+                                  (database._literal_search_query(query),)).fetchone()[0]
+
+def _time_queries(repeat):
+    timings = {}
+    for query in QUERIES:
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            results = database.search_candidates(query, limit=20)
+            samples.append((time.perf_counter() - start) * 1000)
+        timings[query] = {"median_ms": round(statistics.median(samples), 2), "max_ms": round(max(samples), 2),
+                          "matches": _count_matches(query), "returned": len(results)}
+    return timings
+
+def run(candidates, repeat=7):
+    with tempfile.TemporaryDirectory() as directory:
+        database.close_db_connection()
+        database.DB_PATH = os.path.join(directory, "search.db")
+        database.setup_database()
+        insert_seconds = _populate(candidates)
+        plan = database.explain_query_plan(database.CANDIDATE_SEARCH_SQL, ("kubernetes AND terraform", 20))
+        as_ingested = _time_queries(repeat)
+        start = time.perf_counter()
+        database.optimize_search_index()
+        optimize_seconds = time.perf_counter() - start
+        optimized = _time_queries(repeat)
+        database.close_db_connection()
+
+    return {
+        "candidates": candidates,
+        "insert_seconds": round(insert_seconds, 2),
+        "optimize_seconds": round(optimize_seconds, 2),
+        "plan": plan,
+        # The MATCH must be answered by the full-text index (a ":M" index plan), not a scan of candidates
+        "uses_index": any("candidates_fts VIRTUAL TABLE INDEX" in line and ":M" in line for line in plan),
+        "queries": {"as_ingested": as_ingested, "optimized": optimized},
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--candidates", type=int, default=100000, help="Candidates to index")
+    parser.add_argument("--target-ms", type=float, default=100.0, help="Slowest acceptable median query time")
+    args = parser.parse_args()
+    result = run(args.candidates)
+    result["over_target"] = [query for query, stats in result["queries"]["optimized"].items()
+                             if stats["median_ms"] > args.target_ms]
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result["uses_index"] else 1)
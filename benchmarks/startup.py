@@ -0,0 +1,97 @@
+"""
+Measures the cold import cost of the dashboard's startup path with `python -X importtime`
+and checks that no heavy module (LLM clients, PDF parsing, pandas, email) sneaks onto it.
+Importing must also leave the database and data folders untouched.
+Exits non-zero on a regression, so it can guard changes to module-level imports.
+
+Usage: python -m benchmarks.startup [--runs 5] [--budget-ms 0]
+"""
+import argparse
+import ast
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only imported once the feature that needs them is used
+DEFERRED_MODULES = ("pandas", "langchain_core", "ollama", "pdfplumber", "smtplib", "numpy", "scipy", "agents")
+
+# Imports executed per module by the child interpreter: pre-imported (baseline) and measured
+PROBE = """
+import sys, time
+for name in {baseline!r}:
+    __import__(name)
+start = time.perf_counter()
+for name in {measured!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+print("RESULT", elapsed, ",".join(sorted(m for m in sys.modules if m.split(".")[0] in {deferred!r})))
+"""
+
+def startup_imports(script="main_app.py"):
+    """Returns the modules a Streamlit script imports at module level (before any UI code runs)."""
+    with open(os.path.join(BASE_DIR, script)) as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            modules += [f"{node.module}.{alias.name}" if node.module == "utils" else node.module
+                        for alias in node.names]
+    return list(dict.fromkeys(modules))
+
+def _run_child(code, env, importtime=False):
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    return subprocess.run(command, cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True)
+
+def run(runs):
+    modules = startup_imports()
+    baseline = [name for name in modules if name.split(".")[0] == "streamlit"] # Paid by Streamlit itself
+    measured = [name for name in modules if name not in baseline]
+    code = PROBE.format(baseline=baseline, measured=measured, deferred=DEFERRED_MODULES)
+
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    files_before, db_before = _data_state()
+    timings, loaded = [], ""
+    for _ in range(runs):
+        _, seconds, loaded = _run_child(code, env).stdout.split("RESULT")[-1].split(" ", 2)
+        timings.append(float(seconds) * 1000)
+    importtime = _run_child(code, env, importtime=True).stderr
+    files_after, db_after = _data_state()
+
+    # The costliest imports on the path, from -X importtime's cumulative column
+    slowest = sorted(
+        ((int(match.group(1)), match.group(2).strip())
+         for match in re.finditer(r"^import time:\s+\d+ \|\s+(\d+) \| (.*)$", importtime, re.MULTILINE)),
+        reverse=True
+    )
+    return {
+        "measured_imports": measured,
+        "import_ms": {"median": round(statistics.median(timings), 2), "max": round(max(timings), 2)},
+        "slowest_us": [{"module": name, "cumulative_us": us} for us, name in slowest[:10]],
+        "deferred_modules_loaded": [name for name in loaded.strip().split(",") if name],
+        "import_side_effects": sorted(files_after ^ files_before) + (["recruitment.db modified"] if db_after != db_before else []),
+    }
+
+def _data_state():
+    """Returns the files in data/ and the database's mtime, to detect writes made while importing."""
+    data_dir = os.path.join(BASE_DIR, "data")
+    if not os.path.isdir(data_dir):
+        return set(), None
+    db_path = os.path.join(data_dir, "recruitment.db")
+    return set(os.listdir(data_dir)), os.path.getmtime(db_path) if os.path.exists(db_path) else None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Cold interpreter runs to time")
+    parser.add_argument("--budget-ms", type=float, default=0, help="Fail if the median import time exceeds this (0 = no limit)")
+    args = parser.parse_args()
+    result = run(args.runs)
+    print(json.dumps(result, indent=2))
+    over_budget = args.budget_ms and result["import_ms"]["median"] > args.budget_ms
+    sys.exit(1 if result["deferred_modules_loaded"] or result["import_side_effects"] or over_budget else 0)
@@ -0,0 +1,167 @@
+"""
+Times each pipeline stage and the end-to-end run on synthetic resume corpora (10, 100 and
+1,000 resumes by default) against the local fake Ollama server, on a throwaway database.
+Stages: PDF text extraction, CV extraction, match scoring (one call per candidate and
+batched), bulk database writes and process_resumes end to end.
+
+Results are JSON; pass --baseline with an earlier run's output to flag stages that got
+slower by more than --tolerance, in which case the exit status is non-zero.
+
+The fake server charges --per-prompt-token seconds for each prompt token outside its
+simulated prefix cache, so prompt layouts that share a prefix show up in the timings
+(the "llm" counters split evaluated from cached prompt tokens).
+
+Usage: python -m benchmarks.throughput [--sizes 10,100,1000] [--latency 0.02] [--parallel 4]
+                                       [--per-prompt-token 0.0001] [--no-prefix-cache]
+                                       [--output run.json] [--baseline previous.json]
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+from benchmarks.corpus import write_corpus
+from benchmarks.fake_ollama import FakeOllamaServer
+from utils import config, database, embedding_index, llm_client, pdf_parser, pipeline
+
+JD_SUMMARY = (
+    "Key Responsibilities: build and run backend services and data pipelines. "
+    "Required Skills: Python, SQL, Docker, AWS, Kafka. Required Experience: 3+ years. "
+    "Required Qualifications: BSc in Computer Science or similar."
+)
+
+def _timed(items, function, server=None):
+    """Runs function() and returns its timing (and the fake server's LLM counters) for `items` items."""
+    if server:
+        server.reset_counters()
+    start = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - start
+    result = {
+        "seconds": round(seconds, 3),
+        "per_item_ms": round(seconds / items * 1000, 3) if items else None,
+        "items_per_second": round(items / seconds, 2) if seconds else None,
+    }
+    if server:
+        result["llm"] = server.counters()
+    return result
+
+def _fresh_database(directory, name):
+    database.close_db_connection()
+    database.DB_PATH = os.path.join(directory, name)
+    database.setup_database()
+    # Each scenario starts with an empty semantic index in its own folder
+    config.EMBEDDING_DIR = os.path.join(directory, name + ".embeddings")
+    embedding_index._indexes.clear()
+    config.METRICS_PROMETHEUS_FILE = os.path.join(directory, name + ".prom") # Not the app's data/metrics.prom
+
+def run_scenario(size, server, directory):
+    from agents import cv_agent
+    from utils import matcher
+    results = {}
+    folder = os.path.join(directory, f"resumes_{size}")
+    filenames = write_corpus(folder, size)
+    paths = [os.path.join(folder, filename) for filename in filenames]
+
+    texts = []
+    results["pdf_text"] = _timed(size, lambda: texts.extend(pdf_parser.extract_text_from_pdf(path) for path in paths))
+    extracted = []
+    results["cv_extraction"] = _timed(size, lambda: extracted.extend(cv_agent.extract_cv_details(text) for text in texts), server)
+    results["match_scoring_single"] = _timed(
+        size, lambda: [matcher.calculate_match_score(JD_SUMMARY, data) for data in extracted], server
+    )
+    candidates = {index: data for index, data in enumerate(extracted)}
+    results["match_scoring_batched"] = _timed(size, lambda: matcher.calculate_match_scores_batch(JD_SUMMARY, candidates), server)
+
+    _fresh_database(directory, f"writes_{size}.db")
+    jd_id = database.add_job_description("Benchmark role", "original", JD_SUMMARY)
+    keys = ("name", "email", "phone", "cv_filename", "cv_text", "skills", "experience", "education")
+
+    def write_rows():
+        ids = database.add_candidates_bulk(
+            dict(zip(keys, (data['name'], data['email'] or f"missing{index}@example.com", data['phone'], filename,
+                            text, data['skills'], data['experience'], data['education'])))
+            for index, (filename, text, data) in enumerate(zip(filenames, texts, extracted))
+        )
+        database.add_matches_bulk((jd_id, candidate_id, 80, True, None, None) for candidate_id in ids.values())
+    results["db_writes"] = _timed(size, write_rows)
+
+    _fresh_database(directory, f"end_to_end_{size}.db")
+    jd_id = database.add_job_description("Benchmark role", "original", JD_SUMMARY)
+    processed = []
+    results["end_to_end"] = _timed(
+        size, lambda: processed.append(pipeline.process_resumes(jd_id, JD_SUMMARY, filenames, folder=folder)), server
+    )
+    results["end_to_end"]["processed"] = processed[0]
+    database.close_db_connection()
+    return results
+
+def compare(result, baseline, tolerance):
+    """Returns the stages that are more than `tolerance` (a fraction) slower than in the baseline run."""
+    regressions = {}
+    for size, stages in result["scenarios"].items():
+        for stage, timing in stages.items():
+            before = baseline.get("scenarios", {}).get(size, {}).get(stage)
+            if before and before["seconds"] and timing["seconds"] > before["seconds"] * (1 + tolerance):
+                regressions[f"{size}/{stage}"] = {"baseline_seconds": before["seconds"], "seconds": timing["seconds"]}
+    return regressions
+
+def run(sizes, latency, parallel, per_prompt_token=0.0, prefix_cache=True):
+    server = FakeOllamaServer(latency=latency, parallel=parallel, per_prompt_token=per_prompt_token,
+                              prefix_cache=prefix_cache).start()
+    llm_client.set_base_url(server.url)
+    original_db_path, original_embedding_dir = database.DB_PATH, config.EMBEDDING_DIR
+    original_metrics_file = config.METRICS_PROMETHEUS_FILE
+    scenarios = {}
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            for size in sizes:
+                scenarios[str(size)] = run_scenario(size, server, directory)
+    finally:
+        database.close_db_connection()
+        database.DB_PATH, config.EMBEDDING_DIR = original_db_path, original_embedding_dir
+        config.METRICS_PROMETHEUS_FILE = original_metrics_file
+        embedding_index._indexes.clear()
+        server.stop()
+    return {
+        "settings": {
+            "sizes": sizes, "fake_ollama_latency": latency, "fake_ollama_parallel": parallel,
+            "fake_ollama_per_prompt_token": per_prompt_token, "fake_ollama_prefix_cache": prefix_cache,
+            "llm_workers": config.LLM_WORKERS, "pdf_workers": config.PDF_WORKERS,
+            "match_batch_size": config.MATCH_BATCH_SIZE, "prefilter_enabled": config.PREFILTER_ENABLED,
+        },
+        "environment": {
+            "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(), "cpu_count": os.cpu_count(),
+        },
+        "scenarios": scenarios,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10,100,1000", help="Comma-separated corpus sizes")
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds the fake Ollama takes per request")
+    parser.add_argument("--parallel", type=int, default=config.LLM_WORKERS, help="Requests the fake Ollama serves at once")
+    parser.add_argument("--per-prompt-token", type=float, default=0.0001, help="Seconds the fake Ollama takes per evaluated prompt token")
+    parser.add_argument("--no-prefix-cache", action="store_true", help="Make the fake Ollama evaluate every prompt in full")
+    parser.add_argument("--output", help="Also write the JSON result to this file")
+    parser.add_argument("--baseline", help="JSON result of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown per stage before it is a regression")
+    args = parser.parse_args()
+    # The app's own progress prints go to stderr so stdout stays valid JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        result = run([int(size) for size in args.sizes.split(",")], args.latency, args.parallel,
+                     args.per_prompt_token, not args.no_prefix_cache)
+    if args.baseline:
+        with open(args.baseline) as f:
+            result["regressions"] = compare(result, json.load(f), args.tolerance)
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+    sys.exit(1 if result.get("regressions") else 0)
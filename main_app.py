@@ -1,19 +1,100 @@
 import streamlit as st
 import os
-import pandas as pd
 
-# Import project modules
-from utils import config, database, pdf_parser, email_sender
-from agents import jd_agent, cv_agent
-from utils import matcher # Corrected import path
+# Import project modules. Heavier ones (pandas, the LLM agents, the pipeline, email)
+# are imported where they are used, so a page load only pays for what it renders.
+from utils import config, database
 
 # --- Page Config ---
 st.set_page_config(page_title="AI Recruitment Assistant", layout="wide")
 
 # --- Helper Functions ---
-def load_jd_list():
+@st.cache_resource
+def initialize_app():
+    """Creates the data folders and migrates the database once per server process, not on every rerun."""
+    config.ensure_directories()
+    database.init_database()
+
+# Cached reads are keyed by the table_versions counters that every write bumps, so reruns
+# reuse the cached result and only hit the database again after a real write.
+@st.cache_data(max_entries=16, show_spinner=False)
+def load_jd_list(jd_version):
     """Loads job descriptions from the database."""
-    return database.get_all_jds()
+    return [dict(row) for row in database.get_all_jds()]
+
+def rows_to_df(rows):
+    """Builds a DataFrame from database rows."""
+    import pandas as pd
+    if not rows:
+        return pd.DataFrame()
+    return pd.DataFrame.from_records(rows, columns=rows[0].keys())
+
+# Tables are read one page at a time, so only the rows on screen are ever materialized
+@st.cache_data(max_entries=64, show_spinner=False)
+def load_candidates_page(jd_id, after, page_size, filters, matches_version, candidates_version):
+    """Loads one page of a JD's matched candidates as (DataFrame, key of the next page)."""
+    rows, next_key = database.get_candidates_page(jd_id, after, page_size, **filters)
+    return rows_to_df(rows), next_key
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def count_candidates(jd_id, filters, matches_version, candidates_version):
+    """Counts a JD's matched candidates under the given filters."""
+    return database.count_candidates_for_jd(jd_id, **filters)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def search_all_candidates(query, limit, candidates_version):
+    """Full-text searches every stored candidate, best match first, as a DataFrame."""
+    return rows_to_df(database.search_candidates(query, limit))
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def load_table_page(table, after_id, page_size, table_version):
+    """Loads one page of a raw table for the debug viewer as (DataFrame, id of the next page)."""
+    rows, next_id = database.get_table_page(table, after_id, page_size)
+    return rows_to_df(rows), next_id
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def load_run_metrics(metrics_version):
+    """Loads the latest instrumented run of each kind as [(run dict, per-stage DataFrame)]."""
+    import pandas as pd
+    from utils import metrics
+    def ms(seconds):
+        return None if seconds is None else round(seconds * 1000, 1)
+
+    runs = []
+    for run, summary in metrics.latest_run_summaries():
+        runs.append((dict(run), pd.DataFrame([
+            {"stage": stage, "calls": stats["count"], "p50 ms": ms(stats["p50"]), "p95 ms": ms(stats["p95"]),
+             "max ms": ms(stats["max"]), "total s": round(stats["total"], 2),
+             "prompt tokens": stats["prompt_tokens"], "completion tokens": stats["completion_tokens"],
+             "retries": stats["retries"], "errors": stats["errors"]}
+            for stage, stats in summary.items()
+        ])))
+    return runs
+
+def current_page_key(state_key, reset_token=None):
+    """
+    Returns the keyset key of the page being viewed. The keys of the pages visited so far are
+    kept in st.session_state[state_key], and start over when reset_token (e.g. the filters) changes.
+    """
+    pages = st.session_state.get(state_key)
+    if pages is None or pages["token"] != reset_token:
+        pages = st.session_state[state_key] = {"token": reset_token, "keys": [None]}
+    return pages["keys"][-1]
+
+def page_buttons(state_key, next_key):
+    """Renders Previous/Next buttons that move through the pages tracked by current_page_key()."""
+    keys = st.session_state[state_key]["keys"]
+    prev_col, page_col, next_col = st.columns([1, 4, 1])
+    if prev_col.button("◀ Previous", key=f"{state_key}_prev", disabled=len(keys) == 1):
+        keys.pop()
+        st.rerun()
+    page_col.caption(f"Page {len(keys)}")
+    if next_col.button("Next ▶", key=f"{state_key}_next", disabled=next_key is None):
+        keys.append(next_key)
+        st.rerun()
+
+initialize_app()
+versions = database.get_table_versions() # One small read per rerun decides what the cache can serve
 
 # --- Initialize Session State ---
 if 'current_jd_id' not in st.session_state:
@@ -22,8 +103,6 @@ if 'current_jd_title' not in st.session_state:
     st.session_state.current_jd_title = None
 if 'jd_summary' not in st.session_state:
     st.session_state.jd_summary = None
-if 'candidates_df' not in st.session_state:
-    st.session_state.candidates_df = pd.DataFrame()
 
 
 # --- Sidebar ---
@@ -31,7 +110,7 @@ st.sidebar.title("Recruitment Actions")
 
 # Select or Add Job Description
 st.sidebar.header("1. Job Description")
-jd_list = load_jd_list()
+jd_list = load_jd_list(versions['job_descriptions'])
 jd_options = {jd['id']: jd['title'] for jd in jd_list}
 selected_jd_id = st.sidebar.selectbox(
     "Select Existing JD",
@@ -46,12 +125,6 @@ if selected_jd_id and selected_jd_id != st.session_state.current_jd_id:
     st.session_state.current_jd_id = selected_jd_id
     st.session_state.current_jd_title = jd_options[selected_jd_id]
     st.session_state.jd_summary = database.get_jd_summary(selected_jd_id)
-    # Load candidates for this JD
-    candidates_data = database.get_candidates_for_jd(selected_jd_id)
-    if candidates_data:
-        st.session_state.candidates_df = pd.DataFrame([dict(row) for row in candidates_data])
-    else:
-        st.session_state.candidates_df = pd.DataFrame()
 
 
 st.sidebar.markdown("---")
@@ -62,16 +135,19 @@ new_jd_text = st.sidebar.text_area("Paste Job Description Text Here", height=200
 if st.sidebar.button("Summarize & Add JD"):
     if new_jd_title and new_jd_text:
         with st.spinner("Summarizing Job Description..."):
+            from agents import jd_agent
             summary = jd_agent.summarize_job_description(new_jd_text)
             if "Error:" not in summary:
                 jd_id = database.add_job_description(new_jd_title, new_jd_text, summary)
                 if jd_id:
                     st.sidebar.success(f"JD '{new_jd_title}' added successfully!")
+                    if config.EMBEDDINGS_ENABLED:
+                        from utils import embedding_index
+                        embedding_index.index_job_description(jd_id, summary)
                     # Update state to reflect the new JD
                     st.session_state.current_jd_id = jd_id
                     st.session_state.current_jd_title = new_jd_title
                     st.session_state.jd_summary = summary
-                    st.session_state.candidates_df = pd.DataFrame() # Reset candidates for new JD
                     st.rerun() # Rerun to update dropdown and main page
                 else:
                     st.sidebar.error("Failed to save JD to database.")
@@ -83,90 +159,54 @@ if st.sidebar.button("Summarize & Add JD"):
 st.sidebar.markdown("---")
 st.sidebar.header("2. Process Resumes")
 st.sidebar.info(f"Place PDF resumes in the:\n`{os.path.basename(config.RESUME_FOLDER)}` folder.")
+force_rescore = st.sidebar.checkbox(
+    "Force rescore",
+    help="Re-run the LLM matcher even for candidates whose profile and JD summary haven't changed since they were scored."
+)
 
 if st.sidebar.button("Process Resumes & Match"):
     if st.session_state.current_jd_id and st.session_state.jd_summary:
-        resume_files = [f for f in os.listdir(config.RESUME_FOLDER) if f.lower().endswith(".pdf")]
-        if not resume_files:
-            st.sidebar.warning("No PDF resumes found in the folder.")
+        # A background worker runs the pipeline; the page only submits the job and polls its progress
+        job_id = database.submit_job(
+            "ingest", st.session_state.current_jd_id, config.RESUME_FOLDER, {"force_rescore": force_rescore}
+        )
+        if job_id is None:
+            st.sidebar.error("Failed to submit the processing job.")
         else:
-            progress_bar = st.sidebar.progress(0)
-            status_text = st.sidebar.empty()
-            processed_count = 0
-            total_files = len(resume_files)
-
-            for i, filename in enumerate(resume_files):
-                status_text.text(f"Processing {filename}...")
-                pdf_path = os.path.join(config.RESUME_FOLDER, filename)
-
-                # a. Parse PDF
-                cv_text = pdf_parser.extract_text_from_pdf(pdf_path)
-                if not cv_text:
-                    st.warning(f"Could not extract text from {filename}. Skipping.")
-                    continue
-
-                # b. Extract CV Details using CV Agent
-                extracted_data = cv_agent.extract_cv_details(cv_text)
-                if extracted_data.get("error"):
-                     st.warning(f"CV Parsing Error for {filename}: {extracted_data['error']}")
-                     # Continue processing but may lack some data
-
-                if not extracted_data.get('email'):
-                     st.warning(f"Could not extract email for {filename}. Skipping match.")
-                     # We need email to uniquely identify and contact candidate
-                     continue
-
-
-                # c. Add/Update Candidate in DB
-                candidate_id = database.add_candidate(
-                    name=extracted_data.get('name'),
-                    email=extracted_data['email'], # Email is required now
-                    phone=extracted_data.get('phone'),
-                    cv_filename=filename,
-                    cv_text=cv_text,
-                    skills=extracted_data.get('skills'),
-                    experience=extracted_data.get('experience'),
-                    education=extracted_data.get('education')
-                )
-
-                if not candidate_id:
-                     st.error(f"Failed to add/update candidate {extracted_data['email']} from {filename} to DB.")
-                     continue
-
-                # d. Calculate Match Score using Matcher
-                score = matcher.calculate_match_score(st.session_state.jd_summary, extracted_data)
-                if score == -1:
-                    st.warning(f"Could not calculate match score for {filename}. Skipping match.")
-                    continue
-
-                # e. Determine Shortlisting & Add Match to DB
-                is_shortlisted = score >= config.MATCH_THRESHOLD
-                match_saved = database.add_or_update_match(
-                    st.session_state.current_jd_id,
-                    candidate_id,
-                    score,
-                    is_shortlisted
-                )
-                if not match_saved:
-                     st.error(f"Failed to save match for candidate {candidate_id} / JD {st.session_state.current_jd_id}")
-
-                processed_count += 1
-                progress_bar.progress((i + 1) / total_files)
-                status_text.text(f"Processed {processed_count}/{total_files} resumes.")
-
-            status_text.success(f"Finished processing {processed_count} resumes.")
-            progress_bar.empty()
-            # Refresh candidate list after processing
-            candidates_data = database.get_candidates_for_jd(st.session_state.current_jd_id)
-            if candidates_data:
-                st.session_state.candidates_df = pd.DataFrame([dict(row) for row in candidates_data])
-            else:
-                st.session_state.candidates_df = pd.DataFrame()
-            st.rerun() # Rerun to display updated table
-
+            st.session_state.watched_job_id = job_id
     else:
         st.sidebar.warning("Please select or add a Job Description first.")
 
+@st.fragment(run_every=config.JOB_POLL_INTERVAL)
+def show_job_status(jd_id):
+    """Shows the latest processing job for the JD, re-polled from SQLite without rerunning the page."""
+    jobs = database.get_recent_jobs(jd_id, limit=1)
+    if not jobs:
+        return
+    job = jobs[0]
+    if job['status'] in ("pending", "running"):
+        total = job['progress_total']
+        st.progress(job['progress_done'] / total if total else 0.0,
+                    text=job['message'] or f"Job {job['id']} {job['status']}...")
+        if job['status'] == "pending":
+            st.caption("Waiting for a worker. Start one with `python recruitflow.py worker`.")
+        st.session_state.watched_job_id = job['id']
+    else:
+        if job['status'] == "done":
+            st.success(job['message'])
+            if job['warnings']:
+                st.warning(f"{job['warnings']} resume(s) had issues. Check the worker's log for details.")
+        else:
+            st.error(f"Processing failed: {job['message']}")
+        if st.session_state.get("watched_job_id") == job['id']:
+            # The job finished while this page watched it: rerun the whole app to show the new matches
+            st.session_state.watched_job_id = None
+            st.rerun()
+
+if st.session_state.current_jd_id:
+    with st.sidebar:
+        show_job_status(st.session_state.current_jd_id)
+
 
 # --- Main Page ---
 st.title("🤖 AI Recruitment Assistant Dashboard")
@@ -177,95 +217,165 @@ else:
     st.header(f"Job: {st.session_state.current_jd_title}")
     st.subheader("Job Description Summary")
     st.markdown(st.session_state.jd_summary if st.session_state.jd_summary else "_No summary available._")
+
+    if config.EMBEDDINGS_ENABLED and st.session_state.jd_summary:
+        with st.expander("Find best existing candidates (semantic search)"):
+            top_k = st.number_input("Number of candidates", min_value=5, max_value=500, value=50, step=5)
+            if st.button("Search stored candidates"):
+                with st.spinner("Searching the candidate index..."):
+                    import pandas as pd
+                    from utils import embedding_index
+                    nearest = embedding_index.find_candidates_for_jd(st.session_state.jd_summary, k=int(top_k))
+                    details = database.get_candidates_by_ids([candidate_id for candidate_id, _ in nearest])
+                if nearest:
+                    st.dataframe(pd.DataFrame([
+                        {
+                            'Name': details[candidate_id]['name'],
+                            'Email': details[candidate_id]['email'],
+                            'Similarity': round(similarity, 3),
+                            'Resume File': details[candidate_id]['cv_filename']
+                        }
+                        for candidate_id, similarity in nearest if candidate_id in details
+                    ]), use_container_width=True)
+                else:
+                    st.info("No indexed candidates found. Process some resumes first.")
     st.markdown("---")
 
     st.header("Candidate Matching & Shortlisting")
 
-    if not st.session_state.candidates_df.empty:
+    jd_id = st.session_state.current_jd_id
+    if count_candidates(jd_id, {}, versions['matches'], versions['candidates']):
         # Display Candidates Table
         st.subheader("Matched Candidates")
 
-        # Prepare dataframe for display
-        display_df = st.session_state.candidates_df[['name', 'email', 'match_score', 'is_shortlisted', 'interview_email_sent', 'cv_filename']].copy()
-        display_df.rename(columns={
-            'match_score': 'Score (%)',
-            'is_shortlisted': 'Shortlisted',
-            'interview_email_sent': 'Email Sent',
-            'cv_filename': 'Resume File'
-        }, inplace=True)
-
-        st.dataframe(display_df, use_container_width=True)
+        with st.expander("Filter candidates"):
+            filter_cols = st.columns(4)
+            score_range = filter_cols[0].slider("Score (%)", 0, 100, (0, 100))
+            shortlisted = filter_cols[1].selectbox("Shortlisted", ["Any", "Yes", "No"])
+            email_sent = filter_cols[2].selectbox("Email Sent", ["Any", "Yes", "No"])
+            page_size = filter_cols[3].selectbox("Rows per page", [25, 50, 100], index=1)
+            search = st.text_input("Search name or email")
+            st.caption("Narrowing the score range hides candidates without a Score.")
+        choice = {"Any": None, "Yes": True, "No": False}
+        filters = {"shortlisted": choice[shortlisted], "email_sent": choice[email_sent], "search": search.strip() or None}
+        if score_range != (0, 100):
+            filters["min_score"], filters["max_score"] = score_range
+        filters = {name: value for name, value in filters.items() if value is not None}
+
+        after = current_page_key("candidate_pages", (jd_id, page_size, tuple(sorted(filters.items()))))
+        page_df, next_key = load_candidates_page(jd_id, after, page_size, filters, versions['matches'], versions['candidates'])
+        filtered_count = count_candidates(jd_id, filters, versions['matches'], versions['candidates'])
+        st.write(f"**{filtered_count}** candidate(s) match the filters.")
+
+        if not page_df.empty:
+            # Prepare dataframe for display
+            display_df = page_df[['name', 'email', 'match_score', 'prefilter_score', 'is_shortlisted', 'interview_email_sent', 'cv_filename']].copy()
+            display_df.rename(columns={
+                'match_score': 'Score (%)',
+                'prefilter_score': 'Keyword Score',
+                'is_shortlisted': 'Shortlisted',
+                'interview_email_sent': 'Email Sent',
+                'cv_filename': 'Resume File'
+            }, inplace=True)
+
+            st.dataframe(display_df, use_container_width=True)
+        page_buttons("candidate_pages", next_key)
+        st.caption("Candidates without a Score were ranked below the keyword pre-filter cut-off and never sent to the LLM matcher.")
 
         # --- Shortlisting & Emailing ---
         st.subheader("Interview Scheduling")
-        shortlisted_candidates = st.session_state.candidates_df[
-            (st.session_state.candidates_df['is_shortlisted'] == True) &
-            (st.session_state.candidates_df['interview_email_sent'] == False)
-        ]
+        pending = {"shortlisted": True, "email_sent": False}
+        pending_count = count_candidates(jd_id, pending, versions['matches'], versions['candidates'])
 
-        if not shortlisted_candidates.empty:
-            st.write(f"Found **{len(shortlisted_candidates)}** shortlisted candidate(s) ready for interview invitation:")
-            st.dataframe(shortlisted_candidates[['name', 'email', 'match_score']], use_container_width=True)
+        if pending_count:
+            st.write(f"Found **{pending_count}** shortlisted candidate(s) ready for interview invitation:")
+            preview_df, _ = load_candidates_page(jd_id, None, 20, pending, versions['matches'], versions['candidates'])
+            st.dataframe(preview_df[['name', 'email', 'match_score']], use_container_width=True)
+            if pending_count > len(preview_df):
+                st.caption(f"Showing the top {len(preview_df)}; use the filters above to browse them all.")
 
             if st.button("📧 Send Interview Emails to Shortlisted Candidates"):
-                 if not config.EMAIL_ADDRESS or config.EMAIL_ADDRESS == "default_email@example.com" or not config.EMAIL_PASSWORD or config.EMAIL_PASSWORD == "default_password":
+                 from utils import email_sender
+                 if not email_sender.credentials_configured():
                       st.error("Email credentials not configured. Please set them in the `.env` file and restart.")
                  else:
-                    send_count = 0
-                    fail_count = 0
-                    with st.spinner("Sending emails..."):
-                         # Fetch fresh list just before sending
-                         candidates_to_email = database.get_shortlisted_candidates_for_emailing(st.session_state.current_jd_id)
-
-                         for candidate in candidates_to_email:
-                            success = email_sender.send_interview_email(
-                                recipient_email=candidate['email'],
-                                candidate_name=candidate['name'],
-                                job_title=st.session_state.current_jd_title
-                            )
-                            if success:
-                                # Update status in database
-                                database.update_email_sent_status(candidate['match_id'])
-                                send_count += 1
-                            else:
-                                fail_count += 1
-
-                    st.success(f"Sent {send_count} interview invitations.")
-                    if fail_count > 0:
-                        st.warning(f"Failed to send emails for {fail_count} candidates. Check console logs for errors.")
-
-                    # Refresh data after sending
-                    candidates_data = database.get_candidates_for_jd(st.session_state.current_jd_id)
-                    if candidates_data:
-                         st.session_state.candidates_df = pd.DataFrame([dict(row) for row in candidates_data])
+                    # The outbox worker sends them, so the page returns at once and closing it doesn't stop the batch
+                    queued = database.enqueue_interview_emails(jd_id, st.session_state.current_jd_title)
+                    if queued is None:
+                        st.error("Failed to queue interview emails.")
                     else:
-                         st.session_state.candidates_df = pd.DataFrame()
-                    st.rerun()
+                        st.toast(f"Queued {queued} interview invitations.")
+                        st.rerun()
 
         else:
             st.info("No shortlisted candidates pending interview invitations for this job.")
 
+        outbox = database.get_outbox_summary(jd_id) if versions['email_outbox'] else {}
+        if outbox:
+            st.write(
+                f"Outbox: **{outbox.get('queued', 0)}** queued, **{outbox.get('sending', 0)}** sending, "
+                f"**{outbox.get('sent', 0)}** sent, **{outbox.get('failed', 0)}** failed."
+            )
+            if outbox.get('queued') or outbox.get('sending'):
+                st.caption("Emails are delivered by the outbox worker: `python -m utils.email_worker`.")
+            if outbox.get('failed'):
+                with st.expander("Failed emails"):
+                    st.dataframe(rows_to_df(database.get_failed_outbox_emails(jd_id)), use_container_width=True)
+                    st.caption("Sending again re-queues these candidates.")
+
     else:
         st.info("No candidates processed for this job yet. Use the 'Process Resumes & Match' button in the sidebar.")
 
+# --- Candidate Search ---
+st.markdown("---")
+st.header("Search All Candidates")
+search_cols = st.columns([5, 1])
+search_query = search_cols[0].text_input(
+    "Search resumes and extracted skills", placeholder="kubernetes AND terraform",
+    help='Words must all appear unless joined by OR; NOT excludes a word, "quotes" match a phrase and pyth* a prefix.'
+)
+search_limit = search_cols[1].selectbox("Results", [20, 50, 100])
+if search_query.strip():
+    results_df = search_all_candidates(search_query.strip(), search_limit, versions['candidates'])
+    if results_df.empty:
+        st.info("No stored candidates match this search.")
+    else:
+        display_df = results_df[['name', 'email', 'relevance', 'snippet', 'cv_filename']].copy()
+        display_df['relevance'] = display_df['relevance'].round(2)
+        display_df.rename(columns={
+            'name': 'Name',
+            'email': 'Email',
+            'relevance': 'Relevance',
+            'snippet': 'Match',
+            'cv_filename': 'Resume File'
+        }, inplace=True)
+        st.dataframe(display_df, use_container_width=True, hide_index=True)
+
+# --- Run Metrics ---
+st.markdown("---")
+with st.expander("Pipeline performance (latest runs)"):
+    runs = load_run_metrics(versions['metric_runs'])
+    if not runs:
+        st.caption("No instrumented runs yet. Stage timings appear after the next resume or email run.")
+    for run, stats_df in runs:
+        jd_label = f", JD {run['jd_id']}" if run['jd_id'] is not None else ""
+        st.subheader(f"Latest {run['kind']} run (#{run['id']}{jd_label}): {run['seconds']:.1f}s")
+        st.dataframe(stats_df, use_container_width=True, hide_index=True)
+    st.caption("`llm.*` rows are the Ollama requests made by each stage; token counts come from Ollama's response.")
+
 # --- Database Viewer (Optional) ---
 st.markdown("---")
 st.header("Database Contents (for debugging)")
 show_db = st.checkbox("Show Raw Database Tables")
 if show_db:
     try:
-        conn = database.get_db_connection()
-        st.subheader("Job Descriptions Table")
-        jds_df = pd.read_sql_query("SELECT * FROM job_descriptions", conn)
-        st.dataframe(jds_df)
-
-        st.subheader("Candidates Table")
-        cands_df = pd.read_sql_query("SELECT id, name, email, phone, cv_filename, timestamp FROM candidates", conn) # Avoid showing full CV text
-        st.dataframe(cands_df)
-
-        st.subheader("Matches Table")
-        matches_df = pd.read_sql_query("SELECT * FROM matches", conn)
-        st.dataframe(matches_df)
-        conn.close()
+        for table, heading in (("job_descriptions", "Job Descriptions Table"),
+                               ("candidates", "Candidates Table"), # Full CV text is left out
+                               ("matches", "Matches Table")):
+            st.subheader(heading)
+            state_key = f"{table}_pages"
+            table_df, next_id = load_table_page(table, current_page_key(state_key), 50, versions[table])
+            st.dataframe(table_df)
+            page_buttons(state_key, next_id)
     except Exception as e:
         st.error(f"Could not display database tables: {e}")
\ No newline at end of file
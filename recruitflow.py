@@ -0,0 +1,193 @@
+"""
+Headless entry point for batch work, so runs can be scheduled from cron or a server without a browser.
+
+  python recruitflow.py ingest --jd-id 12 --folder resumes/ --workers 8
+  python recruitflow.py submit --jd-id 12      # queue a run for a job worker, like the dashboard does
+  python recruitflow.py worker                 # run the jobs submitted from the dashboard or `submit`
+  python recruitflow.py email-worker           # send the interview emails queued in the outbox
+  python recruitflow.py jobs                   # list recent jobs and their progress
+  python recruitflow.py metrics                # per-stage timings of the latest runs (Prometheus text format)
+
+Sharded ingestion across several Ollama hosts (workers run next to the SQLite file):
+  python recruitflow.py shard --jd-id 12 --folder resumes/
+  python recruitflow.py task-worker --ollama-url http://gpu1:11434 --ollama-url http://gpu2:11434
+  python recruitflow.py tasks                  # queued / leased / done / failed task counts
+  python recruitflow.py reindex                # embed candidates the task workers stored, sign older CVs for dedup, compact the search index
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+from utils import config, database
+
+def _pipeline_options(args):
+    options = {"force_rescore": args.force_rescore}
+    if args.workers:
+        options["llm_workers"] = args.workers
+    if args.pdf_workers:
+        options["pdf_workers"] = args.pdf_workers
+    if args.batch_size:
+        options["batch_size"] = args.batch_size
+    if args.no_prefilter:
+        options["use_prefilter"] = False
+    return options
+
+def _check_jd(jd_id):
+    if jd_id is not None and not database.get_jd_summary(jd_id):
+        print(f"Error: job description {jd_id} not found or has no summary.")
+        sys.exit(1)
+
+def cmd_ingest(args):
+    from utils import ingest
+    _check_jd(args.jd_id)
+    if args.watch:
+        ingest.watch_folder(args.jd_id, args.folder, args.interval, **_pipeline_options(args))
+        return
+    jd_summary = database.get_jd_summary(args.jd_id) if args.jd_id is not None else None
+    scan, processed = ingest.run_ingestion(args.jd_id, jd_summary, args.folder, **_pipeline_options(args))
+    print(f"{len(scan['to_process'])} to ingest, {len(scan['unchanged'])} unchanged, "
+          f"{len(scan['deleted'])} deleted; processed {processed} resume(s).")
+
+def cmd_submit(args):
+    _check_jd(args.jd_id)
+    job_id = database.submit_job("ingest", args.jd_id, os.path.abspath(args.folder), _pipeline_options(args))
+    if job_id is None:
+        sys.exit(1)
+    print(f"Submitted job {job_id}.")
+
+def cmd_worker(args):
+    from utils import jobs
+    jobs.run_worker(poll_interval=args.interval, drain=args.drain)
+
+def cmd_email_worker(args):
+    from utils import email_worker
+    email_worker.run_worker(batch_size=args.batch_size, poll_interval=args.interval, drain=args.drain)
+
+def cmd_shard(args):
+    from utils import work_queue
+    _check_jd(args.jd_id)
+    scan, queued = work_queue.enqueue_folder(args.jd_id, args.folder)
+    if queued is None:
+        sys.exit(1)
+    print(f"Queued {queued} task(s): {len(scan['to_process'])} to ingest, {len(scan['unchanged'])} unchanged, "
+          f"{len(scan['deleted'])} deleted.")
+
+def cmd_task_worker(args):
+    from utils import work_queue
+    options = {"batch_size": args.tasks_per_claim, "poll_interval": args.interval, "drain": args.drain}
+    if args.workers:
+        options["llm_workers"] = args.workers
+    if args.pdf_workers:
+        options["pdf_workers"] = args.pdf_workers
+    urls = args.ollama_url or [None]
+    if len(urls) == 1:
+        work_queue.run_task_worker(ollama_url=urls[0], **options)
+        return
+    # One worker process per Ollama host; spawned so none inherits this process's SQLite connection
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=work_queue.run_task_worker, kwargs=dict(options, ollama_url=url))
+                 for url in urls]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.join()
+
+def cmd_tasks(args):
+    summary = database.get_work_task_summary(args.jd_id)
+    print(", ".join(f"{status}: {summary.get(status, 0)}" for status in ("queued", "leased", "done", "failed")))
+
+def cmd_reindex(args):
+    from utils import embedding_index, near_duplicates
+    embedding_index.rebuild_indexes(missing_only=not args.all)
+    near_duplicates.rebuild_index(missing_only=not args.all)
+    if database.optimize_search_index(rebuild=args.all):
+        print("Full-text search index optimized.")
+
+def cmd_metrics(args):
+    from utils import metrics
+    if args.write:
+        metrics.write_prometheus(args.write)
+    else:
+        print(metrics.prometheus_text(), end="")
+
+def cmd_jobs(args):
+    for job in database.get_recent_jobs(args.jd_id, args.limit):
+        progress = f"{job['progress_done']}/{job['progress_total']}" if job['progress_total'] else "-"
+        print(f"#{job['id']:<5} {job['status']:<8} JD {job['jd_id']!s:<5} {progress:>11}  {job['message'] or ''}")
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_pipeline_arguments(command):
+        command.add_argument("--jd-id", type=int, help="Score resumes against this job description (omit to only ingest)")
+        command.add_argument("--folder", default=config.RESUME_FOLDER, help="Resume folder to ingest")
+        command.add_argument("--workers", type=int, help="Concurrent LLM calls (default LLM_WORKERS)")
+        command.add_argument("--pdf-workers", type=int, help="PDF parsing processes (default PDF_WORKERS)")
+        command.add_argument("--batch-size", type=int, help="Candidates scored per LLM call (default MATCH_BATCH_SIZE)")
+        command.add_argument("--force-rescore", action="store_true", help="Re-score candidates even if their inputs are unchanged")
+        command.add_argument("--no-prefilter", action="store_true", help="Send every candidate to the LLM matcher")
+
+    ingest = commands.add_parser("ingest", help="Ingest (and optionally score) a resume folder in this process")
+    add_pipeline_arguments(ingest)
+    ingest.add_argument("--watch", action="store_true", help="Keep polling the folder for new resumes")
+    ingest.add_argument("--interval", type=int, default=10, help="Polling interval in seconds for --watch")
+    ingest.set_defaults(handler=cmd_ingest)
+
+    submit = commands.add_parser("submit", help="Queue an ingest run for a job worker")
+    add_pipeline_arguments(submit)
+    submit.set_defaults(handler=cmd_submit)
+
+    worker = commands.add_parser("worker", help="Run jobs submitted from the dashboard or `submit`")
+    worker.add_argument("--interval", type=float, help="Seconds to wait when no job is pending")
+    worker.add_argument("--drain", action="store_true", help="Exit once no job is pending")
+    worker.set_defaults(handler=cmd_worker)
+
+    email_worker = commands.add_parser("email-worker", help="Send the interview emails queued in the outbox")
+    email_worker.add_argument("--batch-size", type=int, help="Emails leased per claim")
+    email_worker.add_argument("--interval", type=float, help="Seconds to wait when the outbox is empty")
+    email_worker.add_argument("--drain", action="store_true", help="Exit once no queued email is due")
+    email_worker.set_defaults(handler=cmd_email_worker)
+
+    shard = commands.add_parser("shard", help="Queue one task per resume for sharded task workers")
+    shard.add_argument("--jd-id", type=int, help="Score resumes against this job description (omit to only ingest)")
+    shard.add_argument("--folder", default=config.RESUME_FOLDER, help="Resume folder to ingest")
+    shard.set_defaults(handler=cmd_shard)
+
+    task_worker = commands.add_parser("task-worker", help="Process queued tasks against one or more Ollama hosts")
+    task_worker.add_argument("--ollama-url", action="append",
+                             help="Ollama server for this worker; repeat to start one worker process per host")
+    task_worker.add_argument("--workers", type=int, help="Concurrent LLM calls per worker (default LLM_WORKERS)")
+    task_worker.add_argument("--pdf-workers", type=int, help="PDF parsing processes per worker (default PDF_WORKERS)")
+    task_worker.add_argument("--tasks-per-claim", type=int, help="Tasks leased per claim (default WORK_BATCH_SIZE)")
+    task_worker.add_argument("--interval", type=float, help="Seconds to wait when no task is due")
+    task_worker.add_argument("--drain", action="store_true", help="Exit once no task is due")
+    task_worker.set_defaults(handler=cmd_task_worker)
+
+    tasks = commands.add_parser("tasks", help="Summarize the sharded ingestion queue")
+    tasks.add_argument("--jd-id", type=int, help="Only tasks for this job description")
+    tasks.set_defaults(handler=cmd_tasks)
+
+    reindex = commands.add_parser("reindex", help="Add candidates and JDs missing from the semantic search and near-duplicate indexes, compact the full-text index")
+    reindex.add_argument("--all", action="store_true", help="Re-index everything, not only missing rows (rebuilds the full-text index too)")
+    reindex.set_defaults(handler=cmd_reindex)
+
+    metrics = commands.add_parser("metrics", help="Print per-stage timings and token counts of the latest runs")
+    metrics.add_argument("--write", metavar="PATH", help="Write the Prometheus text file here instead of printing it")
+    metrics.set_defaults(handler=cmd_metrics)
+
+    jobs = commands.add_parser("jobs", help="List recent jobs")
+    jobs.add_argument("--jd-id", type=int, help="Only jobs for this job description")
+    jobs.add_argument("--limit", type=int, default=10, help="Number of jobs to list")
+    jobs.set_defaults(handler=cmd_jobs)
+    return parser
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    config.ensure_directories()
+    database.init_database()
+    args.handler(args)
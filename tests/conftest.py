@@ -0,0 +1,24 @@
+import pytest
+from benchmarks.fake_smtp import StandInSMTPServer
+from utils import config, database, email_sender
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A fresh, fully migrated database in a temporary directory."""
+    database.close_db_connection()
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "recruitment.db"))
+    monkeypatch.setattr(config, "METRICS_PROMETHEUS_FILE", str(tmp_path / "metrics.prom"))
+    database.setup_database()
+    yield database
+    database.close_db_connection()
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    """A local SMTP stand-in (benchmarks/fake_smtp.py) the email sender is pointed at, without TLS or login."""
+    server = StandInSMTPServer(connect_latency=0, message_latency=0).start()
+    monkeypatch.setattr(email_sender, "SMTP_SERVER", server.server_address[0])
+    monkeypatch.setattr(email_sender, "SMTP_PORT", server.server_address[1])
+    monkeypatch.setattr(email_sender, "SMTP_USE_TLS", False)
+    monkeypatch.setattr(email_sender, "SMTP_AUTH", False)
+    yield server
+    server.stop()
@@ -0,0 +1,65 @@
+"""Keyset pagination of a JD's candidates (database.get_candidates_page / count_candidates_for_jd)."""
+import random
+import pytest
+
+@pytest.fixture
+def jd_id(db):
+    rng = random.Random(7)
+    keys = ("name", "email", "phone", "cv_filename", "cv_text", "skills", "experience", "education")
+    ids = db.add_candidates_bulk(
+        dict(zip(keys, (f"Candidate {i}", f"candidate{i}@example.com", None, f"C{i}.pdf", "cv", "", "", "")))
+        for i in range(60)
+    )
+    jd_id = db.add_job_description("Engineer", "original", "summary")
+    # Few distinct scores, so pages break inside runs of ties, and a tail of unscored matches
+    db.add_matches_bulk(
+        (jd_id, candidate_id, score, score is not None and score >= 75, None, None)
+        for candidate_id in ids.values()
+        for score in [rng.choice([None, 50, 60, 75, 75, 80, 90])]
+    )
+    with db.transaction() as cursor:
+        cursor.execute("UPDATE matches SET interview_email_sent = TRUE WHERE is_shortlisted AND candidate_id % 3 = 0")
+    return jd_id
+
+def _full_list(db, jd_id, min_score=None, max_score=None, shortlisted=None, email_sent=None, search=None):
+    rows = db.get_db_connection().execute('''
+        SELECT m.candidate_id, m.match_score, m.is_shortlisted, m.interview_email_sent, c.name, c.email
+        FROM matches m JOIN candidates c ON c.id = m.candidate_id
+        WHERE m.jd_id = ?
+        ORDER BY m.match_score DESC, m.candidate_id
+    ''', (jd_id,)).fetchall()
+    return [row['candidate_id'] for row in rows
+            if (min_score is None or (row['match_score'] is not None and row['match_score'] >= min_score))
+            and (max_score is None or (row['match_score'] is not None and row['match_score'] <= max_score))
+            and (shortlisted is None or bool(row['is_shortlisted']) == shortlisted)
+            and (email_sent is None or bool(row['interview_email_sent']) == email_sent)
+            and (search is None or search in row['name'] or search in row['email'])]
+
+def _paged(db, jd_id, page_size, **filters):
+    ids, after = [], None
+    while True:
+        rows, after = db.get_candidates_page(jd_id, after, page_size, **filters)
+        assert len(rows) <= page_size
+        ids += [row['candidate_id'] for row in rows]
+        if after is None:
+            return ids
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"min_score": 75},
+    {"max_score": 75},
+    {"shortlisted": True, "email_sent": False},
+    {"shortlisted": False},
+    {"search": "Candidate 1"},
+])
+@pytest.mark.parametrize("page_size", [1, 7, 50, 100])
+def test_pages_match_the_full_ordered_list(db, jd_id, filters, page_size):
+    expected = _full_list(db, jd_id, **filters)
+    assert _paged(db, jd_id, page_size, **filters) == expected
+    assert db.count_candidates_for_jd(jd_id, **filters) == len(expected)
+
+def test_unscored_tail_comes_last(db, jd_id):
+    rows, _ = db.get_candidates_page(jd_id, None, 100)
+    scores = [row['match_score'] for row in rows]
+    assert None in scores
+    assert all(score is None for score in scores[scores.index(None):])
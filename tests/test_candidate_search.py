@@ -0,0 +1,67 @@
+"""Full-text candidate search (database.search_candidates) and the triggers keeping candidates_fts in sync."""
+import pytest
+
+def _add(db, name, email, skills, experience="", cv_text="cv"):
+    return db.add_candidate(name, email, None, f"{name}.pdf", cv_text, skills, experience, "BSc")
+
+def _found(db, query):
+    return [row['email'] for row in db.search_candidates(query)]
+
+def _assert_index_in_sync(db):
+    # Raises if the external-content index and the candidates table disagree
+    with db.transaction() as cursor:
+        cursor.execute("INSERT INTO candidates_fts (candidates_fts, rank) VALUES ('integrity-check', 1)")
+
+@pytest.fixture
+def people(db):
+    _add(db, "Ada", "ada@example.com", "Python, Kubernetes, Terraform", "Data engineer at Acme")
+    _add(db, "Bob", "bob@example.com", "C++, node.js", "Backend developer")
+    _add(db, "Cy", "cy@example.com", "Java, Kubernetes", "Platform engineer", cv_text="CI/CD pipelines")
+    return db
+
+def test_insert_is_indexed(people):
+    assert _found(people, "kubernetes AND terraform") == ["ada@example.com"]
+    assert sorted(_found(people, "kubernetes")) == ["ada@example.com", "cy@example.com"]
+    assert _found(people, '"data engineer"') == ["ada@example.com"]
+    assert _found(people, "pyth*") == ["ada@example.com"]
+    _assert_index_in_sync(people)
+
+def test_upsert_reindexes_the_changed_columns(people):
+    _add(people, "Ada", "ada@example.com", "Rust, Go", "Systems programmer")
+    assert _found(people, "terraform") == []
+    assert _found(people, "rust") == ["ada@example.com"]
+    _assert_index_in_sync(people)
+
+def test_deleted_candidate_leaves_the_index(people):
+    with people.transaction() as cursor:
+        cursor.execute("DELETE FROM candidates WHERE email = 'cy@example.com'")
+    assert _found(people, "java") == []
+    _assert_index_in_sync(people)
+
+def test_merged_candidate_leaves_the_index(people):
+    ids = {row['email']: row['id'] for row in
+           people.get_db_connection().execute("SELECT id, email FROM candidates").fetchall()}
+    with people.transaction() as cursor:
+        people._merge_candidate(cursor, ids["cy@example.com"], ids["ada@example.com"])
+    assert _found(people, "kubernetes") == ["ada@example.com"]
+    _assert_index_in_sync(people)
+
+@pytest.mark.parametrize("query, expected", [
+    ("C++", ["bob@example.com"]),
+    ("node.js", ["bob@example.com"]),
+    ("ci/cd", ["cy@example.com"]),
+    ('"unbalanced', []),
+    ("AND", []),
+])
+def test_invalid_syntax_is_searched_as_literal_words(people, query, expected):
+    assert _found(people, query) == expected
+
+def test_literal_query_keeps_operators_between_words():
+    from utils import database
+    assert database._literal_search_query("c++ AND node.js") == '"c++" AND "node.js"'
+    assert database._literal_search_query("AND java OR") == '"AND" "java" "OR"'
+
+def test_rebuild_keeps_results(people):
+    people.optimize_search_index(rebuild=True)
+    assert _found(people, "kubernetes AND terraform") == ["ada@example.com"]
+    _assert_index_in_sync(people)
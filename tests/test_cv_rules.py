@@ -0,0 +1,63 @@
+"""Rule-based contact details and sections (utils/cv_rules.py); the email is the candidate upsert key."""
+import pytest
+from utils import cv_rules
+
+@pytest.mark.parametrize("raw, expected", [
+    ("Jane.Doe@Example.COM", "jane.doe@example.com"),
+    ("mailto:jane@example.com", "jane@example.com"),
+    ("<jane@example.com>.", "jane@example.com"),
+    ("jane@localhost", None),
+    ("", None),
+])
+def test_normalize_email(raw, expected):
+    assert cv_rules.normalize_email(raw) == expected
+
+def test_extract_email_prefers_the_labeled_address():
+    text = "Jane Doe\nReferee: boss@acme.com\nEmail: Jane.Doe@Example.com"
+    assert cv_rules.extract_email(text) == "jane.doe@example.com"
+    assert cv_rules.extract_email("Contact me at JANE@EXAMPLE.COM.") == "jane@example.com"
+    assert cv_rules.extract_email("no address here") is None
+
+@pytest.mark.parametrize("raw, expected", [
+    ("+1 (465) 358-7000", "+14653587000"),
+    ("+44 (0) 20 7946 0958", "+442079460958"),
+    ("0044 (0)20 7946 0958", "+442079460958"),
+    ("(020) 7946 0958", "02079460958"),
+    ("415.555.0100", "4155550100"),
+    ("12345", None),
+])
+def test_normalize_phone(raw, expected):
+    assert cv_rules.normalize_phone(raw) == expected
+
+def test_extract_phone():
+    assert cv_rules.extract_phone("Jane Doe\nMobile: +44 (0) 7700 900123") == "+447700900123"
+    assert cv_rules.extract_phone("Jane Doe\njane@example.com | 415 555 0100") == "4155550100"
+    # Zip codes, ID numbers and year ranges are not phones without a label
+    assert cv_rules.extract_phone("Jane Doe\nSan Francisco 94103-1234\n2013 - 2015") is None
+
+@pytest.mark.parametrize("text, expected", [
+    ("Name: Jane Doe\nEngineer", "Jane Doe"),
+    ("New York\nJohn Smith\njohn@example.com", None),
+    ("San Francisco Bay Area\nJane Doe", None),
+    ("Jane Doe\nSoftware Engineer", None),
+])
+def test_extract_name_only_trusts_a_label(text, expected):
+    assert cv_rules.extract_name(text) == expected
+
+def test_extract_contact_fields_leaves_unlabeled_name_to_the_llm():
+    fields = cv_rules.extract_contact_fields("New York\nJohn Smith\nJOHN@example.com\n+1 212 555 0199\n\nExperience\nAcme")
+    assert fields == {"name": None, "email": "john@example.com", "phone": "+12125550199"}
+
+def test_find_sections():
+    text = ("Jane Doe\njane@example.com\n\nProfessional Summary:\nBackend engineer\n"
+            "Skills: Python, SQL\nExperience\nAcme 2017 - 2020\nTech Stack\nKafka\nEducation\nBSc")
+    assert cv_rules.find_sections(text) == {
+        "header": "Jane Doe\njane@example.com",
+        "summary": "Backend engineer",
+        "skills": "Python, SQL\nKafka",
+        "experience": "Acme 2017 - 2020",
+        "education": "BSc",
+    }
+
+def test_find_sections_without_headings_is_all_header():
+    assert cv_rules.find_sections("Jane Doe\nSome text") == {"header": "Jane Doe\nSome text"}
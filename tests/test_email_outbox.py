@@ -0,0 +1,58 @@
+"""Leasing of queued interview emails (database.claim_outbox_emails / record_outbox_results)."""
+import pytest
+
+LEASE = 300
+
+@pytest.fixture
+def outbox(db):
+    """Three shortlisted candidates of one JD with their interview emails queued; yields the JD id."""
+    jd_id = db.add_job_description("Engineer", "original", "summary")
+    keys = ("name", "email", "phone", "cv_filename", "cv_text", "skills", "experience", "education")
+    ids = db.add_candidates_bulk(
+        dict(zip(keys, (f"Candidate {i}", f"candidate{i}@example.com", None, f"C{i}.pdf", "cv", "", "", "")))
+        for i in range(3)
+    )
+    db.add_matches_bulk((jd_id, candidate_id, 90, True, None, None) for candidate_id in ids.values())
+    assert db.enqueue_interview_emails(jd_id, "Engineer") == 3
+    assert db.enqueue_interview_emails(jd_id, "Engineer") == 0 # Already queued
+    return jd_id
+
+def test_claim_leases_due_emails_once(db, outbox):
+    claimed = db.claim_outbox_emails("a", 2, LEASE, 3, now=1000)
+    assert [row['attempts'] for row in claimed] == [1, 1]
+    rest = db.claim_outbox_emails("b", 10, LEASE, 3, now=1000)
+    assert len(rest) == 1 and rest[0]['id'] not in {row['id'] for row in claimed}
+    assert db.claim_outbox_emails("c", 10, LEASE, 3, now=1000) == []
+
+def test_expired_lease_is_reclaimed(db, outbox):
+    first = db.claim_outbox_emails("a", 10, LEASE, 3, now=1000)
+    assert db.claim_outbox_emails("b", 10, LEASE, 3, now=1000 + LEASE - 1) == []
+    reclaimed = db.claim_outbox_emails("b", 10, LEASE, 3, now=1000 + LEASE + 1)
+    assert {row['id'] for row in reclaimed} == {row['id'] for row in first}
+    assert {row['attempts'] for row in reclaimed} == {2}
+
+def test_expired_lease_on_last_attempt_fails_the_email(db, outbox):
+    now = 1000
+    for _ in range(3):
+        assert len(db.claim_outbox_emails("a", 10, LEASE, 3, now=now)) == 3
+        now += LEASE + 1
+    assert db.claim_outbox_emails("b", 10, LEASE, 3, now=now) == []
+    assert db.get_outbox_summary(outbox) == {"failed": 3}
+    assert {row['last_error'] for row in db.get_failed_outbox_emails(outbox)} == {"Lease expired on the last attempt"}
+
+def test_results_of_a_lost_lease_are_ignored(db, outbox):
+    stale = db.claim_outbox_emails("a", 10, LEASE, 3, now=1000)
+    taken_over = db.claim_outbox_emails("b", 10, LEASE, 3, now=1000 + LEASE + 1)
+    ids = [row['id'] for row in stale]
+    db.record_outbox_results("a", ids[:1], [(ids[1], "451", 0)], [(ids[2], "550")])
+    assert db.get_outbox_summary(outbox) == {"sending": 3}
+    db.record_outbox_results("b", [row['id'] for row in taken_over], [], [])
+    assert db.get_outbox_summary(outbox) == {"sent": 3}
+    emailed = db.get_db_connection().execute("SELECT COUNT(*) FROM matches WHERE interview_email_sent").fetchone()[0]
+    assert emailed == 3
+
+def test_retry_waits_until_due(db, outbox):
+    claimed = db.claim_outbox_emails("a", 10, LEASE, 3, now=1000)
+    db.record_outbox_results("a", [], [(row['id'], "451", 2000) for row in claimed], [])
+    assert db.claim_outbox_emails("a", 10, LEASE, 3, now=1999) == []
+    assert len(db.claim_outbox_emails("a", 10, LEASE, 3, now=2000)) == 3
@@ -0,0 +1,92 @@
+"""The pooled batch sender (utils/email_sender.py) and the outbox worker, against a local SMTP stand-in."""
+import pytest
+from utils import config, email_sender, email_worker
+
+def _messages(count):
+    return [(i, email_sender.build_interview_email(f"candidate{i}@example.com", f"Candidate {i}", "Engineer"))
+            for i in range(count)]
+
+def _send(messages, **options):
+    results = {}
+    options = {"rate": 0, "max_retries": 0, "retry_backoff": 0, **options}
+    connections = email_sender.send_messages(
+        messages, on_result=lambda key, error, transient: results.__setitem__(key, (error, transient)), **options
+    )
+    return connections, results
+
+def test_connections_are_reused(smtp_server):
+    connections, results = _send(_messages(20), pool_size=2)
+    assert all(error is None for error, _ in results.values()) and len(results) == 20
+    assert connections == smtp_server.connections <= 2
+    assert smtp_server.delivered == 20
+
+def test_connection_is_replaced_after_max_per_connection(smtp_server):
+    connections, results = _send(_messages(12), pool_size=1, max_per_connection=5)
+    assert len(results) == 12
+    assert connections == smtp_server.connections == 3
+
+def test_transient_451_is_retried_on_the_same_connection(smtp_server):
+    smtp_server.fail_every = 4
+    connections, results = _send(_messages(12), pool_size=1, max_retries=3)
+    assert all(error is None for error, _ in results.values())
+    assert smtp_server.delivered == 12
+    assert connections == smtp_server.connections == 1
+
+def test_transient_451_reported_once_retries_run_out(smtp_server):
+    smtp_server.fail_every = 1
+    _, results = _send(_messages(2), pool_size=1, max_retries=1)
+    assert all(error and transient for error, transient in results.values())
+    assert smtp_server.recipients == 4
+
+def test_permanent_rejection_is_not_retried(smtp_server):
+    smtp_server.reject_substring = "candidate1@"
+    _, results = _send(_messages(3), pool_size=1, max_retries=3)
+    error, transient = results[1]
+    assert error and not transient
+    assert results[0] == (None, False) and results[2] == (None, False)
+    assert smtp_server.recipients == 3
+
+def test_failed_login_stops_the_batch(smtp_server, monkeypatch):
+    smtp_server.auth = smtp_server.reject_login = True
+    monkeypatch.setattr(email_sender, "SMTP_AUTH", True)
+    with pytest.raises(email_sender.SMTPUnavailable) as raised:
+        _send(_messages(30), pool_size=3, max_retries=3)
+    assert sorted(raised.value.unsent) == list(range(30))
+    assert smtp_server.connections == 1 # One failed login, not one per message
+
+def test_refused_connection_stops_the_batch(smtp_server):
+    smtp_server.stop()
+    with pytest.raises(email_sender.SMTPUnavailable) as raised:
+        _send(_messages(5), pool_size=2)
+    assert len(raised.value.unsent) == 5
+
+def _queue_emails(db, count):
+    jd_id = db.add_job_description("Engineer", "original", "summary")
+    keys = ("name", "email", "phone", "cv_filename", "cv_text", "skills", "experience", "education")
+    ids = db.add_candidates_bulk(
+        dict(zip(keys, (f"Candidate {i}", f"candidate{i}@example.com", None, f"C{i}.pdf", "cv", "", "", "")))
+        for i in range(count)
+    )
+    db.add_matches_bulk((jd_id, candidate_id, 90, True, None, None) for candidate_id in ids.values())
+    assert db.enqueue_interview_emails(jd_id, "Engineer") == count
+    return jd_id
+
+def test_worker_hands_back_emails_when_login_fails(db, smtp_server, monkeypatch):
+    jd_id = _queue_emails(db, 5)
+    smtp_server.auth = smtp_server.reject_login = True
+    monkeypatch.setattr(email_sender, "SMTP_AUTH", True)
+    monkeypatch.setattr(email_sender, "EMAIL_RATE_PER_SECOND", 0)
+    with pytest.raises(email_sender.SMTPUnavailable):
+        email_worker.process_batch("worker-1")
+    assert db.get_outbox_summary(jd_id) == {"queued": 5}
+    attempts = db.get_db_connection().execute("SELECT DISTINCT attempts FROM email_outbox").fetchall()
+    assert [row[0] for row in attempts] == [0]
+    assert smtp_server.connections == 1 # One failed login, not one per message
+
+def test_worker_sends_and_records_outcomes(db, smtp_server, monkeypatch):
+    jd_id = _queue_emails(db, 6)
+    smtp_server.reject_substring = "candidate2@"
+    monkeypatch.setattr(email_sender, "EMAIL_RATE_PER_SECOND", 0)
+    assert email_worker.process_batch("worker-1") == 6
+    assert db.get_outbox_summary(jd_id) == {"sent": 5, "failed": 1}
+    assert smtp_server.connections <= config.EMAIL_POOL_SIZE
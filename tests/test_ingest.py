@@ -0,0 +1,48 @@
+"""Incremental ingestion bookkeeping (utils/ingest.scan_folder) and the watcher's back-off on failing files."""
+import os
+import pytest
+from utils import config, ingest
+
+@pytest.fixture
+def folder(db, tmp_path):
+    folder = tmp_path / "resumes"
+    folder.mkdir()
+    (folder / "a.pdf").write_bytes(b"%PDF-1.4 a")
+    return str(folder)
+
+def _record(db, folder, status, content_hash="hash-a", candidate_id=None):
+    path = os.path.join(folder, "a.pdf")
+    stat = os.stat(path)
+    db.record_ingest_result(path, stat.st_size, stat.st_mtime, content_hash, status, "error", candidate_id)
+    return db.get_ledger_entries(folder)[path]
+
+def test_failures_of_the_same_content_are_counted(db, folder):
+    assert _record(db, folder, "failed")['attempts'] == 1
+    assert _record(db, folder, "failed")['attempts'] == 2
+    assert _record(db, folder, "failed", content_hash="hash-b")['attempts'] == 1
+    assert _record(db, folder, "done")['attempts'] == 0
+
+def test_one_off_scans_always_retry_failed_files(db, folder):
+    for _ in range(5):
+        _record(db, folder, "failed")
+    assert ingest.scan_folder(folder)["to_process"] == ["a.pdf"]
+
+def test_watcher_backs_off_then_gives_up(db, folder, monkeypatch):
+    monkeypatch.setattr(config, "INGEST_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(config, "INGEST_RETRY_SECONDS", 3600)
+    _record(db, folder, "failed")
+    scan = ingest.scan_folder(folder, retry_failed=False)
+    assert scan["to_process"] == [] and scan["held_back"] == {"a.pdf": 1}
+
+    monkeypatch.setattr(config, "INGEST_RETRY_SECONDS", 0)
+    assert ingest.scan_folder(folder, retry_failed=False)["to_process"] == ["a.pdf"]
+    _record(db, folder, "failed")
+    _record(db, folder, "failed")
+    assert ingest.scan_folder(folder, retry_failed=False)["held_back"] == {"a.pdf": 3}
+
+def test_changed_file_is_retried_after_giving_up(db, folder, monkeypatch):
+    monkeypatch.setattr(config, "INGEST_MAX_ATTEMPTS", 1)
+    _record(db, folder, "failed")
+    path = os.path.join(folder, "a.pdf")
+    os.utime(path, (os.stat(path).st_atime, os.stat(path).st_mtime - 10))
+    assert ingest.scan_folder(folder, retry_failed=False)["to_process"] == ["a.pdf"]
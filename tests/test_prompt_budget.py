@@ -0,0 +1,88 @@
+"""Cleaning and packing of CV text for the extraction prompt (utils/prompt_budget.py)."""
+from utils import prompt_budget
+
+THREE_ROLE_CV = """Jane Doe
+jane.doe@example.com | +1 415 555 0100
+
+Summary
+Backend engineer with a decade of experience building data platforms.
+
+Experience
+Senior Engineer, Acme Corp
+2017 - 2020
+Responsibilities:
+- Led the migration of batch pipelines to streaming
+- Mentored four engineers
+- Built data pipelines in Python
+
+Engineer, Globex
+2014 - 2017
+Responsibilities:
+- Designed the billing service API
+- Built data pipelines in Python
+
+Junior Engineer, Initech
+2010 - 2014
+Responsibilities:
+- Maintained reporting jobs
+- Wrote integration tests
+
+Education
+BSc Computer Science, State University, 2010
+"""
+
+def _paged_cv(pages, lines_per_page=30):
+    """A CV spread over pages that each start with a running header and end with a page footer."""
+    lines = []
+    for page in range(1, pages + 1):
+        lines.append("Jane Doe - Curriculum Vitae")
+        lines.extend(f"- Delivered project {page}.{item} on time" for item in range(lines_per_page))
+        lines.append(f"Jane Doe - CV - Page {page} of {pages}")
+        lines.append(str(page))
+    return "\n".join(lines)
+
+def test_small_cv_under_budget_keeps_dates_and_subheadings():
+    text, report = prompt_budget.fit_cv_text(THREE_ROLE_CV, 1500)
+    for line in ("2017 - 2020", "2014 - 2017", "2010 - 2014"):
+        assert line in text
+    assert text.count("Responsibilities:") == 3
+    assert report["boilerplate_lines"] == 0
+    assert report["dropped"] == {}
+
+def test_repeated_long_line_kept_under_budget():
+    text, removed = prompt_budget.strip_boilerplate(THREE_ROLE_CV)
+    assert text.count("Built data pipelines in Python") == 2
+    assert removed == 0
+
+def test_repeated_long_line_dropped_when_asked():
+    text, removed = prompt_budget.strip_boilerplate(THREE_ROLE_CV, drop_duplicates=True)
+    assert text.count("Built data pipelines in Python") == 1
+    assert text.count("Responsibilities:") == 1
+    assert "2014 - 2017" in text # Short lines are never treated as duplicates
+    assert removed == 3
+
+def test_page_furniture_removed():
+    text, removed = prompt_budget.strip_boilerplate(_paged_cv(3))
+    assert text.count("Jane Doe - Curriculum Vitae") == 1
+    assert text.count("Jane Doe - CV - Page") == 1
+    assert "\n2\n" not in text and not text.endswith("\n3")
+    assert removed == 2 + 2 + 3
+
+def test_unevenly_repeated_line_is_not_a_header():
+    lines = ["Responsibilities:"] + ["- item"] * 20 + ["Responsibilities:"] + ["- item"] * 60 + ["Responsibilities:"]
+    text, removed = prompt_budget.strip_boilerplate("\n".join(lines))
+    assert text.count("Responsibilities:") == 3
+
+def test_over_budget_cv_is_packed_and_reported():
+    cv = THREE_ROLE_CV + "\nProjects\n" + "\n".join(f"- Side project number {i} with a long description" for i in range(200))
+    text, report = prompt_budget.fit_cv_text(cv, 300)
+    assert report["tokens"] > 300
+    assert report["packed_tokens"] <= 300
+    assert "projects" in report["dropped"]
+    assert "Jane Doe" in text and "2017 - 2020" in text
+
+def test_zero_budget_means_unlimited():
+    cv = THREE_ROLE_CV * 20
+    text, report = prompt_budget.fit_cv_text(cv, 0)
+    assert report["dropped"] == {}
+    assert text.count("Built data pipelines in Python") == 40
@@ -0,0 +1,41 @@
+"""Guards the dashboard's hot queries against plan regressions (see database.check_query_plans)."""
+import random
+import pytest
+from utils import database
+
+@pytest.fixture
+def populated_db(db):
+    keys = ("name", "email", "phone", "cv_filename", "cv_text", "skills", "experience", "education")
+    ids = database.add_candidates_bulk(
+        dict(zip(keys, (f"Candidate {i}", f"candidate{i}@example.com", "555-0100", f"C{i}.pdf",
+                        "cv text", "python, sql", "5 years backend", "BSc")))
+        for i in range(2000)
+    )
+    rng = random.Random(0)
+    for jd in range(5):
+        jd_id = database.add_job_description(f"Role {jd}", "original", "summary")
+        database.add_matches_bulk(
+            (jd_id, candidate_id, score, score is not None and score >= 75, None, None)
+            for candidate_id in ids.values()
+            for score in [rng.choice([None, rng.randint(0, 100)])]
+        )
+    with database.transaction() as cursor:
+        cursor.execute("UPDATE matches SET interview_email_sent = TRUE WHERE is_shortlisted AND id % 10 != 0")
+    database.get_db_connection().execute("ANALYZE")
+
+def test_fresh_database_is_fully_migrated(populated_db):
+    assert database.get_schema_version() == len(database.MIGRATIONS)
+
+def test_hot_queries_use_their_indexes(populated_db):
+    assert database.check_query_plans() == {}
+
+@pytest.mark.parametrize("index, query", [
+    ("idx_job_descriptions_timestamp", "get_all_jds"),
+    ("idx_matches_jd_score", "get_candidates_page"),
+    ("idx_email_outbox_match", "get_outbox_summary"),
+    ("idx_email_outbox_claim", "claim_outbox_emails"),
+])
+def test_dropped_index_is_reported(populated_db, index, query):
+    with database.transaction() as cursor:
+        cursor.execute(f"DROP INDEX {index}")
+    assert query in database.check_query_plans()
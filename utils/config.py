@@ -7,14 +7,65 @@ load_dotenv() # Load environment variables from a .env file if it exists
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 RESUME_FOLDER = os.path.join(BASE_DIR, "resumes")
 DB_PATH = os.path.join(BASE_DIR, "data", "recruitment.db")
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", 64000)) # Page cache per connection
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 30000)) # Wait this long for a lock before "database is locked"
+EMBEDDING_DIR = os.path.join(BASE_DIR, "data", "embeddings") # Memory-mapped embedding matrices
 
 # --- Ollama Settings ---
-OLLAMA_BASE_URL = "http://localhost:11434" # Default Ollama API URL
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434") # Default Ollama API URL (sharded workers override it per process)
 # OLLAMA_MODEL = "llama3:latest"  # Or "mistral:latest", etc. Choose the model you have pulled
 OLLAMA_MODEL = "llama3.2:latest"  # Using mistral as an example
+# Per-task models (see utils/model_router.py); each defaults to OLLAMA_MODEL. A small quantized model can do the
+# routine work while OLLAMA_ESCALATION_MODEL re-does only low-confidence results.
+OLLAMA_JD_MODEL = os.getenv("OLLAMA_JD_MODEL", OLLAMA_MODEL) # JD summarization
+OLLAMA_EXTRACT_MODEL = os.getenv("OLLAMA_EXTRACT_MODEL", OLLAMA_MODEL) # CV field extraction
+OLLAMA_SCORE_MODEL = os.getenv("OLLAMA_SCORE_MODEL", OLLAMA_MODEL) # First-pass match scoring
+OLLAMA_ESCALATION_MODEL = os.getenv("OLLAMA_ESCALATION_MODEL", "") # Larger model for invalid JSON and borderline scores ("" = never escalate)
+OLLAMA_EMBED_MODEL = os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text") # Local embedding model for semantic search
+EMBEDDINGS_ENABLED = os.getenv("EMBEDDINGS_ENABLED", "true").lower() == "true" # Index candidates/JDs as they are stored
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m") # How long Ollama keeps the model loaded between requests
+OLLAMA_HEALTH_TTL = int(os.getenv("OLLAMA_HEALTH_TTL", 60)) # Seconds a successful health check is trusted before re-probing
+OLLAMA_REQUEST_TIMEOUT = int(os.getenv("OLLAMA_REQUEST_TIMEOUT", 300)) # Seconds before an LLM request is abandoned
+CV_PROMPT_TOKEN_BUDGET = int(os.getenv("CV_PROMPT_TOKEN_BUDGET", 1500)) # Estimated tokens of CV text per extraction prompt; longer CVs are packed by section (0 = no limit)
+
+# --- Pipeline Concurrency Settings ---
+# Ollama serves up to OLLAMA_NUM_PARALLEL requests per model at once; match it so the server stays busy.
+LLM_WORKERS = int(os.getenv("LLM_WORKERS", os.getenv("OLLAMA_NUM_PARALLEL", 4))) # Threads issuing LLM calls
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", os.cpu_count() or 1)) # Processes parsing PDFs (1 = parse in a background thread)
+
+# --- Background Job Settings ---
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 2)) # Seconds a job worker sleeps when no job is pending
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", 10)) # Seconds between a running job's heartbeats
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", 120)) # A running job silent for this long is taken over by another worker
+
+# --- Sharded Ingestion Settings ---
+# Workers share the SQLite file, so they run on the machine that holds it; each drives its own Ollama host.
+WORK_BATCH_SIZE = int(os.getenv("WORK_BATCH_SIZE", 16)) # Resume tasks a worker leases per claim
+WORK_LEASE_SECONDS = float(os.getenv("WORK_LEASE_SECONDS", 600)) # A leased task not renewed for this long is claimed by another worker
+WORK_HEARTBEAT_INTERVAL = float(os.getenv("WORK_HEARTBEAT_INTERVAL", 30)) # Seconds between lease renewals while a batch runs
+WORK_MAX_ATTEMPTS = int(os.getenv("WORK_MAX_ATTEMPTS", 3)) # Claims per task before it is marked failed
+WORK_POLL_INTERVAL = float(os.getenv("WORK_POLL_INTERVAL", 5)) # Seconds a task worker sleeps when no task is due
+
+# --- Folder Watch Settings ---
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", 3)) # Failed ingestions of the same file content before the watcher stops retrying it
+INGEST_RETRY_SECONDS = float(os.getenv("INGEST_RETRY_SECONDS", 60)) # Wait before the watcher retries a failed file; doubles with each failure
+
+# --- Metrics Settings ---
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true" # Record per-stage timings and token counts of each run
+METRICS_KEEP_RUNS = int(os.getenv("METRICS_KEEP_RUNS", 200)) # Runs of each kind kept in run_metrics; older ones are dropped
+METRICS_PROMETHEUS_FILE = os.getenv("METRICS_PROMETHEUS_FILE", os.path.join(BASE_DIR, "data", "metrics.prom")) # Text-format export rewritten after every run ("" to disable)
+
+# --- Near-Duplicate Settings ---
+NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "true").lower() == "true" # Reuse a stored candidate's extraction for near-identical CVs
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", 0.9)) # Estimated Jaccard similarity (of word 5-shingles) that counts as the same CV
 
 # --- Recruitment Logic Settings ---
 MATCH_THRESHOLD = 75 # Score out of 100 needed to shortlist
+MATCH_ESCALATION_BAND = int(os.getenv("MATCH_ESCALATION_BAND", 10)) # Scores this close to MATCH_THRESHOLD are re-scored by OLLAMA_ESCALATION_MODEL
+MATCH_BATCH_SIZE = int(os.getenv("MATCH_BATCH_SIZE", 8)) # Candidates scored per LLM call (1 = one call per candidate)
+PREFILTER_ENABLED = os.getenv("PREFILTER_ENABLED", "true").lower() == "true" # Lexically pre-rank candidates before LLM scoring
+PREFILTER_TOP_K = int(os.getenv("PREFILTER_TOP_K", 50)) # Best N candidates per run sent to the LLM (0 = no cap)
+PREFILTER_MIN_SCORE = float(os.getenv("PREFILTER_MIN_SCORE", 0.0)) # BM25 score a candidate must exceed to reach the LLM
 
 # --- Email Settings (IMPORTANT: Use environment variables or a secure method in a real app) ---
 # Create a .env file in the root directory (hackathon-recruiter-app/)
@@ -28,10 +79,26 @@ EMAIL_ADDRESS = os.getenv("EMAIL_ADDRESS", "default_email@example.com") # Fallba
 EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD", "default_password") # Fallback default
 SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com") # Example for Gmail
 SMTP_PORT = int(os.getenv("SMTP_PORT", 587)) # Example for Gmail (TLS)
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() == "true" # STARTTLS after connecting (disable for a local test server)
+SMTP_AUTH = os.getenv("SMTP_AUTH", "true").lower() == "true" # Log in with EMAIL_ADDRESS/EMAIL_PASSWORD (disable for a local test server)
+SMTP_TIMEOUT = int(os.getenv("SMTP_TIMEOUT", 30)) # Seconds before a stalled SMTP connection is abandoned
+EMAIL_POOL_SIZE = int(os.getenv("EMAIL_POOL_SIZE", 3)) # Concurrent SMTP connections for batch sends
+EMAIL_RATE_PER_SECOND = float(os.getenv("EMAIL_RATE_PER_SECOND", 5)) # Messages per second across the pool (0 = unlimited)
+EMAIL_MAX_PER_CONNECTION = int(os.getenv("EMAIL_MAX_PER_CONNECTION", 50)) # Messages per SMTP session before reconnecting
+EMAIL_MAX_RETRIES = int(os.getenv("EMAIL_MAX_RETRIES", 3)) # Retries for transient (4xx / dropped connection) failures
+EMAIL_RETRY_BACKOFF = float(os.getenv("EMAIL_RETRY_BACKOFF", 2.0)) # Seconds before the first retry, doubled each time
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", 20)) # Emails the outbox worker leases per claim
+EMAIL_OUTBOX_LEASE_SECONDS = int(os.getenv("EMAIL_OUTBOX_LEASE_SECONDS", 300)) # After this, a crashed worker's emails are claimed again
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", 6)) # Deliveries attempted before an outbox email is marked failed
+EMAIL_OUTBOX_RETRY_BACKOFF = float(os.getenv("EMAIL_OUTBOX_RETRY_BACKOFF", 60)) # Seconds before an outbox retry, doubled per attempt
+EMAIL_WORKER_POLL_INTERVAL = float(os.getenv("EMAIL_WORKER_POLL_INTERVAL", 5)) # Seconds the worker sleeps when the outbox is empty
 
 # --- Ensure necessary folders exist ---
-os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-os.makedirs(RESUME_FOLDER, exist_ok=True)
+def ensure_directories():
+    """Creates the data and resume folders. Called by entry points, not at import."""
+    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+    os.makedirs(RESUME_FOLDER, exist_ok=True)
+    os.makedirs(EMBEDDING_DIR, exist_ok=True)
 
-print(f"Resume Folder: {RESUME_FOLDER}")
-print(f"Database Path: {DB_PATH}")
\ No newline at end of file
+    print(f"Resume Folder: {RESUME_FOLDER}")
+    print(f"Database Path: {DB_PATH}")
\ No newline at end of file
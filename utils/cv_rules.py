@@ -0,0 +1,163 @@
+import re
+
+# Deterministic extraction of what a resume states verbatim: contact details and section
+# boundaries. cv_agent runs this before the LLM and only asks the model for what it can't fill,
+# so the model generates fewer tokens and the email used as the candidate key is normalized
+# the same way on every run.
+
+EMAIL_REGEX = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}")
+PHONE_REGEX = re.compile(r"(?:\+|\b00)?\(?\d[\d\s().\-/]{5,}\d")
+YEAR_RANGE_REGEX = re.compile(r"^\(?(?:19|20)\d{2}\)?\s*[-–/]\s*\(?(?:19|20)\d{2}\)?$") # "(2013-2015)", not a phone
+LABEL_REGEX = re.compile(r"^\s*(?P<label>[A-Za-z][A-Za-z .-]{0,24}?)\s*[:|]\s*(?P<value>.*)$")
+
+EMAIL_LABELS = {"email", "e-mail", "mail", "email address"}
+PHONE_LABELS = {"phone", "tel", "telephone", "mobile", "cell", "phone number", "mobile number", "contact number"}
+NAME_LABELS = {"name", "full name", "candidate name"}
+HEADER_LINES = 12 # A labeled name, and without section headings an unlabeled phone, is looked for this far down
+
+# Section -> headings that start it (compared lower-cased, without a trailing colon)
+SECTION_HEADINGS = {
+    "summary": ("summary", "profile", "professional summary", "about me", "objective", "career objective"),
+    "experience": ("experience", "work experience", "professional experience", "employment", "employment history",
+                   "work history", "career history"),
+    "education": ("education", "academic background", "education and training", "academic qualifications",
+                  "qualifications"),
+    "skills": ("skills", "technical skills", "key skills", "core competencies", "competencies", "tech stack",
+               "technologies", "tools"),
+    "projects": ("projects", "key projects", "personal projects"),
+    "certifications": ("certifications", "certificates", "licenses", "courses"),
+    "other": ("achievements", "awards", "publications", "languages", "interests", "hobbies", "references",
+              "volunteering"),
+}
+_HEADING_TO_SECTION = {heading: section for section, headings in SECTION_HEADINGS.items() for heading in headings}
+
+def _heading(line):
+    """Returns (section, text after an inline "Heading: ...") if the line starts a section, else None."""
+    stripped = line.strip()
+    section = _HEADING_TO_SECTION.get(stripped.rstrip(":").strip().lower())
+    if section:
+        return section, ""
+    labeled = LABEL_REGEX.match(stripped)
+    if labeled and labeled.group("label").lower() in _HEADING_TO_SECTION:
+        return _HEADING_TO_SECTION[labeled.group("label").lower()], labeled.group("value").strip()
+    return None
+
+def find_sections(text):
+    """
+    Splits resume text at its section headings. Returns {section: text} in order of appearance,
+    starting with 'header' (everything before the first heading); repeated sections, e.g. Skills
+    and Tech Stack, are joined.
+    """
+    sections = {"header": []}
+    current = "header"
+    for line in (text or "").splitlines():
+        heading = _heading(line)
+        if heading:
+            current, inline = heading
+            sections.setdefault(current, [])
+            if inline:
+                sections[current].append(inline)
+        elif line.strip():
+            sections[current].append(line.strip())
+    return {section: "\n".join(lines) for section, lines in sections.items() if lines or section == "header"}
+
+def normalize_email(email):
+    """Lower-cases an address and strips mailto: and trailing punctuation, so the same person maps to one key."""
+    if not email:
+        return None
+    email = email.strip().strip("<>.,;").lower()
+    if email.startswith("mailto:"):
+        email = email[len("mailto:"):]
+    return email if EMAIL_REGEX.fullmatch(email) else None
+
+def normalize_phone(phone):
+    """
+    Reduces a phone number to digits with a leading + when an international prefix was given
+    ("+1 (465) 358-7000" -> "+14653587000"), dropping a trunk "(0)" written after one
+    ("+44 (0) 20 7946 0958" -> "+442079460958"). Returns None for strings with 7-15 digits missing.
+    """
+    if not phone:
+        return None
+    phone = phone.strip()
+    if phone.startswith(("+", "00")):
+        phone = re.sub(r"\(\s*0\s*\)", "", phone)
+    digits = re.sub(r"\D", "", phone)
+    international = phone.startswith("+")
+    if phone.startswith("00"):
+        digits, international = digits[2:], True
+    if not 7 <= len(digits) <= 15:
+        return None
+    return ("+" if international else "") + digits
+
+def _labeled(lines, labels):
+    """Returns the values of 'Label: value' lines whose label is one of labels."""
+    for line in lines:
+        match = LABEL_REGEX.match(line)
+        if match and match.group("label").strip().lower() in labels:
+            yield match.group("value").strip()
+
+def _formatted_like_phone(candidate):
+    """An unlabeled number passes as a phone only with an international prefix or 3+ digit groups ("415 555 0100")."""
+    return candidate.startswith("+") or candidate.startswith("00") or len(re.findall(r"\d+", candidate)) >= 3
+
+def _phones_in(line, labeled=True):
+    for match in PHONE_REGEX.finditer(line):
+        candidate = match.group(0).strip()
+        # Zip codes ("94103-1234") and ID numbers are digit runs too; without a label they need phone formatting
+        if not YEAR_RANGE_REGEX.match(candidate) and (labeled or _formatted_like_phone(candidate)):
+            phone = normalize_phone(candidate)
+            if phone:
+                yield phone
+
+def extract_email(text):
+    """Returns the labeled email address, or else the first one in the text, normalized."""
+    lines = (text or "").splitlines()
+    for value in _labeled(lines, EMAIL_LABELS):
+        match = EMAIL_REGEX.search(value)
+        if match:
+            return normalize_email(match.group(0))
+    match = EMAIL_REGEX.search(text or "")
+    return normalize_email(match.group(0)) if match else None
+
+def extract_phone(text, header=None):
+    """
+    Returns the labeled phone number, or else the first number in the header formatted like a
+    phone (international prefix or 3+ digit groups), normalized.
+    """
+    lines = (text or "").splitlines()
+    for value in _labeled(lines, PHONE_LABELS):
+        phone = next(_phones_in(value), None)
+        if phone:
+            return phone
+    header_lines = (header.splitlines() if header is not None else lines)[:HEADER_LINES]
+    for line in header_lines:
+        if EMAIL_REGEX.search(line):
+            line = EMAIL_REGEX.sub(" ", line)
+        phone = next(_phones_in(line, labeled=False), None)
+        if phone:
+            return phone
+    return None
+
+def extract_name(text):
+    """
+    Returns the name given on a 'Name: ...' line near the top, if any. An unlabeled name is left
+    to the LLM: a header line such as "New York" or "San Francisco Bay Area" reads like a name.
+    """
+    lines = (text or "").splitlines()
+    for value in _labeled(lines[:HEADER_LINES], NAME_LABELS):
+        if value:
+            return value
+    return None
+
+def extract_contact_fields(text):
+    """
+    Extracts name, email and phone without an LLM. Returns {"name", "email", "phone"}, with None
+    for anything the rules could not find with confidence.
+    """
+    header = find_sections(text).get("header")
+    # With no section headings at all the "header" is the whole CV; the helpers cap it at HEADER_LINES
+    return {
+        "name": extract_name(text),
+        "email": extract_email(text),
+        "phone": extract_phone(text, header),
+    }
@@ -1,18 +1,67 @@
 import sqlite3
 import os
-from .config import DB_PATH
+import json
+import threading
+import time
+from contextlib import contextmanager
+from .config import DB_PATH, SQLITE_CACHE_SIZE_KB, SQLITE_BUSY_TIMEOUT_MS
+
+# One connection per thread, reused for every query that thread makes
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized_paths = set() # Databases init_database() has already migrated in this process
 
 def get_db_connection():
-    """Establishes a connection to the SQLite database."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row # Return rows as dictionary-like objects
+    """
+    Returns this thread's SQLite connection, opening it on first use.
+    The connection runs in autocommit mode; writes go through transaction().
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.path != DB_PATH:
+        conn = sqlite3.connect(DB_PATH, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+        conn.row_factory = sqlite3.Row # Return rows as dictionary-like objects
+        # WAL lets readers run alongside the single writer; NORMAL sync only fsyncs at checkpoints
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        _local.conn, _local.path = conn, DB_PATH
     return conn
 
-def setup_database():
-    """Creates the necessary tables if they don't exist."""
+def close_db_connection():
+    """Closes this thread's connection, e.g. before a worker thread exits."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+@contextmanager
+def transaction():
+    """
+    Runs the enclosed statements as one write transaction on this thread's connection,
+    committing on success and rolling back on error. Nested uses join the outer transaction.
+    """
     conn = get_db_connection()
-    cursor = conn.cursor()
+    if conn.in_transaction:
+        yield conn.cursor()
+        return
+    conn.execute("BEGIN IMMEDIATE") # Take the write lock up front instead of failing to upgrade later
+    try:
+        yield conn.cursor()
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
 
+def _add_column_if_missing(cursor, table, column, definition):
+    """Adds a column to an existing table unless it is already present."""
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in [row['name'] for row in cursor.fetchall()]:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+def _create_tables(cursor):
+    """Migration 1: the base schema, written with IF NOT EXISTS so databases from before versioning adopt it."""
     # Job Descriptions Table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS job_descriptions (
@@ -49,6 +98,8 @@ def setup_database():
             match_score INTEGER,
             is_shortlisted BOOLEAN DEFAULT FALSE,
             interview_email_sent BOOLEAN DEFAULT FALSE,
+            input_fingerprint TEXT, -- Hash of the scoring inputs (JD summary, profile, model, prompt)
+            prefilter_score REAL, -- Lexical (BM25) score from the pre-ranking stage
             timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (jd_id) REFERENCES job_descriptions (id),
             FOREIGN KEY (candidate_id) REFERENCES candidates (id),
@@ -56,160 +107,1387 @@ def setup_database():
         )
     ''')
 
-    conn.commit()
-    conn.close()
+    # Columns added after the original schema; CREATE TABLE IF NOT EXISTS won't add them to older databases
+    _add_column_if_missing(cursor, "matches", "input_fingerprint", "TEXT")
+    _add_column_if_missing(cursor, "matches", "prefilter_score", "REAL")
+
+    # Resume Cache Table (Parsed text and CV extraction keyed by the SHA-256 of the PDF bytes)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS resume_cache (
+            content_hash TEXT PRIMARY KEY,
+            cv_text TEXT NOT NULL,
+            extracted_data TEXT, -- JSON of the cv_agent result, NULL until extracted
+            extraction_model TEXT,
+            extraction_prompt_version TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Ingestion Ledger Table (One row per resume file seen in a watched folder)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ingest_ledger (
+            path TEXT PRIMARY KEY,
+            size INTEGER,
+            mtime REAL,
+            content_hash TEXT,
+            status TEXT NOT NULL, -- 'done', 'failed' or 'deleted' (tombstone)
+            error TEXT,
+            candidate_id INTEGER,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (candidate_id) REFERENCES candidates (id)
+        )
+    ''')
+
+def _add_hot_query_indexes(cursor):
+    """Migration 2: indexes serving the dashboard's hot queries (see HOT_QUERIES)."""
+    # Covering index: a JD's matches come back already ordered by score, without reading the table rows
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_matches_jd_score
+        ON matches (jd_id, match_score DESC, candidate_id, prefilter_score, is_shortlisted, interview_email_sent)
+    ''')
+    # Partial index: only the few shortlisted-but-not-emailed rows are indexed
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_matches_pending_email
+        ON matches (jd_id, candidate_id)
+        WHERE is_shortlisted = TRUE AND interview_email_sent = FALSE
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_job_descriptions_timestamp
+        ON job_descriptions (timestamp DESC)
+    ''')
+
+def _add_table_versions(cursor):
+    """
+    Migration 3: per-table write counters used to invalidate cached reads. Tables added by later
+    migrations register their own counter there, so this list stays as released.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS table_versions (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.executemany("INSERT OR IGNORE INTO table_versions (table_name) VALUES (?)",
+                       [(table,) for table in ("job_descriptions", "candidates", "matches")])
+
+def _add_email_outbox(cursor):
+    """Migration 4: durable queue of interview emails, drained by utils/email_worker.py."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS email_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            match_id INTEGER NOT NULL,
+            recipient_email TEXT NOT NULL,
+            candidate_name TEXT,
+            job_title TEXT,
+            status TEXT NOT NULL DEFAULT 'queued', -- 'queued', 'sending' (leased by a worker), 'sent' or 'failed'
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL DEFAULT 0, -- Unix time before which a queued email is not retried
+            lease_owner TEXT,
+            lease_expires_at REAL, -- A 'sending' row whose lease has expired is claimed again
+            last_error TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            sent_at DATETIME,
+            FOREIGN KEY (match_id) REFERENCES matches (id)
+        )
+    ''')
+    # At most one live (queued or in-flight) email per match, so enqueueing twice is harmless
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_email_outbox_live_match
+        ON email_outbox (match_id)
+        WHERE status IN ('queued', 'sending')
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_email_outbox_claim
+        ON email_outbox (status, next_attempt_at)
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO table_versions (table_name) VALUES ('email_outbox')")
+
+def _add_jobs(cursor):
+    """Migration 5: background processing jobs submitted by the dashboard or CLI and run by workers."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL, -- 'ingest'
+            jd_id INTEGER,
+            folder TEXT,
+            options TEXT, -- JSON of extra pipeline options
+            status TEXT NOT NULL DEFAULT 'pending', -- 'pending', 'running', 'done' or 'failed'
+            progress_done INTEGER NOT NULL DEFAULT 0,
+            progress_total INTEGER NOT NULL DEFAULT 0,
+            processed_count INTEGER,
+            message TEXT, -- Latest progress line, or the error a failed job stopped on
+            warnings INTEGER NOT NULL DEFAULT 0,
+            worker_id TEXT,
+            heartbeat_at REAL, -- Unix time; a running job with a stale heartbeat is claimed again
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            started_at DATETIME,
+            finished_at DATETIME,
+            FOREIGN KEY (jd_id) REFERENCES job_descriptions (id)
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_jd ON jobs (jd_id, id DESC)")
+    cursor.execute("INSERT OR IGNORE INTO table_versions (table_name) VALUES ('jobs')")
+
+def _add_work_tasks(cursor):
+    """Migration 6: per-resume (file, JD) tasks leased by sharded ingestion workers (utils/work_queue.py)."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS work_tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            path TEXT NOT NULL, -- Absolute path of the resume file
+            jd_id INTEGER, -- NULL to only ingest the file
+            status TEXT NOT NULL DEFAULT 'queued', -- 'queued', 'leased', 'done' or 'failed'
+            attempts INTEGER NOT NULL DEFAULT 0,
+            lease_owner TEXT,
+            lease_expires_at REAL, -- Unix time; a 'leased' task past it is claimed again
+            last_error TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            finished_at DATETIME,
+            FOREIGN KEY (jd_id) REFERENCES job_descriptions (id)
+        )
+    ''')
+    # At most one live task per file and JD, so enqueueing a folder twice is harmless
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_work_tasks_live
+        ON work_tasks (path, IFNULL(jd_id, 0))
+        WHERE status IN ('queued', 'leased')
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_work_tasks_claim ON work_tasks (status, id)")
+
+def _add_run_metrics(cursor):
+    """Migration 7: per-stage timings, token counts, retries and errors of pipeline and email runs (utils/metrics.py)."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS metric_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL, -- 'ingest' or 'email'
+            jd_id INTEGER,
+            started_at REAL NOT NULL, -- Unix time
+            seconds REAL, -- Wall time of the whole run, set when it finishes
+            FOREIGN KEY (jd_id) REFERENCES job_descriptions (id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS run_metrics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id INTEGER NOT NULL,
+            stage TEXT NOT NULL, -- Pipeline stage ('parse', 'extract', ...) or LLM call ('llm.extract', ...)
+            seconds REAL, -- NULL for samples that only count retries or errors
+            prompt_tokens INTEGER,
+            completion_tokens INTEGER,
+            retries INTEGER NOT NULL DEFAULT 0,
+            error TEXT,
+            FOREIGN KEY (run_id) REFERENCES metric_runs (id)
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_run_metrics_run ON run_metrics (run_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_metric_runs_kind ON metric_runs (kind, id)")
+    cursor.execute("INSERT OR IGNORE INTO table_versions (table_name) VALUES ('metric_runs')")
+
+def _add_model_columns(cursor):
+    """Migration 8: which model produced each candidate's extraction and each match score (utils/model_router.py)."""
+    _add_column_if_missing(cursor, "candidates", "extraction_model", "TEXT")
+    _add_column_if_missing(cursor, "matches", "score_model", "TEXT")
+
+def _add_near_duplicates(cursor):
+    """Migration 9: MinHash signatures, their LSH buckets, and every resume file linked to a candidate (utils/near_duplicates.py)."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cv_signatures (
+            candidate_id INTEGER PRIMARY KEY,
+            signature BLOB NOT NULL, -- MinHash values, uint32 each
+            FOREIGN KEY (candidate_id) REFERENCES candidates (id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cv_lsh_buckets (
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL, -- Hash of the signature's values in this band
+            candidate_id INTEGER NOT NULL,
+            PRIMARY KEY (band, bucket, candidate_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_cv_lsh_buckets_candidate ON cv_lsh_buckets (candidate_id)")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS candidate_files (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            candidate_id INTEGER NOT NULL,
+            cv_filename TEXT NOT NULL,
+            content_hash TEXT,
+            similarity REAL, -- Estimated similarity to the CV the candidate was extracted from (1.0 for that CV)
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (candidate_id) REFERENCES candidates (id),
+            UNIQUE (candidate_id, cv_filename)
+        )
+    ''')
+
+# Columns of candidates that full-text search covers, in candidates_fts column order
+SEARCH_COLUMNS = ("cv_text", "extracted_skills", "extracted_experience", "extracted_education")
+SEARCH_COLUMN_WEIGHTS = (1.0, 4.0, 2.0, 1.0) # bm25 weight per column: a skill listed in the extraction counts most
+
+def _add_candidate_search(cursor):
+    """Migration 10: an FTS5 index over each candidate's CV text and extracted fields, kept in sync by triggers."""
+    columns = ", ".join(SEARCH_COLUMNS)
+    new_values = ", ".join(f"new.{column}" for column in SEARCH_COLUMNS)
+    old_values = ", ".join(f"old.{column}" for column in SEARCH_COLUMNS)
+    # External content: the index reads column values from candidates instead of storing a second copy.
+    # '+' and '#' are part of tokens so that C++ and C# stay searchable.
+    cursor.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS candidates_fts USING fts5(
+            {columns}, content='candidates', content_rowid='id', tokenize="porter unicode61 tokenchars '+#'"
+        )
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS candidates_fts_insert AFTER INSERT ON candidates BEGIN
+            INSERT INTO candidates_fts (rowid, {columns}) VALUES (new.id, {new_values});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS candidates_fts_delete AFTER DELETE ON candidates BEGIN
+            INSERT INTO candidates_fts (candidates_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS candidates_fts_update AFTER UPDATE OF {columns} ON candidates BEGIN
+            INSERT INTO candidates_fts (candidates_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO candidates_fts (rowid, {columns}) VALUES (new.id, {new_values});
+        END
+    ''')
+    cursor.execute("INSERT INTO candidates_fts (candidates_fts) VALUES ('rebuild')") # Index existing candidates
+
+def _add_prefilter_fingerprint(cursor):
+    """Migration 11: the scoring inputs a match was last kept from the LLM with, by the lexical pre-filter."""
+    _add_column_if_missing(cursor, "matches", "prefilter_fingerprint", "TEXT")
+
+def _merge_candidate(cursor, old_id, new_id):
+    """Moves everything that references candidate old_id over to new_id and deletes old_id."""
+    cursor.execute("UPDATE ingest_ledger SET candidate_id = ? WHERE candidate_id = ?", (new_id, old_id))
+    # Matches for JDs the surviving candidate has no match for move over; the rest give way to its own
+    cursor.execute("UPDATE OR IGNORE matches SET candidate_id = ? WHERE candidate_id = ?", (new_id, old_id))
+    cursor.execute('''
+        UPDATE OR IGNORE email_outbox
+        SET match_id = (SELECT kept.id FROM matches old JOIN matches kept ON kept.jd_id = old.jd_id
+                        WHERE old.id = email_outbox.match_id AND kept.candidate_id = ?)
+        WHERE match_id IN (SELECT id FROM matches WHERE candidate_id = ?)
+    ''', (new_id, old_id))
+    cursor.execute("DELETE FROM email_outbox WHERE match_id IN (SELECT id FROM matches WHERE candidate_id = ?)", (old_id,))
+    cursor.execute("DELETE FROM matches WHERE candidate_id = ?", (old_id,))
+    cursor.execute("UPDATE OR IGNORE candidate_files SET candidate_id = ? WHERE candidate_id = ?", (new_id, old_id))
+    # The surviving candidate keeps its own near-duplicate signature, or takes over the merged one's
+    if not cursor.execute("SELECT 1 FROM cv_signatures WHERE candidate_id = ?", (new_id,)).fetchone():
+        cursor.execute("UPDATE cv_signatures SET candidate_id = ? WHERE candidate_id = ?", (new_id, old_id))
+        cursor.execute("UPDATE OR IGNORE cv_lsh_buckets SET candidate_id = ? WHERE candidate_id = ?", (new_id, old_id))
+    for table in ("candidate_files", "cv_signatures", "cv_lsh_buckets"):
+        cursor.execute(f"DELETE FROM {table} WHERE candidate_id = ?", (old_id,))
+    cursor.execute("DELETE FROM candidates WHERE id = ?", (old_id,))
+
+def _normalize_candidate_emails(cursor):
+    """
+    Migration 12: lower-cases stored candidate emails, the upsert key, to match the normalized
+    addresses extraction now produces. Candidates whose emails differed only in case are merged
+    into the most recently updated one.
+    """
+    cursor.execute("SELECT id, email FROM candidates WHERE email IS NOT NULL ORDER BY timestamp DESC, id DESC")
+    survivors = {}
+    for row in cursor.fetchall():
+        key = row['email'].strip().lower()
+        if key in survivors:
+            _merge_candidate(cursor, row['id'], survivors[key])
+        else:
+            survivors[key] = row['id']
+    cursor.execute("UPDATE candidates SET email = lower(trim(email)) WHERE email <> lower(trim(email))")
+    _bump_versions(cursor, "candidates", "matches", "email_outbox")
+
+def _add_ingest_attempts(cursor):
+    """Migration 13: consecutive failed ingestions of a ledger file's current content, so watchers back off."""
+    _add_column_if_missing(cursor, "ingest_ledger", "attempts", "INTEGER NOT NULL DEFAULT 0")
+
+def _add_outbox_match_index(cursor):
+    """Migration 14: a JD's outbox summary reads its matches' emails by match, not the whole outbox."""
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_email_outbox_match
+        ON email_outbox (match_id, status)
+    ''')
+
+# Schema migrations in order; PRAGMA user_version records how many have been applied.
+# Append new migrations at the end and never edit or reorder released ones.
+MIGRATIONS = [
+    _create_tables,
+    _add_hot_query_indexes,
+    _add_table_versions,
+    _add_email_outbox,
+    _add_jobs,
+    _add_work_tasks,
+    _add_run_metrics,
+    _add_model_columns,
+    _add_near_duplicates,
+    _add_candidate_search,
+    _add_prefilter_fingerprint,
+    _normalize_candidate_emails,
+    _add_ingest_attempts,
+    _add_outbox_match_index,
+]
+
+def get_schema_version():
+    """Returns the number of migrations applied to the database."""
+    return get_db_connection().execute("PRAGMA user_version").fetchone()[0]
+
+def setup_database():
+    """Brings the schema up to date by applying, in one transaction, every migration not yet recorded."""
+    with transaction() as cursor:
+        version = get_schema_version()
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {number}")
+    if version < len(MIGRATIONS):
+        print(f"Database schema migrated from version {version} to {len(MIGRATIONS)}.")
     print("Database setup complete.")
 
+def init_database():
+    """
+    Creates the database file and applies pending migrations, once per process and database path.
+    Entry points call this explicitly; importing this module has no side effects.
+    """
+    with _init_lock:
+        if DB_PATH in _initialized_paths:
+            return
+        os.makedirs(os.path.dirname(DB_PATH) or ".", exist_ok=True)
+        setup_database()
+        _initialized_paths.add(DB_PATH)
+
+def _bump_versions(cursor, *tables):
+    """Increments the write counters of the given tables inside the caller's transaction."""
+    cursor.executemany("UPDATE table_versions SET version = version + 1 WHERE table_name = ?",
+                       [(table,) for table in tables])
+
+def get_table_versions():
+    """Returns {table_name: version}; a changed version means the table was written since."""
+    cursor = get_db_connection().cursor()
+    cursor.execute("SELECT table_name, version FROM table_versions")
+    versions = {row['table_name']: row['version'] for row in cursor.fetchall()}
+    return versions
+
 def add_job_description(title, original_text, summary):
     """Adds a new job description and its summary to the database."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute('''
-            INSERT INTO job_descriptions (title, original_text, summary)
-            VALUES (?, ?, ?)
-        ''', (title, original_text, summary))
-        jd_id = cursor.lastrowid
-        conn.commit()
+    try:
+        with transaction() as cursor:
+            cursor.execute('''
+                INSERT INTO job_descriptions (title, original_text, summary)
+                VALUES (?, ?, ?)
+            ''', (title, original_text, summary))
+            jd_id = cursor.lastrowid
+            _bump_versions(cursor, "job_descriptions")
         return jd_id
     except sqlite3.Error as e:
         print(f"Database error adding JD: {e}")
         return None
-    finally:
-        conn.close()
 
-def add_candidate(name, email, phone, cv_filename, cv_text, skills, experience, education):
-    """Adds a candidate, ensuring email uniqueness."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute('''
-            INSERT INTO candidates (name, email, phone, cv_filename, cv_text, extracted_skills, extracted_experience, extracted_education)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(email) DO UPDATE SET
-                name=excluded.name,
-                phone=excluded.phone,
-                cv_filename=excluded.cv_filename,
-                cv_text=excluded.cv_text,
-                extracted_skills=excluded.extracted_skills,
-                extracted_experience=excluded.extracted_experience,
-                extracted_education=excluded.extracted_education,
-                timestamp=CURRENT_TIMESTAMP
-        ''', (name, email, phone, cv_filename, cv_text, skills, experience, education))
-        conn.commit()
-        # Get the ID of the inserted or updated candidate
-        cursor.execute("SELECT id FROM candidates WHERE email = ?", (email,))
-        result = cursor.fetchone()
+CANDIDATE_UPSERT_SQL = '''
+    INSERT INTO candidates (name, email, phone, cv_filename, cv_text, extracted_skills, extracted_experience, extracted_education, extraction_model)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(email) DO UPDATE SET
+        name=excluded.name,
+        phone=excluded.phone,
+        cv_filename=excluded.cv_filename,
+        cv_text=excluded.cv_text,
+        extracted_skills=excluded.extracted_skills,
+        extracted_experience=excluded.extracted_experience,
+        extracted_education=excluded.extracted_education,
+        extraction_model=excluded.extraction_model,
+        timestamp=CURRENT_TIMESTAMP
+'''
+
+def add_candidate(name, email, phone, cv_filename, cv_text, skills, experience, education, extraction_model=None):
+    """Adds a candidate, ensuring email uniqueness. Returns the ID of the inserted or updated row."""
+    try:
+        with transaction() as cursor:
+            # RETURNING gives the ID of the inserted or updated candidate without a second query
+            cursor.execute(CANDIDATE_UPSERT_SQL + " RETURNING id",
+                           (name, email, phone, cv_filename, cv_text, skills, experience, education, extraction_model))
+            result = cursor.fetchone()
+            _bump_versions(cursor, "candidates")
         return result['id'] if result else None
     except sqlite3.Error as e:
         print(f"Database error adding candidate: {e}")
         return None
-    finally:
-        conn.close()
 
+def add_candidates_bulk(candidates):
+    """
+    Upserts many candidates in one transaction. Each item is a dict with the keyword
+    arguments of add_candidate. Returns {email: candidate_id}, or None on error.
+    """
+    rows = [
+        (c.get('name'), c['email'], c.get('phone'), c['cv_filename'], c.get('cv_text'),
+         c.get('skills'), c.get('experience'), c.get('education'), c.get('extraction_model'))
+        for c in candidates
+    ]
+    if not rows:
+        return {}
+    try:
+        with transaction() as cursor:
+            cursor.executemany(CANDIDATE_UPSERT_SQL, rows)
+            emails = list({row[1] for row in rows})
+            ids = {}
+            for start in range(0, len(emails), 500): # Stay under SQLite's bound-parameter limit
+                chunk = emails[start:start + 500]
+                cursor.execute(
+                    f"SELECT id, email FROM candidates WHERE email IN ({', '.join('?' for _ in chunk)})", chunk
+                )
+                ids.update({row['email']: row['id'] for row in cursor.fetchall()})
+            _bump_versions(cursor, "candidates")
+        return ids
+    except sqlite3.Error as e:
+        print(f"Database error bulk adding candidates: {e}")
+        return None
 
-def add_or_update_match(jd_id, candidate_id, score, is_shortlisted):
-    """Adds or updates a match record."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+MATCH_UPSERT_SQL = '''
+    INSERT INTO matches (jd_id, candidate_id, match_score, is_shortlisted, input_fingerprint, prefilter_score, score_model)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(jd_id, candidate_id) DO UPDATE SET
+        match_score=excluded.match_score,
+        is_shortlisted=excluded.is_shortlisted,
+        input_fingerprint=excluded.input_fingerprint,
+        prefilter_score=excluded.prefilter_score,
+        score_model=excluded.score_model,
+        prefilter_fingerprint=NULL,
+        timestamp=CURRENT_TIMESTAMP
+'''
+
+# Pre-filtered matches only record their lexical score; a score and shortlist flag from an
+# earlier LLM run are kept
+PREFILTERED_MATCH_UPSERT_SQL = '''
+    INSERT INTO matches (jd_id, candidate_id, prefilter_score, prefilter_fingerprint)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(jd_id, candidate_id) DO UPDATE SET
+        prefilter_score=excluded.prefilter_score,
+        prefilter_fingerprint=excluded.prefilter_fingerprint
+'''
+
+def add_or_update_match(jd_id, candidate_id, score, is_shortlisted, input_fingerprint=None, prefilter_score=None,
+                        score_model=None):
+    """
+    Adds or updates a match record, remembering the fingerprint of the inputs it was scored from
+    and the model that scored it. A score of None records a candidate the lexical pre-filter
+    kept away from the LLM.
+    """
     try:
-        cursor.execute('''
-            INSERT INTO matches (jd_id, candidate_id, match_score, is_shortlisted)
-            VALUES (?, ?, ?, ?)
-            ON CONFLICT(jd_id, candidate_id) DO UPDATE SET
-                match_score=excluded.match_score,
-                is_shortlisted=excluded.is_shortlisted,
-                timestamp=CURRENT_TIMESTAMP
-        ''', (jd_id, candidate_id, score, is_shortlisted))
-        conn.commit()
+        with transaction() as cursor:
+            cursor.execute(MATCH_UPSERT_SQL, (jd_id, candidate_id, score, is_shortlisted, input_fingerprint, prefilter_score,
+                                              score_model))
+            _bump_versions(cursor, "matches")
         return True
     except sqlite3.Error as e:
         print(f"Database error adding/updating match: {e}")
         return False
-    finally:
-        conn.close()
 
-def update_email_sent_status(match_id):
-    """Updates the email sent status for a specific match."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def add_matches_bulk(matches):
+    """
+    Adds or updates many match records in one transaction. Each item is a tuple of
+    (jd_id, candidate_id, score, is_shortlisted, input_fingerprint, prefilter_score[, score_model]).
+    """
+    matches = [tuple(match) + (None,) * (7 - len(match)) for match in matches]
+    if not matches:
+        return True
     try:
-        cursor.execute('''
-            UPDATE matches
-            SET interview_email_sent = TRUE
-            WHERE id = ?
-        ''', (match_id,))
-        conn.commit()
+        with transaction() as cursor:
+            cursor.executemany(MATCH_UPSERT_SQL, matches)
+            _bump_versions(cursor, "matches")
         return True
     except sqlite3.Error as e:
-        print(f"Database error updating email status: {e}")
+        print(f"Database error bulk adding matches: {e}")
         return False
-    finally:
-        conn.close()
+
+def add_prefiltered_matches_bulk(matches):
+    """
+    Records candidates the lexical pre-filter kept from the LLM, in one transaction. Each item is
+    (jd_id, candidate_id, prefilter_score, fingerprint of the scoring inputs). Only the pre-filter
+    columns are written, so an existing LLM score and shortlist flag survive.
+    """
+    matches = [tuple(match) for match in matches]
+    if not matches:
+        return True
+    try:
+        with transaction() as cursor:
+            cursor.executemany(PREFILTERED_MATCH_UPSERT_SQL, matches)
+            _bump_versions(cursor, "matches")
+        return True
+    except sqlite3.Error as e:
+        print(f"Database error bulk adding pre-filtered matches: {e}")
+        return False
+
+def find_lsh_candidates(buckets):
+    """Returns the candidates (candidate_id, email, signature) filed under any of the given (band, bucket) keys."""
+    if not buckets:
+        return []
+    cursor = get_db_connection().cursor()
+    cursor.execute(f'''
+        SELECT DISTINCT s.candidate_id, c.email, s.signature
+        FROM cv_lsh_buckets b
+        JOIN cv_signatures s ON s.candidate_id = b.candidate_id
+        JOIN candidates c ON c.id = b.candidate_id
+        WHERE (b.band, b.bucket) IN (VALUES {", ".join("(?, ?)" for _ in buckets)})
+    ''', [value for bucket in buckets for value in bucket])
+    return cursor.fetchall()
+
+def save_candidate_file(candidate_id, cv_filename, content_hash, similarity, signature=None, buckets=None):
+    """
+    Links a resume file to a candidate. With a signature, also replaces the candidate's MinHash
+    signature and LSH buckets. Returns True on success.
+    """
+    try:
+        with transaction() as cursor:
+            cursor.execute('''
+                INSERT INTO candidate_files (candidate_id, cv_filename, content_hash, similarity)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(candidate_id, cv_filename) DO UPDATE SET
+                    content_hash=COALESCE(excluded.content_hash, content_hash),
+                    similarity=excluded.similarity,
+                    timestamp=CURRENT_TIMESTAMP
+            ''', (candidate_id, cv_filename, content_hash, similarity))
+            if signature is not None:
+                cursor.execute("INSERT OR REPLACE INTO cv_signatures (candidate_id, signature) VALUES (?, ?)",
+                               (candidate_id, signature))
+                cursor.execute("DELETE FROM cv_lsh_buckets WHERE candidate_id = ?", (candidate_id,))
+                cursor.executemany("INSERT OR IGNORE INTO cv_lsh_buckets (band, bucket, candidate_id) VALUES (?, ?, ?)",
+                                   [(band, bucket, candidate_id) for band, bucket in buckets])
+        return True
+    except sqlite3.Error as e:
+        print(f"Database error linking {cv_filename} to candidate {candidate_id}: {e}")
+        return False
+
+def get_candidates_for_signing(missing_only=True):
+    """Returns id, cv_filename and cv_text of candidates (without a MinHash signature, if missing_only)."""
+    cursor = get_db_connection().cursor()
+    cursor.execute(f'''
+        SELECT id, cv_filename, cv_text
+        FROM candidates
+        WHERE cv_text IS NOT NULL {"AND id NOT IN (SELECT candidate_id FROM cv_signatures)" if missing_only else ""}
+        ORDER BY id
+    ''')
+    candidates = cursor.fetchall()
+    return candidates
+
+def get_match_fingerprints(jd_id):
+    """Returns {candidate_id: input_fingerprint} for every scored match of a JD."""
+    cursor = get_db_connection().cursor()
+    cursor.execute('''
+        SELECT candidate_id, input_fingerprint
+        FROM matches
+        WHERE jd_id = ? AND input_fingerprint IS NOT NULL
+    ''', (jd_id,))
+    fingerprints = {row['candidate_id']: row['input_fingerprint'] for row in cursor.fetchall()}
+    return fingerprints
+
+def get_prefilter_fingerprints(jd_id):
+    """Returns {candidate_id: fingerprint of the inputs} for a JD's matches the pre-filter kept from the LLM."""
+    cursor = get_db_connection().cursor()
+    cursor.execute('''
+        SELECT candidate_id, prefilter_fingerprint
+        FROM matches
+        WHERE jd_id = ? AND prefilter_fingerprint IS NOT NULL
+    ''', (jd_id,))
+    fingerprints = {row['candidate_id']: row['prefilter_fingerprint'] for row in cursor.fetchall()}
+    return fingerprints
+
+ENQUEUE_EMAILS_SQL = '''
+    INSERT OR IGNORE INTO email_outbox (match_id, recipient_email, candidate_name, job_title)
+    SELECT m.id, c.email, c.name, ?
+    FROM matches m
+    JOIN candidates c ON c.id = m.candidate_id
+    WHERE m.jd_id = ? AND m.is_shortlisted = TRUE AND m.interview_email_sent = FALSE
+      AND c.email IS NOT NULL
+'''
+
+def enqueue_interview_emails(jd_id, job_title):
+    """
+    Queues an interview email for every shortlisted, not yet emailed candidate of a JD
+    that has no email already queued or in flight. Returns the number queued, or None on error.
+    """
+    try:
+        with transaction() as cursor:
+            cursor.execute(ENQUEUE_EMAILS_SQL, (job_title, jd_id))
+            queued = cursor.rowcount
+            _bump_versions(cursor, "email_outbox")
+        return queued
+    except sqlite3.Error as e:
+        print(f"Database error queueing interview emails: {e}")
+        return None
+
+CLAIM_OUTBOX_SQL = '''
+    UPDATE email_outbox
+    SET status = 'sending', lease_owner = ?, lease_expires_at = ?, attempts = attempts + 1
+    WHERE id IN (
+        SELECT id FROM email_outbox
+        WHERE (status = 'queued' AND next_attempt_at <= ?)
+           OR (status = 'sending' AND lease_expires_at < ?)
+        ORDER BY id
+        LIMIT ?
+    )
+    RETURNING id, match_id, recipient_email, candidate_name, job_title, attempts
+'''
+
+def claim_outbox_emails(worker_id, limit, lease_seconds, max_attempts, now=None):
+    """
+    Atomically leases up to `limit` emails that are due, or whose previous lease expired
+    (a worker died mid-send), to worker_id. Emails whose lease expired after max_attempts
+    claims (e.g. a message that keeps crashing or hanging its worker) are failed instead, as
+    each claim may already have sent it. Returns the claimed rows.
+    """
+    now = time.time() if now is None else now
+    try:
+        with transaction() as cursor:
+            cursor.execute('''
+                UPDATE email_outbox
+                SET status = 'failed', last_error = 'Lease expired on the last attempt', lease_owner = NULL,
+                    lease_expires_at = NULL
+                WHERE status = 'sending' AND lease_expires_at < ? AND attempts >= ?
+            ''', (now, max_attempts))
+            expired = cursor.rowcount
+            cursor.execute(CLAIM_OUTBOX_SQL, (worker_id, now + lease_seconds, now, now, limit))
+            claimed = cursor.fetchall()
+            if claimed or expired:
+                _bump_versions(cursor, "email_outbox")
+        return claimed
+    except sqlite3.Error as e:
+        print(f"Database error claiming outbox emails: {e}")
+        return []
+
+def record_outbox_results(worker_id, sent_ids, retries, failures, released=()):
+    """
+    Records a worker's results in one transaction: sent_ids are marked sent (and their matches
+    emailed), retries is a list of (outbox_id, error, retry_at) to queue again, failures a list of
+    (outbox_id, error) that gave up, and released a list of (outbox_id, error) that were never
+    attempted, queued again without counting the attempt. Rows whose lease another worker has
+    taken over are left alone.
+    """
+    try:
+        with transaction() as cursor:
+            cursor.executemany('''
+                UPDATE email_outbox
+                SET status = 'sent', sent_at = CURRENT_TIMESTAMP, lease_owner = NULL, lease_expires_at = NULL, last_error = NULL
+                WHERE id = ? AND lease_owner = ?
+            ''', [(outbox_id, worker_id) for outbox_id in sent_ids])
+            cursor.executemany('''
+                UPDATE email_outbox
+                SET status = 'queued', last_error = ?, next_attempt_at = ?, lease_owner = NULL, lease_expires_at = NULL
+                WHERE id = ? AND lease_owner = ?
+            ''', [(error, retry_at, outbox_id, worker_id) for outbox_id, error, retry_at in retries])
+            cursor.executemany('''
+                UPDATE email_outbox
+                SET status = 'failed', last_error = ?, lease_owner = NULL, lease_expires_at = NULL
+                WHERE id = ? AND lease_owner = ?
+            ''', [(error, outbox_id, worker_id) for outbox_id, error in failures])
+            cursor.executemany('''
+                UPDATE email_outbox
+                SET status = 'queued', attempts = attempts - 1, last_error = ?, lease_owner = NULL, lease_expires_at = NULL
+                WHERE id = ? AND lease_owner = ?
+            ''', [(error, outbox_id, worker_id) for outbox_id, error in released])
+            if sent_ids:
+                cursor.executemany('''
+                    UPDATE matches
+                    SET interview_email_sent = TRUE
+                    WHERE id = (SELECT match_id FROM email_outbox WHERE id = ?)
+                ''', [(outbox_id,) for outbox_id in sent_ids])
+                _bump_versions(cursor, "matches")
+            _bump_versions(cursor, "email_outbox")
+        return True
+    except sqlite3.Error as e:
+        print(f"Database error recording outbox results: {e}")
+        return False
+
+OUTBOX_SUMMARY_SQL = '''
+    SELECT o.status, COUNT(*) AS count
+    FROM email_outbox o
+    JOIN matches m ON m.id = o.match_id
+    WHERE m.jd_id = ?
+    GROUP BY o.status
+'''
+
+def get_outbox_summary(jd_id):
+    """Returns {status: count} for the interview emails queued for a JD."""
+    cursor = get_db_connection().cursor()
+    cursor.execute(OUTBOX_SUMMARY_SQL, (jd_id,))
+    summary = {row['status']: row['count'] for row in cursor.fetchall()}
+    return summary
+
+def get_failed_outbox_emails(jd_id, limit=20):
+    """Retrieves the most recent emails for a JD that the worker gave up on."""
+    cursor = get_db_connection().cursor()
+    cursor.execute('''
+        SELECT o.recipient_email, o.candidate_name, o.attempts, o.last_error
+        FROM email_outbox o
+        JOIN matches m ON m.id = o.match_id
+        WHERE m.jd_id = ? AND o.status = 'failed'
+        ORDER BY o.id DESC
+        LIMIT ?
+    ''', (jd_id, limit))
+    failed = cursor.fetchall()
+    return failed
+
+def submit_job(kind, jd_id=None, folder=None, options=None):
+    """Queues a background job for a worker. Returns the job ID, or None on error."""
+    try:
+        with transaction() as cursor:
+            cursor.execute('''
+                INSERT INTO jobs (kind, jd_id, folder, options)
+                VALUES (?, ?, ?, ?)
+            ''', (kind, jd_id, folder, json.dumps(options or {})))
+            job_id = cursor.lastrowid
+            _bump_versions(cursor, "jobs")
+        return job_id
+    except sqlite3.Error as e:
+        print(f"Database error submitting job: {e}")
+        return None
+
+def claim_next_job(worker_id, stale_after, now=None):
+    """
+    Atomically claims the oldest pending job, or a running one whose worker stopped
+    heartbeating more than stale_after seconds ago. Returns the job row, or None.
+    """
+    now = time.time() if now is None else now
+    try:
+        with transaction() as cursor:
+            cursor.execute('''
+                UPDATE jobs
+                SET status = 'running', worker_id = ?, heartbeat_at = ?, started_at = CURRENT_TIMESTAMP,
+                    progress_done = 0, message = NULL
+                WHERE id = (
+                    SELECT id FROM jobs
+                    WHERE status = 'pending' OR (status = 'running' AND heartbeat_at < ?)
+                    ORDER BY id
+                    LIMIT 1
+                )
+                RETURNING id, kind, jd_id, folder, options
+            ''', (worker_id, now, now - stale_after))
+            job = cursor.fetchone()
+            if job:
+                _bump_versions(cursor, "jobs")
+        return job
+    except sqlite3.Error as e:
+        print(f"Database error claiming job: {e}")
+        return None
+
+def update_job_progress(job_id, worker_id, done=None, total=None, message=None, warnings=None):
+    """
+    Records a running job's progress and refreshes its heartbeat. Returns False if the job
+    is no longer owned by worker_id (it was reclaimed after a stale heartbeat).
+    """
+    try:
+        with transaction() as cursor:
+            cursor.execute('''
+                UPDATE jobs
+                SET progress_done = COALESCE(?, progress_done), progress_total = COALESCE(?, progress_total),
+                    message = COALESCE(?, message), warnings = COALESCE(?, warnings), heartbeat_at = ?
+                WHERE id = ? AND worker_id = ? AND status = 'running'
+            ''', (done, total, message, warnings, time.time(), job_id, worker_id))
+            owned = cursor.rowcount == 1
+            if owned and (done is not None or message is not None):
+                _bump_versions(cursor, "jobs")
+        return owned
+    except sqlite3.Error as e:
+        print(f"Database error updating job progress: {e}")
+        return False
+
+def finish_job(job_id, worker_id, status, message=None, processed_count=None):
+    """Marks a job 'done' or 'failed' with its final message and result."""
+    try:
+        with transaction() as cursor:
+            cursor.execute('''
+                UPDATE jobs
+                SET status = ?, message = COALESCE(?, message), processed_count = ?, finished_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND worker_id = ?
+            ''', (status, message, processed_count, job_id, worker_id))
+            _bump_versions(cursor, "jobs")
+        return True
+    except sqlite3.Error as e:
+        print(f"Database error finishing job: {e}")
+        return False
+
+def enqueue_work_tasks(jd_id, paths):
+    """
+    Queues one task per resume path for a JD (or None to only ingest), skipping paths that
+    already have a live task for it. Returns the number queued, or None on error.
+    """
+    try:
+        with transaction() as cursor:
+            cursor.executemany(
+                "INSERT OR IGNORE INTO work_tasks (path, jd_id) VALUES (?, ?)",
+                [(path, jd_id) for path in paths]
+            )
+            queued = cursor.rowcount
+        return queued
+    except sqlite3.Error as e:
+        print(f"Database error queueing work tasks: {e}")
+        return None
+
+# A task is due if queued, or leased by a worker that stopped renewing its lease
+_DUE_TASK = "(status = 'queued' OR (status = 'leased' AND lease_expires_at < :now))"
+
+def claim_work_tasks(worker_id, limit, lease_seconds, max_attempts, now=None):
+    """
+    Atomically leases up to `limit` due tasks to worker_id, all for the same JD as the oldest
+    due task so they can be scored in shared batches. Tasks whose lease expired after
+    max_attempts claims (e.g. a file that keeps crashing its worker) are failed instead.
+    Returns the claimed rows.
+    """
+    now = time.time() if now is None else now
+    try:
+        with transaction() as cursor:
+            cursor.execute('''
+                UPDATE work_tasks
+                SET status = 'failed', last_error = 'Lease expired on the last attempt', finished_at = CURRENT_TIMESTAMP,
+                    lease_owner = NULL, lease_expires_at = NULL
+                WHERE status = 'leased' AND lease_expires_at < ? AND attempts >= ?
+            ''', (now, max_attempts))
+            cursor.execute(f'''
+                UPDATE work_tasks
+                SET status = 'leased', lease_owner = :worker, lease_expires_at = :expires, attempts = attempts + 1
+                WHERE id IN (
+                    SELECT id FROM work_tasks
+                    WHERE {_DUE_TASK}
+                      AND jd_id IS (SELECT jd_id FROM work_tasks WHERE {_DUE_TASK} ORDER BY id LIMIT 1)
+                    ORDER BY id
+                    LIMIT :limit
+                )
+                RETURNING id, path, jd_id, attempts
+            ''', {"worker": worker_id, "expires": now + lease_seconds, "now": now, "limit": limit})
+            claimed = cursor.fetchall()
+        return claimed
+    except sqlite3.Error as e:
+        print(f"Database error claiming work tasks: {e}")
+        return []
+
+def extend_work_leases(worker_id, task_ids, lease_seconds):
+    """Renews worker_id's leases on the given tasks. Returns how many it still owns."""
+    try:
+        with transaction() as cursor:
+            cursor.executemany('''
+                UPDATE work_tasks
+                SET lease_expires_at = ?
+                WHERE id = ? AND lease_owner = ? AND status = 'leased'
+            ''', [(time.time() + lease_seconds, task_id, worker_id) for task_id in task_ids])
+            owned = cursor.rowcount
+        return owned
+    except sqlite3.Error as e:
+        print(f"Database error extending work leases: {e}")
+        return 0
+
+def finish_work_tasks(worker_id, done_ids, retries, failures):
+    """
+    Records a worker's results in one transaction: done_ids are marked done, retries is a list of
+    (task_id, error) to queue again and failures a list of (task_id, error) that gave up.
+    Tasks whose lease another worker has taken over are left alone.
+    """
+    try:
+        with transaction() as cursor:
+            cursor.executemany('''
+                UPDATE work_tasks
+                SET status = 'done', last_error = NULL, finished_at = CURRENT_TIMESTAMP, lease_owner = NULL, lease_expires_at = NULL
+                WHERE id = ? AND lease_owner = ? AND status = 'leased'
+            ''', [(task_id, worker_id) for task_id in done_ids])
+            cursor.executemany('''
+                UPDATE work_tasks
+                SET status = 'queued', last_error = ?, lease_owner = NULL, lease_expires_at = NULL
+                WHERE id = ? AND lease_owner = ? AND status = 'leased'
+            ''', [(error, task_id, worker_id) for task_id, error in retries])
+            cursor.executemany('''
+                UPDATE work_tasks
+                SET status = 'failed', last_error = ?, finished_at = CURRENT_TIMESTAMP, lease_owner = NULL, lease_expires_at = NULL
+                WHERE id = ? AND lease_owner = ? AND status = 'leased'
+            ''', [(error, task_id, worker_id) for task_id, error in failures])
+        return True
+    except sqlite3.Error as e:
+        print(f"Database error recording work task results: {e}")
+        return False
+
+def get_work_task_summary(jd_id=None):
+    """Returns {status: count} for the work tasks of a JD, or of every JD if jd_id is None."""
+    cursor = get_db_connection().cursor()
+    if jd_id is None:
+        cursor.execute("SELECT status, COUNT(*) AS count FROM work_tasks GROUP BY status")
+    else:
+        cursor.execute("SELECT status, COUNT(*) AS count FROM work_tasks WHERE jd_id = ? GROUP BY status", (jd_id,))
+    summary = {row['status']: row['count'] for row in cursor.fetchall()}
+    return summary
+
+def start_metric_run(kind, jd_id=None):
+    """Records the start of an instrumented run. Returns its ID, or None on error."""
+    try:
+        with transaction() as cursor:
+            cursor.execute("INSERT INTO metric_runs (kind, jd_id, started_at) VALUES (?, ?, ?)", (kind, jd_id, time.time()))
+            run_id = cursor.lastrowid
+        return run_id
+    except sqlite3.Error as e:
+        print(f"Database error starting metric run: {e}")
+        return None
+
+def finish_metric_run(run_id, seconds, samples, keep_runs):
+    """
+    Stores a finished run's samples, (stage, seconds, prompt_tokens, completion_tokens, retries, error)
+    tuples, in one transaction and drops all but the latest keep_runs runs of its kind.
+    """
+    try:
+        with transaction() as cursor:
+            cursor.executemany('''
+                INSERT INTO run_metrics (run_id, stage, seconds, prompt_tokens, completion_tokens, retries, error)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', [(run_id,) + tuple(sample) for sample in samples])
+            cursor.execute("UPDATE metric_runs SET seconds = ? WHERE id = ?", (seconds, run_id))
+            # Retention is per kind, so a burst of email runs never evicts the latest ingest run
+            cursor.execute('''
+                SELECT id, kind FROM metric_runs
+                WHERE kind = (SELECT kind FROM metric_runs WHERE id = ?)
+                ORDER BY id DESC LIMIT 1 OFFSET ?
+            ''', (run_id, keep_runs))
+            newest_dropped = cursor.fetchone()
+            if newest_dropped:
+                cursor.execute('''
+                    DELETE FROM run_metrics
+                    WHERE run_id IN (SELECT id FROM metric_runs WHERE kind = ? AND id <= ?)
+                ''', (newest_dropped['kind'], newest_dropped['id']))
+                cursor.execute("DELETE FROM metric_runs WHERE kind = ? AND id <= ?",
+                               (newest_dropped['kind'], newest_dropped['id']))
+            _bump_versions(cursor, "metric_runs")
+        return True
+    except sqlite3.Error as e:
+        print(f"Database error recording run metrics: {e}")
+        return False
+
+def get_latest_metric_runs():
+    """Retrieves the most recent finished run of each kind."""
+    cursor = get_db_connection().cursor()
+    cursor.execute('''
+        SELECT id, kind, jd_id, started_at, seconds
+        FROM metric_runs
+        WHERE id IN (SELECT MAX(id) FROM metric_runs WHERE seconds IS NOT NULL GROUP BY kind)
+        ORDER BY kind
+    ''')
+    runs = cursor.fetchall()
+    return runs
+
+def get_run_metrics(run_id):
+    """Retrieves every sample recorded for a run."""
+    cursor = get_db_connection().cursor()
+    cursor.execute('''
+        SELECT stage, seconds, prompt_tokens, completion_tokens, retries, error
+        FROM run_metrics
+        WHERE run_id = ?
+    ''', (run_id,))
+    samples = cursor.fetchall()
+    return samples
+
+JOB_COLUMNS = '''
+    id, kind, jd_id, folder, status, progress_done, progress_total, processed_count, message, warnings,
+    worker_id, created_at, started_at, finished_at
+'''
+
+def get_job(job_id):
+    """Retrieves a job's status and progress."""
+    cursor = get_db_connection().cursor()
+    cursor.execute(f"SELECT {JOB_COLUMNS} FROM jobs WHERE id = ?", (job_id,))
+    job = cursor.fetchone()
+    return job
+
+def get_recent_jobs(jd_id=None, limit=10):
+    """Retrieves the latest jobs, optionally only those for one JD, newest first."""
+    cursor = get_db_connection().cursor()
+    if jd_id is None:
+        cursor.execute(f"SELECT {JOB_COLUMNS} FROM jobs ORDER BY id DESC LIMIT ?", (limit,))
+    else:
+        cursor.execute(f"SELECT {JOB_COLUMNS} FROM jobs WHERE jd_id = ? ORDER BY id DESC LIMIT ?", (jd_id, limit))
+    jobs = cursor.fetchall()
+    return jobs
+
+def get_cached_resume(content_hash):
+    """Retrieves the cached text and extraction for a PDF content hash, if any."""
+    cursor = get_db_connection().cursor()
+    cursor.execute('''
+        SELECT cv_text, extracted_data, extraction_model, extraction_prompt_version
+        FROM resume_cache
+        WHERE content_hash = ?
+    ''', (content_hash,))
+    result = cursor.fetchone()
+    return result
+
+def cache_resume_text(content_hash, cv_text):
+    """Caches the extracted PDF text for a content hash, dropping any stale extraction."""
+    try:
+        with transaction() as cursor:
+            cursor.execute('''
+                INSERT INTO resume_cache (content_hash, cv_text)
+                VALUES (?, ?)
+                ON CONFLICT(content_hash) DO UPDATE SET
+                    cv_text=excluded.cv_text,
+                    extracted_data=NULL,
+                    extraction_model=NULL,
+                    extraction_prompt_version=NULL,
+                    timestamp=CURRENT_TIMESTAMP
+            ''', (content_hash, cv_text))
+        return True
+    except sqlite3.Error as e:
+        print(f"Database error caching resume text: {e}")
+        return False
+
+def cache_resume_extraction(content_hash, extracted_data, model, prompt_version):
+    """Caches the CV agent's result for a content hash, tagged with the model and prompt version used."""
+    try:
+        with transaction() as cursor:
+            cursor.execute('''
+                UPDATE resume_cache
+                SET extracted_data = ?, extraction_model = ?, extraction_prompt_version = ?, timestamp = CURRENT_TIMESTAMP
+                WHERE content_hash = ?
+            ''', (json.dumps(extracted_data), model, prompt_version, content_hash))
+        return True
+    except sqlite3.Error as e:
+        print(f"Database error caching CV extraction: {e}")
+        return False
+
+ALL_JDS_SQL = "SELECT id, title, summary, timestamp FROM job_descriptions ORDER BY timestamp DESC"
 
 def get_all_jds():
     """Retrieves all job descriptions."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, title, summary, timestamp FROM job_descriptions ORDER BY timestamp DESC")
+    cursor = get_db_connection().cursor()
+    cursor.execute(ALL_JDS_SQL)
     jds = cursor.fetchall()
-    conn.close()
     return jds
 
 def get_jd_summary(jd_id):
     """Retrieves the summary for a specific job description."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    cursor = get_db_connection().cursor()
     cursor.execute("SELECT summary FROM job_descriptions WHERE id = ?", (jd_id,))
     result = cursor.fetchone()
-    conn.close()
     return result['summary'] if result else None
 
-def get_candidates_for_jd(jd_id):
-    """Retrieves candidates matched with a specific JD, including match details."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
+def _candidate_filters(jd_id, min_score=None, max_score=None, shortlisted=None, email_sent=None, search=None):
+    """Builds the WHERE clauses and parameters for a JD's candidate list under the dashboard filters."""
+    clauses, params = ["m.jd_id = ?"], [jd_id]
+    if min_score is not None:
+        clauses.append("m.match_score >= ?")
+        params.append(min_score)
+    if max_score is not None:
+        clauses.append("m.match_score <= ?")
+        params.append(max_score)
+    # Flags are inlined as literals so the planner can match the partial pending-email index
+    if shortlisted is not None:
+        clauses.append(f"m.is_shortlisted = {'TRUE' if shortlisted else 'FALSE'}")
+    if email_sent is not None:
+        clauses.append(f"m.interview_email_sent = {'TRUE' if email_sent else 'FALSE'}")
+    if search:
+        pattern = "%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        clauses.append("(c.name LIKE ? ESCAPE '\\' OR c.email LIKE ? ESCAPE '\\')")
+        params += [pattern, pattern]
+    return clauses, params
+
+def _candidate_page_sql(clauses):
+    return f'''
         SELECT
             c.id as candidate_id, c.name, c.email, c.phone, c.cv_filename,
-            m.id as match_id, m.match_score, m.is_shortlisted, m.interview_email_sent
-        FROM candidates c
-        JOIN matches m ON c.id = m.candidate_id
-        WHERE m.jd_id = ?
-        ORDER BY m.match_score DESC
-    ''', (jd_id,))
-    candidates = cursor.fetchall()
-    conn.close()
-    return candidates
+            m.id as match_id, m.match_score, m.prefilter_score, m.is_shortlisted, m.interview_email_sent
+        FROM matches m
+        JOIN candidates c ON c.id = m.candidate_id
+        WHERE {" AND ".join(clauses)}
+        ORDER BY m.match_score DESC, m.candidate_id
+        LIMIT ?
+    '''
+
+def _candidate_count_sql(clauses, search=False):
+    join = "JOIN candidates c ON c.id = m.candidate_id" if search else ""
+    return f"SELECT COUNT(*) FROM matches m {join} WHERE {' AND '.join(clauses)}"
+
+def get_candidates_page(jd_id, after=None, page_size=50, **filters):
+    """
+    Retrieves one page of a JD's matched candidates, best score first, using keyset pagination.
+    after is the key returned with the previous page (None for the first page); filters are
+    min_score, max_score, shortlisted, email_sent and search (a name/email substring).
+    Returns (rows, key of the next page or None if this is the last page).
+    """
+    cursor = get_db_connection().cursor()
+    clauses, params = _candidate_filters(jd_id, **filters)
+    limit = page_size + 1 # One extra row tells us whether another page follows
+    if after is None:
+        cursor.execute(_candidate_page_sql(clauses), params + [limit])
+        rows = cursor.fetchall()
+    elif after[0] is None:
+        # Already inside the unscored tail, which sorts after every scored match
+        cursor.execute(_candidate_page_sql(clauses + ["m.match_score IS NULL", "m.candidate_id > ?"]),
+                       params + [after[1], limit])
+        rows = cursor.fetchall()
+    else:
+        # "score <= last" is the index range to seek to; the OR only drops the ties already shown.
+        # A range excludes NULLs, so the unscored tail is fetched separately once scores run out.
+        last_score, last_candidate_id = after
+        cursor.execute(_candidate_page_sql(clauses + ["m.match_score <= ?", "(m.match_score < ? OR m.candidate_id > ?)"]),
+                       params + [last_score, last_score, last_candidate_id, limit])
+        rows = cursor.fetchall()
+        if len(rows) < limit:
+            cursor.execute(_candidate_page_sql(clauses + ["m.match_score IS NULL"]), params + [limit - len(rows)])
+            rows += cursor.fetchall()
+    if len(rows) < limit:
+        return rows, None
+    last_row = rows[page_size - 1]
+    return rows[:page_size], (last_row['match_score'], last_row['candidate_id'])
+
+def count_candidates_for_jd(jd_id, **filters):
+    """Counts a JD's matched candidates under the same filters as get_candidates_page()."""
+    cursor = get_db_connection().cursor()
+    clauses, params = _candidate_filters(jd_id, **filters)
+    cursor.execute(_candidate_count_sql(clauses, bool(filters.get("search"))), params)
+    return cursor.fetchone()[0]
+
+# Tables the debug viewer can page through, with the columns it shows (full CV text stays out)
+BROWSABLE_TABLES = {
+    "job_descriptions": "*",
+    "candidates": "id, name, email, phone, cv_filename, timestamp",
+    "matches": "*",
+}
+
+def get_table_page(table, after_id=None, page_size=50):
+    """
+    Retrieves one page of a table's rows in id order for the debug viewer.
+    Returns (rows, id to pass as after_id for the next page or None if this is the last page).
+    """
+    columns = BROWSABLE_TABLES[table] # Only known table names ever reach the SQL
+    cursor = get_db_connection().cursor()
+    cursor.execute(f"SELECT {columns} FROM {table} WHERE id > ? ORDER BY id LIMIT ?",
+                   (after_id if after_id is not None else -1, page_size + 1))
+    rows = cursor.fetchall()
+    if len(rows) <= page_size:
+        return rows, None
+    return rows[:page_size], rows[page_size - 1]['id']
 
 def get_candidate_details(candidate_id):
     """Retrieves full details for a specific candidate."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    cursor = get_db_connection().cursor()
     cursor.execute('''
         SELECT name, email, phone, cv_filename, cv_text, extracted_skills, extracted_experience, extracted_education
         FROM candidates
         WHERE id = ?
     ''', (candidate_id,))
     candidate = cursor.fetchone()
-    conn.close()
     return candidate
 
-def get_shortlisted_candidates_for_emailing(jd_id):
-    """Retrieves shortlisted candidates for a JD who haven't been emailed yet."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT
-            c.name, c.email,
-            m.id as match_id
-        FROM candidates c
-        JOIN matches m ON c.id = m.candidate_id
-        WHERE m.jd_id = ? AND m.is_shortlisted = TRUE AND m.interview_email_sent = FALSE
-    ''', (jd_id,))
-    candidates = cursor.fetchall()
-    conn.close()
+def get_candidates_by_ids(candidate_ids):
+    """Retrieves contact details for a list of candidate IDs, keyed by ID."""
+    if not candidate_ids:
+        return {}
+    cursor = get_db_connection().cursor()
+    placeholders = ", ".join("?" for _ in candidate_ids)
+    cursor.execute(f'''
+        SELECT id, name, email, phone, cv_filename
+        FROM candidates
+        WHERE id IN ({placeholders})
+    ''', list(candidate_ids))
+    candidates = {row['id']: row for row in cursor.fetchall()}
     return candidates
 
-# Setup the database when this module is imported
-setup_database()
\ No newline at end of file
+# Ranked in a subquery so that only the page of results is joined to candidates
+CANDIDATE_SEARCH_SQL = f'''
+    SELECT c.id AS candidate_id, c.name, c.email, c.phone, c.cv_filename, -ranked.score AS relevance
+    FROM (
+        SELECT rowid, bm25(candidates_fts, {", ".join(str(weight) for weight in SEARCH_COLUMN_WEIGHTS)}) AS score
+        FROM candidates_fts
+        WHERE candidates_fts MATCH ?
+        ORDER BY score
+        LIMIT ?
+    ) ranked
+    JOIN candidates c ON c.id = ranked.rowid
+    ORDER BY ranked.score
+'''
+SEARCH_OPERATORS = ("AND", "OR", "NOT")
+
+def _literal_search_query(query):
+    """
+    Quotes every word of query, so punctuation (node.js, C++) isn't read as FTS5 syntax. AND/OR/NOT
+    stay operators where they join two words and are searched as words anywhere else.
+    """
+    words = query.split()
+    terms = []
+    for index, word in enumerate(words):
+        is_operator = word in SEARCH_OPERATORS and terms and terms[-1] not in SEARCH_OPERATORS and index < len(words) - 1
+        terms.append(word if is_operator else '"' + word.replace('"', '""') + '"')
+    return " ".join(terms)
+
+def search_candidates(query, limit=20):
+    """
+    Full-text searches every stored candidate's CV text and extracted skills, experience and
+    education, best BM25 match first. query uses FTS5 syntax: "kubernetes AND terraform",
+    "data engineer" in quotes for a phrase, pyth* for a prefix; a query that isn't valid syntax
+    is searched as literal words. Returns dicts with the candidate's contact details,
+    'relevance' (higher is better) and a 'snippet' of the best-matching column.
+    """
+    query = (query or "").strip()
+    if not query:
+        return []
+    cursor = get_db_connection().cursor()
+    for match in (query, _literal_search_query(query)):
+        try:
+            cursor.execute(CANDIDATE_SEARCH_SQL, (match, limit))
+            rows = [dict(row) for row in cursor.fetchall()]
+            break
+        except sqlite3.OperationalError as e:
+            error = e
+    else:
+        print(f"Database error searching candidates for '{query}': {error}")
+        return []
+    if rows:
+        # Snippets only for the page of results, not for every row the ranking looked at
+        placeholders = ", ".join("?" for _ in rows)
+        cursor.execute(f'''
+            SELECT rowid, snippet(candidates_fts, -1, '[', ']', '…', 16) AS snippet
+            FROM candidates_fts
+            WHERE candidates_fts MATCH ? AND rowid IN ({placeholders})
+        ''', [match] + [row['candidate_id'] for row in rows])
+        snippets = {row['rowid']: row['snippet'] for row in cursor.fetchall()}
+        for row in rows:
+            row['snippet'] = snippets.get(row['candidate_id'])
+    return rows
+
+def optimize_search_index(rebuild=False):
+    """
+    Merges the full-text index into a single segment, which speeds up searches after large
+    imports; with rebuild, re-indexes every candidate from the candidates table first.
+    """
+    try:
+        with transaction() as cursor:
+            if rebuild:
+                cursor.execute("INSERT INTO candidates_fts (candidates_fts) VALUES ('rebuild')")
+            cursor.execute("INSERT INTO candidates_fts (candidates_fts) VALUES ('optimize')")
+        return True
+    except sqlite3.Error as e:
+        print(f"Database error optimizing the search index: {e}")
+        return False
+
+def get_all_candidate_profiles():
+    """Retrieves the extracted profile of every candidate, shaped like the CV agent's output."""
+    cursor = get_db_connection().cursor()
+    cursor.execute('''
+        SELECT id, extracted_skills AS skills, extracted_experience AS experience, extracted_education AS education
+        FROM candidates
+        ORDER BY id
+    ''')
+    profiles = [dict(row) for row in cursor.fetchall()]
+    return profiles
+
+def get_candidate_profiles(candidate_ids):
+    """Retrieves the extracted profiles of the given candidates as {id: profile}."""
+    if not candidate_ids:
+        return {}
+    cursor = get_db_connection().cursor()
+    placeholders = ", ".join("?" for _ in candidate_ids)
+    cursor.execute(f'''
+        SELECT id, name, email, phone, extracted_skills AS skills, extracted_experience AS experience,
+               extracted_education AS education
+        FROM candidates
+        WHERE id IN ({placeholders})
+    ''', list(candidate_ids))
+    profiles = {row['id']: dict(row) for row in cursor.fetchall()}
+    return profiles
+
+def record_ingest_result(path, size, mtime, content_hash, status, error=None, candidate_id=None):
+    """
+    Records the outcome of ingesting a resume file in the ledger. Failures of the same content
+    in a row are counted in attempts; a success or new content resets the count.
+    """
+    try:
+        with transaction() as cursor:
+            cursor.execute('''
+                INSERT INTO ingest_ledger (path, size, mtime, content_hash, status, error, candidate_id, attempts)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    attempts=CASE
+                        WHEN excluded.status <> 'failed' THEN 0
+                        WHEN ingest_ledger.status = 'failed' AND ingest_ledger.content_hash IS excluded.content_hash
+                            THEN ingest_ledger.attempts + 1
+                        ELSE 1
+                    END,
+                    size=excluded.size,
+                    mtime=excluded.mtime,
+                    content_hash=excluded.content_hash,
+                    status=excluded.status,
+                    error=excluded.error,
+                    candidate_id=COALESCE(excluded.candidate_id, ingest_ledger.candidate_id),
+                    timestamp=CURRENT_TIMESTAMP
+            ''', (path, size, mtime, content_hash, status, error, candidate_id, 1 if status == 'failed' else 0))
+        return True
+    except sqlite3.Error as e:
+        print(f"Database error recording ingest result: {e}")
+        return False
+
+LEDGER_ENTRIES_SQL = '''
+    SELECT path, size, mtime, content_hash, status, error, candidate_id, attempts,
+           CAST(strftime('%s', timestamp) AS REAL) AS recorded_at
+    FROM ingest_ledger
+    WHERE path >= ? AND path < ?
+'''
+
+def get_ledger_entries(folder):
+    """Retrieves the ledger rows for every file recorded under a folder, keyed by path."""
+    cursor = get_db_connection().cursor()
+    prefix = os.path.join(folder, "")
+    # A prefix match as a primary-key range (the separator bumped by one), so it is a seek, not a scan
+    cursor.execute(LEDGER_ENTRIES_SQL, (prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)))
+    entries = {row['path']: row for row in cursor.fetchall()}
+    return entries
+
+def tombstone_ledger_entries(paths):
+    """Marks ledger rows for files that no longer exist as deleted."""
+    if not paths:
+        return True
+    try:
+        with transaction() as cursor:
+            cursor.executemany('''
+                UPDATE ingest_ledger
+                SET status = 'deleted', timestamp = CURRENT_TIMESTAMP
+                WHERE path = ?
+            ''', [(path,) for path in paths])
+        return True
+    except sqlite3.Error as e:
+        print(f"Database error tombstoning ledger entries: {e}")
+        return False
+
+# Hot queries with sample parameters and the index (or acceptable indexes) each must be served by;
+# see check_query_plans()
+HOT_QUERIES = {
+    "get_all_jds": (ALL_JDS_SQL, (), "idx_job_descriptions_timestamp"),
+    "get_candidates_page": (_candidate_page_sql(["m.jd_id = ?"]), (1, 51), "idx_matches_jd_score"),
+    "get_candidates_page_next": (
+        _candidate_page_sql(["m.jd_id = ?", "m.match_score <= ?", "(m.match_score < ? OR m.candidate_id > ?)"]),
+        (1, 80, 80, 100, 51), "idx_matches_jd_score"
+    ),
+    # Counting needs no columns, so the narrower (jd_id, candidate_id) unique index serves as well
+    "count_candidates_for_jd": (
+        _candidate_count_sql(["m.jd_id = ?"]), (1,), ("idx_matches_jd_score", "sqlite_autoindex_matches_1")
+    ),
+    "count_candidates_for_jd_filtered": (
+        _candidate_count_sql(_candidate_filters(1, min_score=75, shortlisted=True)[0]), (1, 75), "idx_matches_jd_score"
+    ),
+    # Without ANALYZE statistics the planner may prefer the covering index; both avoid reading every match
+    "enqueue_interview_emails": (ENQUEUE_EMAILS_SQL, ("Engineer", 1), ("idx_matches_pending_email", "idx_matches_jd_score")),
+    "claim_outbox_emails": (CLAIM_OUTBOX_SQL, ("worker", 300.0, 0.0, 0.0, 20), "idx_email_outbox_claim"),
+    "get_outbox_summary": (OUTBOX_SUMMARY_SQL, (1,), "idx_email_outbox_match"),
+    "get_ledger_entries": (LEDGER_ENTRIES_SQL, ("/resumes/", "/resumes0"), "sqlite_autoindex_ingest_ledger_1"),
+}
+
+def explain_query_plan(sql, params=()):
+    """Returns the detail lines of EXPLAIN QUERY PLAN for a statement."""
+    cursor = get_db_connection().cursor()
+    cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+    return [row['detail'] for row in cursor.fetchall()]
+
+# Hot queries whose temporary sort is bounded: the claim orders only the due emails, and the
+# summary groups one JD's emails into a handful of statuses
+SMALL_SORT_QUERIES = {"claim_outbox_emails", "get_outbox_summary"}
+
+def check_query_plans():
+    """
+    Checks that every hot query is served by its expected index without a temporary sort
+    (other than those in SMALL_SORT_QUERIES).
+    Returns {query name: plan lines} for the queries that regressed, empty when all is well.
+    """
+    problems = {}
+    for name, (sql, params, index_names) in HOT_QUERIES.items():
+        index_names = (index_names,) if isinstance(index_names, str) else index_names
+        plan = explain_query_plan(sql, params)
+        uses_index = any(index_name in line for line in plan for index_name in index_names)
+        sorts = name not in SMALL_SORT_QUERIES and any("TEMP B-TREE" in line for line in plan)
+        if not uses_index or sorts:
+            problems[name] = plan
+    return problems
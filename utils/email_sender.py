@@ -1,17 +1,23 @@
-import smtplib
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from email.message import EmailMessage
-from .config import EMAIL_ADDRESS, EMAIL_PASSWORD, SMTP_SERVER, SMTP_PORT
+from .config import (EMAIL_ADDRESS, EMAIL_PASSWORD, SMTP_SERVER, SMTP_PORT, SMTP_USE_TLS, SMTP_AUTH, SMTP_TIMEOUT,
+                     EMAIL_POOL_SIZE, EMAIL_RATE_PER_SECOND, EMAIL_MAX_PER_CONNECTION, EMAIL_MAX_RETRIES,
+                     EMAIL_RETRY_BACKOFF)
 
-def send_interview_email(recipient_email, candidate_name, job_title):
-    """Sends a personalized interview request email."""
-    if not recipient_email:
-        print(f"Error sending email: No recipient email provided for {candidate_name}.")
-        return False
-    if not EMAIL_ADDRESS or EMAIL_ADDRESS == "default_email@example.com" or not EMAIL_PASSWORD or EMAIL_PASSWORD == "default_password":
-         print("Error sending email: Email credentials not configured in config.py or .env file.")
-         return False
+# smtplib is imported inside the functions that talk to the server, so importing this module stays cheap
 
+def credentials_configured():
+    """Checks that real SMTP credentials are set (not needed when SMTP_AUTH is off)."""
+    if not SMTP_AUTH:
+        return True
+    return not (not EMAIL_ADDRESS or EMAIL_ADDRESS == "default_email@example.com" or not EMAIL_PASSWORD or EMAIL_PASSWORD == "default_password")
 
+def build_interview_email(recipient_email, candidate_name, job_title):
+    """Builds the personalized interview request message."""
     subject = f"Interview Invitation: {job_title} Position"
     body = f"""
     Dear {candidate_name if candidate_name else 'Candidate'},
@@ -40,12 +46,37 @@ def send_interview_email(recipient_email, candidate_name, job_title):
     msg['From'] = EMAIL_ADDRESS
     msg['To'] = recipient_email
     msg.set_content(body)
+    return msg
 
+def open_smtp_connection():
+    """Connects to the SMTP server, upgrading to TLS and logging in as configured."""
+    import smtplib
+    server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=SMTP_TIMEOUT)
     try:
-        print(f"Attempting to send email to {recipient_email} via {SMTP_SERVER}:{SMTP_PORT}")
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
+        if SMTP_USE_TLS:
             server.starttls()  # Secure the connection
+        if SMTP_AUTH:
             server.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
+    except BaseException:
+        server.close()
+        raise
+    return server
+
+def send_interview_email(recipient_email, candidate_name, job_title):
+    """Sends a personalized interview request email."""
+    if not recipient_email:
+        print(f"Error sending email: No recipient email provided for {candidate_name}.")
+        return False
+    if not credentials_configured():
+         print("Error sending email: Email credentials not configured in config.py or .env file.")
+         return False
+
+    msg = build_interview_email(recipient_email, candidate_name, job_title)
+
+    import smtplib # Deferred until an email is actually sent
+    try:
+        print(f"Attempting to send email to {recipient_email} via {SMTP_SERVER}:{SMTP_PORT}")
+        with open_smtp_connection() as server:
             server.send_message(msg)
         print(f"Successfully sent interview invitation to {recipient_email}")
         return True
@@ -57,4 +88,167 @@ def send_interview_email(recipient_email, candidate_name, job_title):
          return False
     except Exception as e:
         print(f"Error sending email to {recipient_email}: {e}")
-        return False
\ No newline at end of file
+        return False
+
+class SMTPUnavailable(Exception):
+    """
+    Raised by send_messages() when an SMTP session could not be opened (connect or login failed).
+    The batch stops rather than retrying the login per message; `unsent` holds the keys of the
+    messages that were not sent, which are safe to retry later.
+    """
+
+    def __init__(self, error, unsent):
+        super().__init__(f"Could not open an SMTP session: {error}")
+        self.error, self.unsent = error, unsent
+
+class _SessionUnavailable(Exception):
+    pass
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across all threads (a rate of 0 disables it)."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class SMTPConnectionPool:
+    """
+    Hands out up to `size` logged-in SMTP connections and reuses each for up to
+    max_per_connection messages, then reconnects (providers cap messages per session).
+    A connection is closed rather than returned to the pool if it raised, unless the server
+    only refused that message (the session was reset and stays usable). Once opening a
+    connection has failed, the pool opens no more: open_error is set and connection() raises.
+    """
+
+    def __init__(self, size=None, max_per_connection=None):
+        self.max_per_connection = max_per_connection or EMAIL_MAX_PER_CONNECTION
+        self._slots = threading.BoundedSemaphore(size or EMAIL_POOL_SIZE)
+        self._idle = queue.LifoQueue() # (server, messages sent on it)
+        self._open_lock = threading.Lock()
+        self.connections_opened = 0
+        self.open_error = None
+
+    def _open(self):
+        # One login at a time, so a bad password costs one failed login rather than one per thread
+        with self._open_lock:
+            if self.open_error is None:
+                try:
+                    server = open_smtp_connection()
+                    self.connections_opened += 1
+                    return server
+                except Exception as e:
+                    self.open_error = e
+            raise _SessionUnavailable() from self.open_error
+
+    def _release(self, server, sent):
+        if sent >= self.max_per_connection:
+            _quit_quietly(server)
+        else:
+            self._idle.put((server, sent))
+
+    @contextmanager
+    def connection(self):
+        with self._slots:
+            try:
+                server, sent = self._idle.get_nowait()
+            except queue.Empty:
+                server, sent = self._open(), 0
+            try:
+                yield server
+            except BaseException as e:
+                if _session_intact(e):
+                    self._release(server, sent + 1)
+                else:
+                    server.close() # The session may be half-open; never reuse it
+                raise
+            self._release(server, sent + 1)
+
+    def close(self):
+        """Logs out of every idle connection."""
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            _quit_quietly(server)
+
+def _session_intact(error):
+    """True if smtplib reset the session after the server refused a message, so it can be reused."""
+    import smtplib
+    return isinstance(error, (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError))
+
+def _quit_quietly(server):
+    try:
+        server.quit()
+    except Exception:
+        server.close()
+
+def is_transient_error(error):
+    """True for failures worth retrying: 4xx replies, dropped connections and timeouts."""
+    import smtplib
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPNotSupportedError):
+        return False
+    return isinstance(error, OSError) # SMTPServerDisconnected, refused or reset sockets, timeouts
+
+def send_messages(messages, pool_size=None, rate=None, max_per_connection=None, max_retries=None,
+                  retry_backoff=None, on_result=None):
+    """
+    Sends (key, EmailMessage) pairs over a small pool of reused SMTP connections.
+    Sends are spread across pool_size threads, throttled to `rate` messages per second overall,
+    and transient failures are retried with exponential backoff up to max_retries times.
+    on_result(key, error, transient) is called from the calling thread as each message finishes,
+    with error None on success. Returns the number of connections opened. If a connection
+    cannot be opened, the remaining messages are not attempted and SMTPUnavailable is raised
+    once the messages already in flight have finished.
+    """
+    pool_size = pool_size or EMAIL_POOL_SIZE
+    max_retries = EMAIL_MAX_RETRIES if max_retries is None else max_retries
+    retry_backoff = EMAIL_RETRY_BACKOFF if retry_backoff is None else retry_backoff
+    pool = SMTPConnectionPool(pool_size, max_per_connection)
+    limiter = RateLimiter(EMAIL_RATE_PER_SECOND if rate is None else rate)
+
+    def send_one(message):
+        for attempt in range(max_retries + 1):
+            if pool.open_error is not None:
+                return None
+            try:
+                limiter.wait()
+                with pool.connection() as server:
+                    server.send_message(message)
+                return None, False
+            except _SessionUnavailable:
+                return None
+            except Exception as e:
+                transient = is_transient_error(e)
+                if attempt == max_retries or not transient:
+                    return str(e) or type(e).__name__, transient
+                time.sleep(retry_backoff * 2 ** attempt)
+
+    unsent = []
+    try:
+        with ThreadPoolExecutor(max_workers=pool_size) as executor:
+            futures = {executor.submit(send_one, message): key for key, message in messages}
+            for future in as_completed(futures):
+                result = future.result()
+                if result is None:
+                    unsent.append(futures[future])
+                elif on_result:
+                    on_result(futures[future], *result)
+    finally:
+        pool.close()
+    if pool.open_error is not None:
+        raise SMTPUnavailable(pool.open_error, unsent)
+    return pool.connections_opened
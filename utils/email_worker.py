@@ -0,0 +1,107 @@
+import argparse
+import time
+from utils import config, database, email_sender, metrics
+from utils.jobs import default_worker_id
+
+def retry_delay(attempts):
+    """Seconds to wait before the next delivery attempt, doubling with every attempt made."""
+    return config.EMAIL_OUTBOX_RETRY_BACKOFF * 2 ** (attempts - 1)
+
+def process_batch(worker_id, batch_size=None):
+    """
+    Leases one batch of due emails, sends them over a pooled SMTP connection set and records
+    each outcome: sent, queued again with backoff (transient failure) or failed.
+    Returns the number of emails claimed. If no SMTP session could be opened, the emails not
+    sent are handed back without using up an attempt and SMTPUnavailable is raised.
+    """
+    claimed = database.claim_outbox_emails(
+        worker_id, batch_size or config.EMAIL_OUTBOX_BATCH_SIZE, config.EMAIL_OUTBOX_LEASE_SECONDS,
+        config.EMAIL_OUTBOX_MAX_ATTEMPTS
+    )
+    if not claimed:
+        return 0
+
+    sent_ids, retries, failures, released = [], [], [], []
+    unavailable = None
+    messages = [
+        (row, email_sender.build_interview_email(row['recipient_email'], row['candidate_name'], row['job_title']))
+        for row in claimed
+    ]
+
+    def record(row, error, transient):
+        if error is None:
+            sent_ids.append(row['id'])
+        elif transient and row['attempts'] < config.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            retries.append((row['id'], error, time.time() + retry_delay(row['attempts'])))
+            metrics.record("smtp_send", retries=1, error=error)
+        else:
+            failures.append((row['id'], error))
+            metrics.record("smtp_send", error=error)
+            print(f"Giving up on email to {row['recipient_email']} after {row['attempts']} attempt(s): {error}")
+
+    metrics.begin_run("email")
+    try:
+        # Retries happen across batches via next_attempt_at, so a failed send never blocks the batch
+        with metrics.stage("smtp_batch"):
+            try:
+                email_sender.send_messages(messages, max_retries=0, on_result=record)
+            except email_sender.SMTPUnavailable as e:
+                unavailable = e
+                released = [(row['id'], str(e)) for row in e.unsent]
+                metrics.record("smtp_send", error=str(e))
+        with metrics.stage("db_write"):
+            database.record_outbox_results(worker_id, sent_ids, retries, failures, released)
+    finally:
+        metrics.end_run()
+    print(f"Outbox batch: {len(sent_ids)} sent, {len(retries)} to retry, {len(failures)} failed, "
+          f"{len(released)} not attempted.")
+    if unavailable:
+        raise unavailable
+    return len(claimed)
+
+def run_worker(worker_id=None, batch_size=None, poll_interval=None, drain=False):
+    """
+    Drains the email outbox until interrupted, sleeping poll_interval seconds whenever it is empty.
+    While the SMTP server cannot be reached or refuses the login, waits retry_delay() seconds,
+    doubling each time, before trying again. With drain, returns once no email is due (or the
+    server is unavailable) instead of waiting for more.
+    """
+    worker_id = worker_id or default_worker_id()
+    poll_interval = config.EMAIL_WORKER_POLL_INTERVAL if poll_interval is None else poll_interval
+    if not email_sender.credentials_configured():
+        print("Error: Email credentials not configured in config.py or .env file.")
+        return
+    print(f"Email worker {worker_id} polling the outbox every {poll_interval}s (Ctrl+C to stop)...")
+    unavailable_in_a_row = 0
+    try:
+        while True:
+            try:
+                claimed = process_batch(worker_id, batch_size)
+                unavailable_in_a_row = 0
+            except email_sender.SMTPUnavailable as e:
+                if drain:
+                    print(f"{e}; stopping.")
+                    return
+                unavailable_in_a_row += 1
+                delay = retry_delay(unavailable_in_a_row)
+                print(f"{e}; trying again in {delay:.0f}s.")
+                time.sleep(delay)
+                continue
+            if claimed:
+                continue
+            if drain:
+                return
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        print("Stopped email worker.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Send the interview emails queued in the outbox.")
+    parser.add_argument("--batch-size", type=int, help="Emails leased per claim")
+    parser.add_argument("--interval", type=float, help="Seconds to wait when the outbox is empty")
+    parser.add_argument("--drain", action="store_true", help="Exit once no queued email is due")
+    args = parser.parse_args()
+
+    config.ensure_directories()
+    database.init_database()
+    run_worker(batch_size=args.batch_size, poll_interval=args.interval, drain=args.drain)
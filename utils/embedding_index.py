@@ -0,0 +1,236 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+import numpy as np
+from utils import config, database, llm_client
+
+try:
+    import fcntl
+except ImportError: # Windows: no cross-process lock, so run one ingesting process at a time there
+    fcntl = None
+
+class EmbeddingIndex:
+    """
+    A persistent nearest-neighbour index: a memory-mapped float32 matrix of unit-length
+    embeddings plus the row -> database ID map. Rows are overwritten in place when an ID is
+    upserted again, and a search is a single matrix-vector product over the stored rows.
+    Several processes (dashboard, job workers, CLI runs) share the files: writes hold an
+    exclusive file lock, and every read or write first reloads the index if another process
+    saved it since.
+    """
+
+    def __init__(self, name, directory=None, model=None):
+        directory = directory or config.EMBEDDING_DIR
+        self.model = model or config.OLLAMA_EMBED_MODEL
+        self.matrix_path = os.path.join(directory, f"{name}.f32")
+        self.ids_path = os.path.join(directory, f"{name}.ids.npy")
+        self.meta_path = os.path.join(directory, f"{name}.meta.json")
+        self.lock_path = os.path.join(directory, f"{name}.lock")
+        self._lock = threading.Lock()
+        self._loaded_stamp = None # (mtime, size) of the meta file this process last loaded or saved
+        self._reset()
+        with self._lock:
+            self._refresh()
+
+    def _reset(self):
+        self._matrix = None
+        self._ids = np.empty(0, dtype=np.int64)
+        self._rows = {} # database ID -> row number
+        self.dim = None
+
+    def _stamp(self):
+        try:
+            stat = os.stat(self.meta_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    @contextmanager
+    def _file_lock(self, exclusive):
+        """Holds the index's lock file, shared for loading and exclusive for writing."""
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+        with open(self.lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _refresh(self, locked=False):
+        """Reloads the index if its files changed since this process last saw them (call with self._lock held)."""
+        stamp = self._stamp()
+        if stamp is None or stamp == self._loaded_stamp:
+            return
+        if locked:
+            self._load()
+        else:
+            with self._file_lock(exclusive=False):
+                self._load()
+
+    def _load(self):
+        self._reset()
+        self._loaded_stamp = self._stamp()
+        if self._loaded_stamp is None:
+            return
+        with open(self.meta_path) as f:
+            meta = json.load(f)
+        if meta.get("model") != self.model:
+            # Vectors from another model are not comparable; start over
+            print(f"Embedding model changed ({meta.get('model')} -> {self.model}), rebuilding {self.matrix_path}")
+            return
+        self.dim = meta["dim"]
+        self._ids = np.load(self.ids_path)
+        self._rows = {int(item_id): row for row, item_id in enumerate(self._ids)}
+        capacity = os.path.getsize(self.matrix_path) // (4 * self.dim)
+        self._matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def _save_meta(self):
+        # Rows first, then the IDs and meta each replaced whole, so a reader never sees a half-written file
+        self._matrix.flush()
+        with open(self.ids_path + ".tmp", "wb") as f:
+            np.save(f, self._ids)
+        os.replace(self.ids_path + ".tmp", self.ids_path)
+        with open(self.meta_path + ".tmp", "w") as f:
+            json.dump({"model": self.model, "dim": self.dim, "count": len(self._ids)}, f)
+        os.replace(self.meta_path + ".tmp", self.meta_path)
+        self._loaded_stamp = self._stamp()
+
+    def _ensure_capacity(self, rows_needed):
+        capacity = 0 if self._matrix is None else self._matrix.shape[0]
+        if rows_needed <= capacity:
+            return
+        new_capacity = max(1024, capacity * 2, rows_needed)
+        if self._matrix is not None:
+            self._matrix.flush()
+            del self._matrix
+        # Extending the file zero-fills the new rows; existing rows keep their place
+        os.makedirs(os.path.dirname(self.matrix_path), exist_ok=True)
+        with open(self.matrix_path, "ab") as f:
+            f.truncate(new_capacity * self.dim * 4)
+        self._matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r+", shape=(new_capacity, self.dim))
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return len(self._ids)
+
+    def __contains__(self, item_id):
+        with self._lock:
+            self._refresh()
+            return item_id in self._rows
+
+    def upsert_many(self, items):
+        """Stores (item_id, vector) pairs, replacing the vectors of IDs already indexed."""
+        items = list(items)
+        if not items:
+            return
+        with self._lock, self._file_lock(exclusive=True):
+            # Another process may have added rows since; append after them instead of over them
+            self._refresh(locked=True)
+            if self.dim is None:
+                self.dim = len(items[0][1])
+                self._ids = np.empty(0, dtype=np.int64)
+                self._rows = {}
+                if os.path.exists(self.matrix_path):
+                    os.remove(self.matrix_path)
+            new_ids = [item_id for item_id, _ in items if item_id not in self._rows]
+            new_ids = list(dict.fromkeys(new_ids))
+            self._ensure_capacity(len(self._ids) + len(new_ids))
+            for item_id in new_ids:
+                self._rows[item_id] = len(self._rows)
+            self._ids = np.concatenate([self._ids, np.array(new_ids, dtype=np.int64)])
+            for item_id, vector in items:
+                vector = np.asarray(vector, dtype=np.float32)
+                norm = np.linalg.norm(vector)
+                self._matrix[self._rows[item_id]] = vector / norm if norm else vector
+            self._save_meta()
+
+    def upsert(self, item_id, vector):
+        """Stores or replaces the vector for one ID."""
+        self.upsert_many([(item_id, vector)])
+
+    def search(self, vector, k=50):
+        """Returns up to k (item_id, cosine similarity) pairs, best first."""
+        with self._lock:
+            self._refresh()
+            count = len(self._ids)
+            if not count:
+                return []
+            query = np.asarray(vector, dtype=np.float32)
+            query = query / (np.linalg.norm(query) or 1.0)
+            similarities = self._matrix[:count] @ query
+            k = min(k, count)
+            top = np.argpartition(-similarities, k - 1)[:k]
+            top = top[np.argsort(-similarities[top])]
+            return [(int(self._ids[row]), float(similarities[row])) for row in top]
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_index(name):
+    """Returns the process-wide index for 'candidates' or 'job_descriptions'."""
+    with _indexes_lock:
+        if name not in _indexes:
+            _indexes[name] = EmbeddingIndex(name)
+        return _indexes[name]
+
+def candidate_text(candidate_data):
+    """Builds the text embedded for a candidate from the extracted profile fields."""
+    return "\n".join(
+        f"{label}: {candidate_data.get(field) or 'N/A'}"
+        for label, field in (("Skills", "skills"), ("Experience", "experience"), ("Education", "education"))
+    )
+
+def embed_text(text):
+    """Embeds one text with the local embedding model. Returns None on error."""
+    try:
+        return llm_client.embed([text])[0]
+    except Exception as e:
+        print(f"Error computing embedding: {e}")
+        return None
+
+def index_job_description(jd_id, summary):
+    """Embeds and indexes a JD summary. Returns True on success."""
+    vector = embed_text(summary) if summary else None
+    if vector is None:
+        return False
+    get_index("job_descriptions").upsert(jd_id, vector)
+    return True
+
+def find_candidates_for_jd(jd_summary, k=50):
+    """Returns the k stored candidates closest to a JD summary as (candidate_id, similarity) pairs."""
+    vector = embed_text(jd_summary)
+    if vector is None:
+        return []
+    return get_index("candidates").search(vector, k)
+
+def find_jds_for_candidate(candidate_data, k=10):
+    """Returns the k stored JDs closest to a candidate profile as (jd_id, similarity) pairs."""
+    vector = embed_text(candidate_text(candidate_data))
+    if vector is None:
+        return []
+    return get_index("job_descriptions").search(vector, k)
+
+def rebuild_indexes(batch_size=64, missing_only=False):
+    """
+    Backfills both indexes from the database, e.g. after changing the embedding model.
+    With missing_only, only rows not yet indexed are embedded (e.g. after a sharded ingestion run).
+    """
+    candidates = database.get_all_candidate_profiles()
+    if missing_only:
+        candidates = [row for row in candidates if row['id'] not in get_index("candidates")]
+    for start in range(0, len(candidates), batch_size):
+        batch = candidates[start:start + batch_size]
+        vectors = llm_client.embed([candidate_text(row) for row in batch])
+        get_index("candidates").upsert_many(zip([row['id'] for row in batch], vectors))
+    jds = [jd for jd in database.get_all_jds() if jd['summary']
+           and not (missing_only and jd['id'] in get_index("job_descriptions"))]
+    for start in range(0, len(jds), batch_size):
+        batch = jds[start:start + batch_size]
+        vectors = llm_client.embed([jd['summary'] for jd in batch])
+        get_index("job_descriptions").upsert_many(zip([jd['id'] for jd in batch], vectors))
+    print(f"Indexed {len(candidates)} candidates and {len(jds)} job descriptions.")
@@ -0,0 +1,119 @@
+import argparse
+import os
+import time
+from utils import config, database, pipeline
+
+def _backing_off(entry, now):
+    """True if a failed, unchanged file should not be retried yet (or, after INGEST_MAX_ATTEMPTS, at all)."""
+    if not entry['attempts']:
+        return False
+    if entry['attempts'] >= config.INGEST_MAX_ATTEMPTS:
+        return True
+    return now < (entry['recorded_at'] or 0) + config.INGEST_RETRY_SECONDS * 2 ** (entry['attempts'] - 1)
+
+def scan_folder(folder=None, min_age=0, retry_failed=True):
+    """
+    Compares the resume folder with the ingestion ledger.
+    Returns a dict with:
+      to_process - filenames that are new, modified (size or mtime changed) or previously failed
+      unchanged  - {filename: candidate_id} for files already ingested successfully
+      held_back  - {filename: failed attempts} for unchanged failed files not retried yet
+                   (only without retry_failed; otherwise those are in to_process)
+      deleted    - ledger paths whose file is gone; these are tombstoned as a side effect
+    Files modified less than min_age seconds ago are left for a later scan, so a
+    half-copied PDF is not ingested.
+    """
+    folder = os.path.abspath(folder or config.RESUME_FOLDER)
+    entries = database.get_ledger_entries(folder)
+    now = time.time()
+    to_process, unchanged, held_back, seen = [], {}, {}, set()
+
+    for filename in pipeline.list_resume_files(folder):
+        path = os.path.join(folder, filename)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue # Removed between listdir and stat
+        seen.add(path)
+        if now - stat.st_mtime < min_age:
+            continue
+        entry = entries.get(path)
+        same_file = entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime
+        if same_file and entry['status'] == 'done' and entry['candidate_id']:
+            unchanged[filename] = entry['candidate_id']
+        elif same_file and entry['status'] == 'failed' and not retry_failed and _backing_off(entry, now):
+            held_back[filename] = entry['attempts']
+        else:
+            to_process.append(filename)
+
+    deleted = [path for path, entry in entries.items() if path not in seen and entry['status'] != 'deleted']
+    database.tombstone_ledger_entries(deleted)
+    return {"to_process": to_process, "unchanged": unchanged, "held_back": held_back, "deleted": deleted}
+
+def run_ingestion(jd_id=None, jd_summary=None, folder=None, **pipeline_options):
+    """
+    Ingests only the new, modified or previously failed resumes in the folder and,
+    when a JD is given, scores every live candidate in it against that JD
+    (stored scores whose inputs are unchanged are reused by the pipeline).
+    Returns (scan result, number of resumes processed).
+    """
+    folder = os.path.abspath(folder or config.RESUME_FOLDER)
+    scan = scan_folder(folder, min_age=pipeline_options.pop("min_age", 0))
+    known_candidates = scan["unchanged"] if jd_id is not None else {}
+    processed = pipeline.process_resumes(
+        jd_id, jd_summary, scan["to_process"], folder=folder, known_candidates=known_candidates, **pipeline_options
+    )
+    return scan, processed
+
+def watch_folder(jd_id=None, folder=None, interval=10, **pipeline_options):
+    """
+    Polls the resume folder every `interval` seconds and ingests files as they land,
+    scoring them against jd_id if given. A file that fails is retried after INGEST_RETRY_SECONDS,
+    doubling each time, and left alone after INGEST_MAX_ATTEMPTS failures until it changes.
+    Runs until interrupted.
+    """
+    folder = os.path.abspath(folder or config.RESUME_FOLDER)
+    jd_summary = database.get_jd_summary(jd_id) if jd_id is not None else None
+    print(f"Watching {folder} every {interval}s (Ctrl+C to stop)...")
+    first_pass, given_up = True, set()
+    try:
+        while True:
+            # Skip files touched within the last poll interval; they may still be copying
+            scan = scan_folder(folder, min_age=interval, retry_failed=False)
+            exhausted = {filename for filename, attempts in scan["held_back"].items()
+                         if attempts >= config.INGEST_MAX_ATTEMPTS}
+            for filename in sorted(exhausted - given_up):
+                print(f"Giving up on {filename} after {scan['held_back'][filename]} failed attempts; "
+                      "it is retried once it changes.")
+            given_up = exhausted
+            # Files ingested before the watcher started still need scoring against this JD once
+            known_candidates = scan["unchanged"] if first_pass and jd_id is not None else {}
+            if scan["to_process"] or scan["deleted"] or known_candidates:
+                print(f"Found {len(scan['to_process'])} new/changed and {len(scan['deleted'])} deleted resume(s).")
+                processed = pipeline.process_resumes(
+                    jd_id, jd_summary, scan["to_process"], folder=folder,
+                    known_candidates=known_candidates, **pipeline_options
+                )
+                print(f"Processed {processed} resume(s).")
+            first_pass = False
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally ingest the resume folder.")
+    parser.add_argument("--jd-id", type=int, help="Score ingested resumes against this job description")
+    parser.add_argument("--folder", default=config.RESUME_FOLDER, help="Resume folder to ingest")
+    parser.add_argument("--watch", action="store_true", help="Keep polling the folder for new resumes")
+    parser.add_argument("--interval", type=int, default=10, help="Polling interval in seconds for --watch")
+    args = parser.parse_args()
+
+    config.ensure_directories()
+    database.init_database()
+    if args.watch:
+        watch_folder(args.jd_id, args.folder, args.interval)
+    else:
+        jd_summary = database.get_jd_summary(args.jd_id) if args.jd_id is not None else None
+        scan, processed = run_ingestion(args.jd_id, jd_summary, args.folder)
+        print(f"{len(scan['to_process'])} to ingest, {len(scan['unchanged'])} unchanged, "
+              f"{len(scan['deleted'])} deleted; processed {processed} resume(s).")
@@ -0,0 +1,101 @@
+import json
+import os
+import socket
+import threading
+import time
+from utils import config, database
+
+class JobLeaseLost(Exception):
+    """Raised inside a job once another worker has reclaimed it after a stale heartbeat."""
+
+def default_worker_id():
+    """Identifies this worker process in job claims and leases."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def run_ingest_job(job, worker_id):
+    """Runs an 'ingest' job: incremental ingestion of a folder, scored against the job's JD if it has one."""
+    from utils import ingest # Pulls in the pipeline and agents, so only once a job actually runs
+    options = json.loads(job['options'] or "{}")
+    jd_summary = None
+    if job['jd_id'] is not None:
+        jd_summary = database.get_jd_summary(job['jd_id'])
+        if not jd_summary:
+            raise ValueError(f"Job description {job['jd_id']} has no summary to score against.")
+    warnings = 0
+    last_write = 0.0
+
+    def on_progress(done, total, filename):
+        nonlocal last_write
+        # At most one progress write per second; the last file always gets one
+        if done == total or time.monotonic() - last_write >= 1:
+            last_write = time.monotonic()
+            if not database.update_job_progress(job['id'], worker_id, done, total,
+                                                f"Finished {filename} ({done}/{total} resumes).", warnings):
+                # The new owner runs the job again; stop here instead of ingesting alongside it
+                raise JobLeaseLost(f"Job {job['id']} is no longer owned by {worker_id}.")
+
+    def on_issue(level, message):
+        nonlocal warnings
+        print(f"[Job {job['id']}] [{level.upper()}] {message}")
+        if level != "info":
+            warnings += 1
+
+    scan, processed = ingest.run_ingestion(
+        job['jd_id'], jd_summary, job['folder'], on_progress=on_progress, on_issue=on_issue, **options
+    )
+    if not database.update_job_progress(job['id'], worker_id, warnings=warnings):
+        raise JobLeaseLost(f"Job {job['id']} is no longer owned by {worker_id}.")
+    return processed, (f"Processed {processed} resume(s): {len(scan['to_process'])} new/changed, "
+                       f"{len(scan['unchanged'])} unchanged, {len(scan['deleted'])} deleted.")
+
+# Job kind -> function(job, worker_id) returning (processed_count, final message)
+JOB_HANDLERS = {
+    "ingest": run_ingest_job,
+}
+
+def _heartbeat(job_id, worker_id, stop):
+    # Keeps the claim fresh through long LLM calls that report no progress for a while
+    while not stop.wait(config.JOB_HEARTBEAT_INTERVAL):
+        if not database.update_job_progress(job_id, worker_id):
+            break # Reclaimed by another worker; the job stops at its next progress update
+    database.close_db_connection()
+
+def run_job(job, worker_id):
+    """Runs one claimed job to completion and records whether it finished or failed."""
+    print(f"Running job {job['id']} ({job['kind']}) for JD {job['jd_id']}...")
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat, args=(job['id'], worker_id, stop), daemon=True)
+    heartbeat.start()
+    try:
+        processed, message = JOB_HANDLERS[job['kind']](job, worker_id)
+        database.finish_job(job['id'], worker_id, "done", message, processed)
+        print(f"Job {job['id']} done. {message}")
+    except JobLeaseLost as e:
+        # The job belongs to another worker now, so its status is theirs to record
+        print(f"Job {job['id']} stopped: {e}")
+    except Exception as e:
+        database.finish_job(job['id'], worker_id, "failed", f"{type(e).__name__}: {e}")
+        print(f"Job {job['id']} failed: {e}")
+    finally:
+        stop.set()
+        heartbeat.join()
+
+def run_worker(worker_id=None, poll_interval=None, drain=False):
+    """
+    Claims and runs submitted jobs one at a time until interrupted.
+    With drain, returns once no job is pending instead of waiting for more.
+    """
+    worker_id = worker_id or default_worker_id()
+    poll_interval = config.JOB_POLL_INTERVAL if poll_interval is None else poll_interval
+    print(f"Job worker {worker_id} polling for jobs every {poll_interval}s (Ctrl+C to stop)...")
+    try:
+        while True:
+            job = database.claim_next_job(worker_id, config.JOB_STALE_SECONDS)
+            if job:
+                run_job(job, worker_id)
+            elif drain:
+                return
+            else:
+                time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        print("Stopped job worker.")
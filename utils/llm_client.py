@@ -0,0 +1,146 @@
+import threading
+import time
+from . import metrics
+from .config import OLLAMA_BASE_URL, OLLAMA_MODEL, OLLAMA_EMBED_MODEL, OLLAMA_KEEP_ALIVE, OLLAMA_HEALTH_TTL, OLLAMA_REQUEST_TIMEOUT
+
+# Process-wide state shared by every agent. The ollama client wraps an httpx
+# connection pool, so reusing it keeps HTTP connections to the server alive.
+# ollama and langchain are imported on first use to keep them off the app's startup path.
+_lock = threading.Lock()
+_warm_lock = threading.Lock() # Serializes warm-ups so concurrent first calls load the model once
+_client = None
+_healthy_until = 0.0 # time.monotonic() deadline for the last successful health check
+_warm_models = set()
+_llms = {}
+
+def set_base_url(base_url):
+    """
+    Points this process at another Ollama server, e.g. one per sharded ingestion worker.
+    Call before the first LLM request; the client, health check and warm models start over.
+    """
+    global OLLAMA_BASE_URL, _client, _healthy_until
+    with _lock:
+        OLLAMA_BASE_URL = base_url
+        _client = None
+        _healthy_until = 0.0
+        _warm_models.clear()
+
+def get_client():
+    """Returns the shared Ollama client, creating it on first use."""
+    global _client
+    with _lock:
+        if _client is None:
+            import ollama
+            _client = ollama.Client(host=OLLAMA_BASE_URL, timeout=OLLAMA_REQUEST_TIMEOUT)
+        return _client
+
+def is_available(force=False):
+    """
+    Checks that the Ollama server is reachable.
+    A successful check is reused for OLLAMA_HEALTH_TTL seconds; a failed one is never cached.
+    """
+    global _healthy_until
+    if not force and time.monotonic() < _healthy_until:
+        return True
+    try:
+        get_client().list() # Cheap metadata call, no generation involved
+    except Exception as e:
+        _healthy_until = 0.0
+        print(f"Error connecting to Ollama: {e}")
+        print(f"Please ensure Ollama is running at {OLLAMA_BASE_URL}")
+        return False
+    _healthy_until = time.monotonic() + OLLAMA_HEALTH_TTL
+    return True
+
+def mark_unhealthy(model=None):
+    """Forces the next call to re-probe the server (and re-warm the model, if given)."""
+    global _healthy_until
+    _healthy_until = 0.0
+    if model:
+        _warm_models.discard(model)
+
+def warm_up(model=None):
+    """Loads the model into Ollama's memory once, pinned for OLLAMA_KEEP_ALIVE."""
+    model = model or OLLAMA_MODEL
+    if model in _warm_models:
+        return True
+    with _warm_lock:
+        if model in _warm_models:
+            return True
+        try:
+            # An empty prompt loads the model without generating anything
+            get_client().generate(model=model, prompt="", keep_alive=OLLAMA_KEEP_ALIVE)
+        except Exception as e:
+            print(f"Error loading Ollama model '{model}': {e}")
+            print(f"Please ensure the model '{model}' is available at {OLLAMA_BASE_URL}")
+            return False
+        _warm_models.add(model)
+    print(f"Successfully connected to Ollama model: {model} at {OLLAMA_BASE_URL}")
+    return True
+
+def generate(prompt, model=None, **kwargs):
+    """
+    Runs a single completion through the shared client and returns the raw Ollama response.
+    Its wall time and token counts are recorded in the active metrics run.
+    """
+    model = model or OLLAMA_MODEL
+    start = time.perf_counter()
+    try:
+        response = get_client().generate(model=model, prompt=prompt, keep_alive=OLLAMA_KEEP_ALIVE, **kwargs)
+    except Exception as e:
+        metrics.record_llm_call(time.perf_counter() - start, error=f"{type(e).__name__}: {e}")
+        mark_unhealthy(model)
+        raise
+    metrics.record_llm_call(time.perf_counter() - start, response)
+    return response
+
+def chat(messages, model=None, **kwargs):
+    """
+    Runs a chat completion through the shared client and returns the raw Ollama response.
+    Requests that start with the same messages share a prompt prefix, which Ollama keeps in
+    the KV cache of a loaded model (see OLLAMA_KEEP_ALIVE) instead of evaluating it again.
+    """
+    model = model or OLLAMA_MODEL
+    start = time.perf_counter()
+    try:
+        response = get_client().chat(model=model, messages=messages, keep_alive=OLLAMA_KEEP_ALIVE, **kwargs)
+    except Exception as e:
+        metrics.record_llm_call(time.perf_counter() - start, error=f"{type(e).__name__}: {e}")
+        mark_unhealthy(model)
+        raise
+    metrics.record_llm_call(time.perf_counter() - start, response)
+    return response
+
+def embed(texts, model=None):
+    """Embeds a list of texts through the shared client and returns one vector per text."""
+    model = model or OLLAMA_EMBED_MODEL
+    start = time.perf_counter()
+    try:
+        response = get_client().embed(model=model, input=texts, keep_alive=OLLAMA_KEEP_ALIVE)
+    except Exception as e:
+        metrics.record_llm_call(time.perf_counter() - start, error=f"{type(e).__name__}: {e}")
+        mark_unhealthy(model)
+        raise
+    metrics.record_llm_call(time.perf_counter() - start, response)
+    return response["embeddings"]
+
+def _prompt_to_text(prompt):
+    """Accepts either a plain string or a LangChain PromptValue."""
+    return prompt.to_string() if hasattr(prompt, "to_string") else str(prompt)
+
+def get_llm(model=None):
+    """
+    Returns a LangChain runnable backed by the shared client, so it can be piped
+    between a prompt and a parser. Returns None if Ollama is not reachable.
+    """
+    model = model or OLLAMA_MODEL
+    if not is_available() or not warm_up(model):
+        return None
+    with _lock:
+        if model not in _llms:
+            from langchain_core.runnables import RunnableLambda
+            _llms[model] = RunnableLambda(
+                lambda prompt: generate(_prompt_to_text(prompt), model=model)["response"],
+                name=f"ollama:{model}",
+            )
+        return _llms[model]
@@ -1,26 +1,54 @@
-from langchain_community.llms import Ollama
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from utils.config import OLLAMA_BASE_URL, OLLAMA_MODEL
+from utils.llm_client import is_available, warm_up, chat # Shared, pooled Ollama client
+from utils.config import MATCH_BATCH_SIZE
+from utils import metrics, model_router
+import hashlib
+import json
 import re # For extracting the score
 
-def get_llm():
-    """Initializes and returns the Ollama LLM instance."""
-    try:
-        llm = Ollama(base_url=OLLAMA_BASE_URL, model=OLLAMA_MODEL)
-        llm.invoke("Test connection") # Simple test
-        return llm
-    except Exception as e:
-        print(f"Error connecting to Ollama: {e}")
-        return None
+# Bump whenever the scoring prompt changes, so stored scores are no longer treated as current
+SCORING_PROMPT_VERSION = "2"
+
+# The instructions and the JD summary form the system message, so every candidate scored
+# against a JD shares the same prompt prefix. Ollama keeps that prefix in the loaded model's
+# KV cache and only evaluates each candidate's profile; the instructions therefore must not
+# mention anything candidate-specific.
+SCORING_SYSTEM_PROMPT = """You are a hiring expert comparing a job description summary against a candidate profile.
+Analyze the match based on skills, experience, and qualifications.
+For the candidate profile you are given, provide a match score between 0 (no match) and 100 (perfect match).
+Focus on the relevance of the candidate's skills and experience to the job requirements.
+Output ONLY the integer score. For example: 85
+
+Job Description Summary:
+---
+{jd_summary}
+---"""
+# A score is at most a few tokens; stop before the model adds an explanation
+SCORE_OPTIONS = {"num_predict": 8, "stop": ["\n\n"]}
+
+def build_candidate_profile(candidate_data):
+    """Combines the candidate fields the matcher scores on into a single string."""
+    return f"""
+    Candidate Skills: {candidate_data.get('skills', 'N/A')}
+    Candidate Experience: {candidate_data.get('experience', 'N/A')}
+    Candidate Education: {candidate_data.get('education', 'N/A')}
+    """
 
-def calculate_match_score(jd_summary, candidate_data):
+def score_fingerprint(jd_summary, candidate_data, model=None):
     """
-    Uses an LLM to calculate a match score between a JD summary and candidate data.
-    Returns an integer score (0-100) or -1 on error.
+    Hashes everything that determines a match score: the JD summary, the candidate
+    profile, the model routing and the scoring prompt version. Equal fingerprints mean a
+    stored score can be reused instead of asking the LLM again.
     """
-    llm = get_llm()
-    if not llm:
+    inputs = [jd_summary, build_candidate_profile(candidate_data), model or model_router.scoring_route(), SCORING_PROMPT_VERSION]
+    return hashlib.sha256(json.dumps(inputs).encode("utf-8")).hexdigest()
+
+def calculate_match_score(jd_summary, candidate_data, model=None):
+    """
+    Uses an LLM (the scoring model unless another is given) to calculate a match score
+    between a JD summary and candidate data. Returns an integer score (0-100) or -1 on error.
+    """
+    model = model or model_router.model_for("score")
+    if not is_available() or not warm_up(model):
         print("Matcher Error: Could not connect to LLM.")
         return -1
     if not jd_summary or not candidate_data:
@@ -28,42 +56,14 @@ def calculate_match_score(jd_summary, candidate_data):
         return -1
 
     # Combine relevant candidate info into a single string
-    candidate_profile = f"""
-    Candidate Skills: {candidate_data.get('skills', 'N/A')}
-    Candidate Experience: {candidate_data.get('experience', 'N/A')}
-    Candidate Education: {candidate_data.get('education', 'N/A')}
-    """
-
-    prompt_template = PromptTemplate.from_template(
-        """
-        You are a hiring expert comparing a job description summary against a candidate profile.
-        Analyze the match based on skills, experience, and qualifications.
-
-        Job Description Summary:
-        ---
-        {jd_summary}
-        ---
-
-        Candidate Profile:
-        ---
-        {candidate_profile}
-        ---
-
-        Based on the comparison, provide a match score between 0 (no match) and 100 (perfect match).
-        Focus on the relevance of the candidate's skills and experience to the job requirements.
-        Output ONLY the integer score. For example: 85
-        Score:
-        """
-    )
-
-    parser = StrOutputParser()
-    chain = prompt_template | llm | parser
+    candidate_profile = build_candidate_profile(candidate_data)
+    messages = [
+        {"role": "system", "content": SCORING_SYSTEM_PROMPT.format(jd_summary=jd_summary)},
+        {"role": "user", "content": f"Candidate Profile:\n---{candidate_profile}---\nScore:"},
+    ]
 
     try:
-        result_str = chain.invoke({
-            "jd_summary": jd_summary,
-            "candidate_profile": candidate_profile
-        })
+        result_str = chat(messages, model=model, options=SCORE_OPTIONS)["message"]["content"]
 
         # Extract the number from the LLM response
         match = re.search(r'\d+', result_str)
@@ -78,4 +78,101 @@ def calculate_match_score(jd_summary, candidate_data):
 
     except Exception as e:
         print(f"Error during matching: {e}")
-        return -1
\ No newline at end of file
+        return -1
+
+# Same layout as single scoring: instructions and JD summary first, the batch of profiles last
+BATCH_SYSTEM_PROMPT = """You are a hiring expert comparing a job description summary against several candidate profiles.
+Analyze each match based on skills, experience, and qualifications.
+For EVERY candidate profile you are given, provide a match score between 0 (no match) and 100 (perfect match).
+Focus on the relevance of each candidate's skills and experience to the job requirements.
+Score each candidate independently of the others.
+Respond ONLY with a JSON object of this form, with one entry per candidate ID:
+{{"scores": [{{"id": "<candidate ID>", "score": <integer 0-100>}}]}}
+
+Job Description Summary:
+---
+{jd_summary}
+---"""
+BATCH_TOKENS_PER_CANDIDATE = 24 # Output cap per candidate; one {"id": ..., "score": ...} entry is ~15 tokens
+
+def _score_batch(jd_summary, batch, model):
+    """
+    Scores one batch of {candidate_id: candidate_data} in a single LLM call.
+    Returns {candidate_id: score} for the IDs the model answered for; missing IDs are simply absent.
+    """
+    candidate_profiles = "\n".join(
+        f"---\n    ID: {candidate_id}{build_candidate_profile(candidate_data)}---"
+        for candidate_id, candidate_data in batch.items()
+    )
+    messages = [
+        {"role": "system", "content": BATCH_SYSTEM_PROMPT.format(jd_summary=jd_summary)},
+        {"role": "user", "content": f"Candidate Profiles:\n{candidate_profiles}\nJSON Output:"},
+    ]
+    try:
+        response = chat(messages, model=model, format="json",
+                        options={"num_predict": BATCH_TOKENS_PER_CANDIDATE * (len(batch) + 1)})
+        entries = json.loads(response["message"]["content"]).get("scores", [])
+    except Exception as e:
+        print(f"Matcher Warning: Batch scoring failed, falling back to single scoring: {e}")
+        return {}
+
+    ids_by_label = {str(candidate_id): candidate_id for candidate_id in batch}
+    scores = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        candidate_id = ids_by_label.get(str(entry.get("id")).strip())
+        match = re.search(r'\d+', str(entry.get("score")))
+        if candidate_id is not None and match:
+            # Clamp score to 0-100 range
+            scores[candidate_id] = max(0, min(100, int(match.group(0))))
+    return scores
+
+def calculate_match_scores_batch(jd_summary, candidates, batch_size=None, model=None):
+    """
+    Scores many candidates against one JD summary, sending up to batch_size profiles
+    per LLM call so there are fewer requests and answers to generate.
+    candidates maps candidate_id -> candidate_data. Returns {candidate_id: score}, using the
+    same 0-100 / -1 convention as calculate_match_score. Any ID the model leaves out of its
+    JSON answer is re-scored on its own.
+    """
+    model = model or model_router.model_for("score")
+    batch_size = batch_size or MATCH_BATCH_SIZE
+    if not jd_summary:
+        print("Matcher Error: Missing JD summary.")
+        return {candidate_id: -1 for candidate_id in candidates}
+    if batch_size <= 1 or len(candidates) <= 1 or not is_available():
+        return {candidate_id: calculate_match_score(jd_summary, data, model) for candidate_id, data in candidates.items()}
+
+    items = list(candidates.items())
+    scores = {}
+    for start in range(0, len(items), batch_size):
+        batch = dict(items[start:start + batch_size])
+        batch_scores = _score_batch(jd_summary, batch, model)
+        missing = [candidate_id for candidate_id in batch if candidate_id not in batch_scores]
+        if missing:
+            print(f"Matcher Warning: Batch response missing {len(missing)} of {len(batch)} candidates; scoring them individually.")
+            metrics.record("score", retries=len(missing))
+        for candidate_id in missing:
+            batch_scores[candidate_id] = calculate_match_score(jd_summary, batch[candidate_id], model)
+        scores.update(batch_scores)
+    return scores
+
+def score_candidates(jd_summary, candidates, batch_size=None):
+    """
+    Scores candidates with the first-pass scoring model, then re-scores those whose score is
+    near MATCH_THRESHOLD with the escalation model (if one is configured).
+    Returns {candidate_id: (score, model that produced it)}.
+    """
+    model = model_router.model_for("score")
+    results = {candidate_id: (score, model)
+               for candidate_id, score in calculate_match_scores_batch(jd_summary, candidates, batch_size, model).items()}
+    escalation = model_router.escalation_model("score")
+    borderline = {candidate_id: candidates[candidate_id] for candidate_id, (score, _) in results.items()
+                  if model_router.is_borderline_score(score)}
+    if escalation and borderline:
+        metrics.record("escalate.score", retries=len(borderline))
+        for candidate_id, score in calculate_match_scores_batch(jd_summary, borderline, batch_size, escalation).items():
+            if score != -1: # Keep the first-pass score if the larger model fails
+                results[candidate_id] = (score, escalation)
+    return results
@@ -0,0 +1,179 @@
+import contextvars
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from utils import config, database
+
+# Per-run instrumentation. While a run is active (begin_run ... end_run), pipeline stages and
+# LLM calls append samples to an in-memory buffer; end_run writes them to run_metrics in one
+# transaction and refreshes the Prometheus text file, so instrumented code running on pool
+# threads never touches SQLite itself. One run is active per process at a time; samples
+# recorded outside a run (e.g. the dashboard's own LLM calls) are dropped.
+_lock = threading.Lock()
+_run = None # {"id", "started", "depth", "samples"} of the run in progress
+_stage = contextvars.ContextVar("metrics_stage", default=None) # Stage the current thread is working on
+
+def begin_run(kind, jd_id=None):
+    """
+    Starts collecting samples for a run of `kind` ('ingest', 'email'). A run begun while
+    another is active joins it, and only the outermost end_run stores it. Returns the run ID.
+    """
+    global _run
+    if not config.METRICS_ENABLED:
+        return None
+    with _lock:
+        if _run is not None:
+            _run["depth"] += 1
+            return _run["id"]
+    run_id = database.start_metric_run(kind, jd_id)
+    if run_id is None:
+        return None
+    with _lock:
+        _run = {"id": run_id, "started": time.perf_counter(), "depth": 1, "samples": []}
+    return run_id
+
+def end_run():
+    """Stores the active run's samples and rewrites the Prometheus export."""
+    global _run
+    with _lock:
+        if _run is None:
+            return
+        _run["depth"] -= 1
+        if _run["depth"]:
+            return
+        run, _run = _run, None
+    database.finish_metric_run(run["id"], time.perf_counter() - run["started"], run["samples"], config.METRICS_KEEP_RUNS)
+    if config.METRICS_PROMETHEUS_FILE:
+        write_prometheus(config.METRICS_PROMETHEUS_FILE)
+
+def record(stage, seconds=None, prompt_tokens=None, completion_tokens=None, retries=0, error=None):
+    """Adds one sample to the active run; a no-op when no run is active."""
+    with _lock:
+        if _run is not None:
+            _run["samples"].append((stage, seconds, prompt_tokens, completion_tokens, retries, error))
+
+def current_stage():
+    """Returns the stage the calling thread is working on, if any."""
+    return _stage.get()
+
+@contextmanager
+def stage(name):
+    """Times the enclosed block as one sample of stage `name`, recording the error if it raises."""
+    token = _stage.set(name)
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        record(name, time.perf_counter() - start, error=f"{type(e).__name__}: {e}")
+        raise
+    else:
+        record(name, time.perf_counter() - start)
+    finally:
+        _stage.reset(token)
+
+def timed_call(stage_name, function, *args):
+    """
+    Runs function(*args) labelled as stage_name and returns (result, seconds). Meant for pool
+    submissions: the caller records the sample once the future completes, since a process-pool
+    worker has no access to this process's run.
+    """
+    token = _stage.set(stage_name)
+    start = time.perf_counter()
+    try:
+        return function(*args), time.perf_counter() - start
+    finally:
+        _stage.reset(token)
+
+def record_llm_call(seconds, response=None, error=None):
+    """Records one Ollama request under 'llm.<current stage>', with the token counts it reported."""
+    usage = response if response is not None else {}
+    record(f"llm.{current_stage() or 'other'}", seconds,
+           usage.get("prompt_eval_count"), usage.get("eval_count"), error=error)
+
+def _percentile(sorted_values, fraction):
+    # Nearest-rank percentile
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+def summarize(samples):
+    """
+    Aggregates a run's samples per stage: call count, p50/p95/max/total seconds, token totals,
+    retries and errors. Returns {stage: stats}, sorted by stage.
+    """
+    stages = {}
+    for sample in samples:
+        stage_name, seconds, prompt_tokens, completion_tokens, retries, error = tuple(sample)
+        stats = stages.setdefault(stage_name, {"timings": [], "prompt_tokens": 0, "completion_tokens": 0,
+                                               "retries": 0, "errors": 0})
+        if seconds is not None:
+            stats["timings"].append(seconds)
+        stats["prompt_tokens"] += prompt_tokens or 0
+        stats["completion_tokens"] += completion_tokens or 0
+        stats["retries"] += retries or 0
+        stats["errors"] += 1 if error else 0
+    summary = {}
+    for stage_name in sorted(stages):
+        stats = stages[stage_name]
+        timings = sorted(stats.pop("timings"))
+        summary[stage_name] = {
+            "count": len(timings),
+            "p50": _percentile(timings, 0.5) if timings else None,
+            "p95": _percentile(timings, 0.95) if timings else None,
+            "max": timings[-1] if timings else None,
+            "total": sum(timings),
+            **stats,
+        }
+    return summary
+
+def latest_run_summaries():
+    """Returns [(run row, per-stage summary)] for the most recent finished run of each kind."""
+    return [(run, summarize(database.get_run_metrics(run['id']))) for run in database.get_latest_metric_runs()]
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def prometheus_text():
+    """Renders the latest run of each kind in the Prometheus text exposition format."""
+    families = {
+        "recruitflow_last_run_stage_seconds": ("summary", "Wall time of each stage call in the latest run of a kind."),
+        "recruitflow_last_run_prompt_tokens": ("gauge", "Prompt tokens Ollama evaluated per stage in the latest run."),
+        "recruitflow_last_run_completion_tokens": ("gauge", "Tokens Ollama generated per stage in the latest run."),
+        "recruitflow_last_run_retries": ("gauge", "Retries per stage in the latest run."),
+        "recruitflow_last_run_errors": ("gauge", "Failed calls per stage in the latest run."),
+        "recruitflow_last_run_duration_seconds": ("gauge", "Wall time of the latest run of a kind."),
+        "recruitflow_last_run_timestamp_seconds": ("gauge", "Unix time the latest run of a kind started."),
+    }
+    lines = {name: [] for name in families}
+    for run, summary in latest_run_summaries():
+        kind = _label(run['kind'])
+        lines["recruitflow_last_run_duration_seconds"].append(f'recruitflow_last_run_duration_seconds{{kind="{kind}"}} {run["seconds"]}')
+        lines["recruitflow_last_run_timestamp_seconds"].append(f'recruitflow_last_run_timestamp_seconds{{kind="{kind}"}} {run["started_at"]}')
+        for stage_name, stats in summary.items():
+            labels = f'kind="{kind}",stage="{_label(stage_name)}"'
+            name = "recruitflow_last_run_stage_seconds"
+            if stats["count"]:
+                lines[name].append(f'{name}{{{labels},quantile="0.5"}} {stats["p50"]}')
+                lines[name].append(f'{name}{{{labels},quantile="0.95"}} {stats["p95"]}')
+            lines[name].append(f"{name}_sum{{{labels}}} {stats['total']}")
+            lines[name].append(f"{name}_count{{{labels}}} {stats['count']}")
+            for name, key in (("recruitflow_last_run_prompt_tokens", "prompt_tokens"),
+                              ("recruitflow_last_run_completion_tokens", "completion_tokens"),
+                              ("recruitflow_last_run_retries", "retries"),
+                              ("recruitflow_last_run_errors", "errors")):
+                lines[name].append(f"{name}{{{labels}}} {stats[key]}")
+    output = []
+    for name, (metric_type, help_text) in families.items():
+        output += [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"] + lines[name]
+    return "\n".join(output) + "\n"
+
+def write_prometheus(path):
+    """Atomically rewrites the export file, e.g. for node_exporter's textfile collector."""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(temp_path, "w") as f:
+            f.write(prometheus_text())
+        os.replace(temp_path, path)
+    except OSError as e:
+        print(f"Error writing metrics file {path}: {e}")
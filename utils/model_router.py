@@ -0,0 +1,40 @@
+from utils import config
+
+# Which model handles which task. Routine work goes to the per-task model (a small, fast one
+# if configured); results the caller judges low-confidence -- extraction output that isn't
+# valid JSON, scores near MATCH_THRESHOLD -- are redone by OLLAMA_ESCALATION_MODEL. The agents
+# apply the policy and record which model produced each result.
+
+TASK_MODELS = {
+    "jd": config.OLLAMA_JD_MODEL,
+    "extract": config.OLLAMA_EXTRACT_MODEL,
+    "score": config.OLLAMA_SCORE_MODEL,
+}
+
+def model_for(task):
+    """Returns the first-pass model for a task ('jd', 'extract' or 'score')."""
+    return TASK_MODELS.get(task) or config.OLLAMA_MODEL
+
+def escalation_model(task):
+    """Returns the model low-confidence results of a task are redone with, or None if escalation is off."""
+    model = config.OLLAMA_ESCALATION_MODEL
+    return model if model and model != model_for(task) else None
+
+def models_for(task):
+    """Returns the models a task may use, first pass first."""
+    escalation = escalation_model(task)
+    return [model_for(task)] + ([escalation] if escalation else [])
+
+def is_borderline_score(score):
+    """True for a valid score close enough to MATCH_THRESHOLD that the shortlist decision could flip."""
+    return score is not None and score >= 0 and abs(score - config.MATCH_THRESHOLD) <= config.MATCH_ESCALATION_BAND
+
+def scoring_route():
+    """
+    Describes everything about routing that decides a stored score: the models, and with
+    escalation the threshold and band. Part of the scoring fingerprint.
+    """
+    escalation = escalation_model("score")
+    if not escalation:
+        return model_for("score")
+    return f"{model_for('score')}>{escalation}@{config.MATCH_THRESHOLD}±{config.MATCH_ESCALATION_BAND}"
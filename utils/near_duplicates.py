@@ -0,0 +1,79 @@
+import hashlib
+import re
+import numpy as np
+from utils import config, database
+
+# Near-duplicate resume detection with MinHash and LSH banding. Each CV's text becomes a set of
+# word 5-shingles and a NUM_PERM-value MinHash signature, whose matching fraction estimates the
+# Jaccard similarity of two CVs. Signatures are cut into LSH_BANDS bands; CVs sharing any band
+# bucket are compared, so a lookup touches a handful of rows instead of every candidate.
+# Signatures and buckets live in SQLite (cv_signatures, cv_lsh_buckets).
+
+SHINGLE_WORDS = 5
+NUM_PERM = 64
+LSH_BANDS = 8 # 8 bands of 8 rows: CVs with Jaccard similarity above ~0.8 almost always share a bucket
+_ROWS = NUM_PERM // LSH_BANDS
+_PRIME = (1 << 61) - 1
+_random = np.random.RandomState(20240901) # Fixed, so signatures stay comparable across runs
+_A = _random.randint(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_B = _random.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_WORD_REGEX = re.compile(r"\w+")
+
+def signature(text):
+    """Returns the MinHash signature (NUM_PERM uint32 values) of a CV's text."""
+    words = _WORD_REGEX.findall((text or "").lower())
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))}
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little") for shingle in shingles),
+        dtype=np.uint64, count=len(shingles),
+    )
+    # (a * x + b) mod p for every permutation and shingle; a, x < 2^32 so the product fits in 64 bits
+    permuted = (np.outer(hashes, _A) % _PRIME + _B) % _PRIME
+    return (permuted.min(axis=0) & 0xFFFFFFFF).astype(np.uint32)
+
+def similarity(signature_a, signature_b):
+    """Estimated Jaccard similarity of two CVs from their signatures."""
+    return float(np.count_nonzero(signature_a == signature_b)) / NUM_PERM
+
+def band_buckets(signature_values):
+    """Returns the [(band, bucket)] keys a signature is filed under in the LSH index."""
+    return [
+        (band, int.from_bytes(hashlib.blake2b(signature_values[band * _ROWS:(band + 1) * _ROWS].tobytes(),
+                                              digest_size=8).digest(), "little", signed=True))
+        for band in range(LSH_BANDS)
+    ]
+
+def same_person(email, other_email):
+    """CVs with different email addresses are different people, however similar their text."""
+    return not email or not other_email or email.lower() == other_email.lower()
+
+def find_duplicate(signature_values, email=None, threshold=None):
+    """
+    Looks up stored candidates whose CV is a near-duplicate (similarity >= threshold,
+    NEAR_DUP_THRESHOLD by default) and not from a different email address.
+    Returns (candidate_id, similarity) of the closest one, or None.
+    """
+    threshold = config.NEAR_DUP_THRESHOLD if threshold is None else threshold
+    best = None
+    for row in database.find_lsh_candidates(band_buckets(signature_values)):
+        score = similarity(signature_values, np.frombuffer(row['signature'], dtype=np.uint32))
+        if score >= threshold and same_person(email, row['email']) and (best is None or score > best[1]):
+            best = (row['candidate_id'], score)
+    return best
+
+def index_candidate(candidate_id, cv_filename, content_hash, signature_values=None, similarity_score=1.0):
+    """
+    Links a resume file to its candidate, and with a signature (the file the candidate's
+    extraction came from) files the candidate's CV in the LSH index.
+    """
+    buckets = band_buckets(signature_values) if signature_values is not None else None
+    return database.save_candidate_file(candidate_id, cv_filename, content_hash, similarity_score,
+                                        signature_values.tobytes() if signature_values is not None else None, buckets)
+
+def rebuild_index(missing_only=True):
+    """Signs and indexes stored candidates (only those not yet indexed, unless missing_only is False)."""
+    rows = database.get_candidates_for_signing(missing_only)
+    for row in rows:
+        index_candidate(row['id'], row['cv_filename'], None, signature(row['cv_text']))
+    print(f"Indexed {len(rows)} candidate CV(s) for near-duplicate detection.")
+    return len(rows)
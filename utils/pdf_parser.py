@@ -1,11 +1,20 @@
-import pdfplumber
+import hashlib
 import os
 
+def compute_file_hash(pdf_path):
+    """Returns the SHA-256 hex digest of a file's bytes."""
+    sha256 = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
 def extract_text_from_pdf(pdf_path):
     """Extracts text from a PDF file."""
     if not os.path.exists(pdf_path):
         print(f"Error: PDF file not found at {pdf_path}")
         return None
+    import pdfplumber # Deferred: only parsing needs it, hashing and app startup don't
     try:
         with pdfplumber.open(pdf_path) as pdf:
             full_text = ""
@@ -0,0 +1,366 @@
+import os
+import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from utils import config, cv_rules, database, metrics, model_router, near_duplicates, pdf_parser, matcher, prefilter, embedding_index
+from agents import cv_agent
+
+def list_resume_files(folder=None):
+    """Returns the sorted PDF filenames in the resume folder."""
+    folder = folder or config.RESUME_FOLDER
+    return sorted(f for f in os.listdir(folder) if f.lower().endswith(".pdf"))
+
+def _print_issue(level, message):
+    print(f"[{level.upper()}] {message}")
+
+def process_resumes(jd_id, jd_summary, resume_files, folder=None, known_candidates=None,
+                    pdf_workers=None, llm_workers=None, batch_size=None, force_rescore=False,
+                    use_prefilter=None, record_ledger=True, update_embeddings=None, use_near_dup=None,
+                    on_progress=None, on_issue=None):
+    """
+    Parses, extracts, stores and scores the given resumes against a job description.
+
+    Resumes whose bytes hash to a cached entry skip pdfplumber, and skip the CV agent too
+    while the cached extraction matches the current model and prompt version. With use_near_dup
+    (default NEAR_DUP_ENABLED), a CV whose text is a near-duplicate of a stored candidate's --
+    or of another CV in this run -- reuses that candidate's extraction and stored scores
+    instead of reaching the CV agent, and the file is linked to that candidate.
+    known_candidates maps filename -> candidate_id for resumes that were already ingested
+    and only need scoring. With jd_id of None the resumes are ingested but not scored.
+    Candidates whose stored match was scored from identical inputs keep that score
+    without an LLM call, unless force_rescore is set. With the pre-filter on, scoring
+    waits for the whole pool so it can be ranked lexically; only the top candidates
+    reach the LLM and the rest get their pre-filter score stored (keeping any earlier LLM
+    score), and are not sent to the pre-filter again until their inputs change.
+    Stored candidates are also embedded into the semantic candidate index (unless
+    update_embeddings is False, as in sharded workers that must not race on the index files),
+    and with record_ledger each file's outcome is written to the ingestion ledger.
+
+    The work is staged: PDF parsing runs in a process pool, CV extraction and scoring
+    run in a thread pool sized for Ollama's parallel slots (candidates are scored
+    batch_size at a time per LLM call), and every database write
+    happens on the calling thread so SQLite only ever sees a single writer. Each stage call,
+    LLM request and database write is timed into a metrics run (see utils/metrics.py).
+
+    on_progress(done, total, filename) and on_issue(level, message) are always invoked
+    from the calling thread, so they may safely update Streamlit widgets.
+    Returns the number of resumes that were fully processed and matched.
+    """
+    folder = folder or config.RESUME_FOLDER
+    known_candidates = known_candidates or {}
+    pdf_workers = pdf_workers or config.PDF_WORKERS
+    llm_workers = llm_workers or config.LLM_WORKERS
+    batch_size = batch_size or config.MATCH_BATCH_SIZE
+    use_prefilter = config.PREFILTER_ENABLED if use_prefilter is None else use_prefilter
+    update_embeddings = config.EMBEDDINGS_ENABLED if update_embeddings is None else update_embeddings
+    use_near_dup = config.NEAR_DUP_ENABLED if use_near_dup is None else use_near_dup
+    on_issue = on_issue or _print_issue
+    total_files = len(resume_files) + len(known_candidates)
+    finished_count = 0
+    processed_count = 0
+    known_fingerprints = {} if force_rescore or jd_id is None else database.get_match_fingerprints(jd_id)
+    # Candidates an earlier run's pre-filter kept from the LLM stay filtered until their inputs change
+    prefiltered_fingerprints = ({} if force_rescore or jd_id is None or not use_prefilter
+                                else database.get_prefilter_fingerprints(jd_id))
+    content_hashes = {} # filename -> SHA-256 of the PDF bytes
+
+    def finish(filename):
+        nonlocal finished_count
+        finished_count += 1
+        if on_progress:
+            on_progress(finished_count, total_files, filename)
+
+    def record_ingest(filename, status, error=None, candidate_id=None):
+        if not record_ledger:
+            return
+        pdf_path = os.path.join(folder, filename)
+        try:
+            stat = os.stat(pdf_path)
+        except OSError:
+            return # Deleted mid-run; the next scan tombstones it
+        with metrics.stage("db_write"):
+            database.record_ingest_result(pdf_path, stat.st_size, stat.st_mtime, content_hashes.get(filename),
+                                          status, error, candidate_id)
+
+    def fail(filename, level, message):
+        on_issue(level, message)
+        record_ingest(filename, "failed", message)
+        finish(filename)
+
+    def submit_extract(filename, content_hash, cv_text, check_duplicates=True):
+        if use_near_dup and check_duplicates:
+            with metrics.stage("dedup"):
+                signature = near_duplicates.signature(cv_text)
+                email = cv_rules.extract_email(cv_text)
+                duplicate = near_duplicates.find_duplicate(signature, email)
+                buckets = near_duplicates.band_buckets(signature)
+                if not duplicate:
+                    # A copy of a CV still being extracted waits for that extraction
+                    for first in {inflight_buckets[bucket] for bucket in buckets if bucket in inflight_buckets}:
+                        score = near_duplicates.similarity(signature, signed[first][0])
+                        if score >= config.NEAR_DUP_THRESHOLD and near_duplicates.same_person(email, signed[first][1]):
+                            waiting[first].append((filename, content_hash, cv_text, score))
+                            return
+            if duplicate:
+                reuse_candidate(filename, content_hash, cv_text, *duplicate)
+                return
+            signed[filename] = (signature, email, buckets)
+            waiting[filename] = []
+            for bucket in buckets:
+                inflight_buckets.setdefault(bucket, filename)
+        future = llm_pool.submit(metrics.timed_call, "extract", cv_agent.extract_cv_details, cv_text)
+        pending[future] = ("extract", filename, (content_hash, cv_text))
+
+    def release_duplicates(filename, candidate_id):
+        # The extraction of `filename` is over: its waiting copies reuse the candidate, or get their own extraction
+        _, _, buckets = signed.pop(filename, (None, None, []))
+        for bucket in buckets:
+            if inflight_buckets.get(bucket) == filename:
+                del inflight_buckets[bucket]
+        for duplicate_filename, content_hash, cv_text, score in waiting.pop(filename, []):
+            if candidate_id:
+                reuse_candidate(duplicate_filename, content_hash, cv_text, candidate_id, score)
+            else:
+                submit_extract(duplicate_filename, content_hash, cv_text, check_duplicates=False)
+
+    def reuse_candidate(filename, content_hash, cv_text, candidate_id, score):
+        profile = database.get_candidate_profiles([candidate_id]).get(candidate_id)
+        if not profile:
+            submit_extract(filename, content_hash, cv_text, check_duplicates=False)
+            return
+        on_issue("info", f"{filename} is a near-duplicate ({score:.0%}) of the CV of candidate {candidate_id}; reusing its extraction.")
+        with metrics.stage("db_write"):
+            near_duplicates.index_candidate(candidate_id, filename, content_hash, similarity_score=score)
+        record_ingest(filename, "done", None, candidate_id)
+        queue_for_scoring(filename, candidate_id, profile)
+
+    def store_candidate(filename, cv_text, extracted_data, from_cache=False):
+        """
+        Stores, indexes and queues a candidate for scoring. Returns its ID if the extraction was
+        complete (so near-duplicates may reuse it), otherwise None.
+        """
+        if not extracted_data.get('email'):
+            # We need email to uniquely identify and contact candidate
+            fail(filename, "warning", f"Could not extract email for {filename}. Skipping match.")
+            return None
+
+        with metrics.stage("db_write"):
+            candidate_id = database.add_candidate(
+                name=extracted_data.get('name'),
+                email=extracted_data['email'],
+                phone=extracted_data.get('phone'),
+                cv_filename=filename,
+                cv_text=cv_text,
+                skills=extracted_data.get('skills'),
+                experience=extracted_data.get('experience'),
+                education=extracted_data.get('education'),
+                extraction_model=extracted_data.get('model')
+            )
+        if not candidate_id:
+            fail(filename, "error", f"Failed to add/update candidate {extracted_data['email']} from {filename} to DB.")
+            return None
+        if extracted_data.get("error"):
+            # Stored with partial data, but marked failed so the next run retries the extraction
+            record_ingest(filename, "failed", extracted_data["error"], candidate_id)
+        else:
+            record_ingest(filename, "done", None, candidate_id)
+        if use_near_dup:
+            # Only complete extractions are offered to later near-duplicates
+            signature = None
+            if not extracted_data.get("error"):
+                signature = signed[filename][0] if filename in signed else near_duplicates.signature(cv_text)
+            with metrics.stage("db_write"):
+                near_duplicates.index_candidate(candidate_id, filename, content_hashes.get(filename), signature)
+        if update_embeddings and not (from_cache and candidate_id in candidate_index):
+            future = llm_pool.submit(metrics.timed_call, "embed", embedding_index.embed_text,
+                                     embedding_index.candidate_text(extracted_data))
+            pending[future] = ("embed", filename, candidate_id)
+        queue_for_scoring(filename, candidate_id, extracted_data)
+        return candidate_id if not extracted_data.get("error") else None
+
+    def queue_for_scoring(filename, candidate_id, extracted_data):
+        nonlocal processed_count
+        if jd_id is None:
+            processed_count += 1
+            finish(filename)
+            return
+        pool[candidate_id] = extracted_data
+        fingerprint = matcher.score_fingerprint(jd_summary, extracted_data)
+        if fingerprint in (known_fingerprints.get(candidate_id), prefiltered_fingerprints.get(candidate_id)):
+            # Same JD summary, profile, model and prompt as the stored score (or pre-filter verdict) -> nothing to redo
+            processed_count += 1
+            finish(filename)
+            return
+        # Queue for batch scoring; a later file with the same email replaces the earlier profile
+        filenames = to_score.pop(candidate_id, (None, None, []))[2]
+        to_score[candidate_id] = (extracted_data, fingerprint, filenames + [filename])
+        if not use_prefilter and len(to_score) >= batch_size:
+            submit_score_batch(list(to_score))
+
+    def apply_prefilter():
+        # Rank everyone seen this run, but only queued candidates can be filtered out
+        nonlocal processed_count
+        scores, selected = prefilter.rank_candidates(jd_summary, pool)
+        prefilter_scores.update(scores)
+        filtered_ids = [candidate_id for candidate_id in to_score if candidate_id not in selected]
+        fingerprints = {candidate_id: to_score[candidate_id][1] for candidate_id in filtered_ids}
+        filtered = {candidate_id: to_score.pop(candidate_id)[2] for candidate_id in filtered_ids}
+        with metrics.stage("db_write"):
+            saved = database.add_prefiltered_matches_bulk(
+                (jd_id, candidate_id, scores[candidate_id], fingerprints[candidate_id]) for candidate_id in filtered
+            )
+        if saved:
+            processed_count += sum(len(filenames) for filenames in filtered.values())
+        else:
+            on_issue("error", f"Failed to save pre-filtered matches for JD {jd_id}")
+        for filenames in filtered.values():
+            for filename in filenames:
+                finish(filename)
+        on_issue("info", f"Pre-filter sent {len(to_score)} of {len(to_score) + len(filtered_ids)} candidates to the LLM matcher.")
+
+    def submit_score_batch(candidate_ids):
+        batch = {candidate_id: to_score.pop(candidate_id) for candidate_id in candidate_ids}
+        future = llm_pool.submit(
+            metrics.timed_call, "score", matcher.score_candidates,
+            jd_summary,
+            {candidate_id: extracted_data for candidate_id, (extracted_data, _, _) in batch.items()},
+            batch_size
+        )
+        pending[future] = ("score", None, batch)
+
+    # A single parsing process gains nothing over a thread and avoids process start-up cost
+    pdf_pool = ProcessPoolExecutor(max_workers=pdf_workers) if pdf_workers > 1 else ThreadPoolExecutor(max_workers=1)
+    llm_pool = ThreadPoolExecutor(max_workers=llm_workers)
+    metrics.begin_run("ingest", jd_id) # Stage timings and LLM token counts, stored when the run ends
+    pending = {} # future -> (stage, filename, payload carried to the next stage)
+    to_score = {} # candidate_id -> (extracted_data, fingerprint, filenames), waiting for a scoring batch
+    pool = {} # candidate_id -> extracted_data for every candidate seen this run
+    signed = {} # filename -> (MinHash signature, email, LSH buckets) of CVs sent to the CV agent
+    inflight_buckets = {} # LSH bucket -> filename whose extraction is pending, for duplicates within this run
+    waiting = {} # filename being extracted -> [(filename, content_hash, cv_text, similarity)] of its copies
+    prefilter_scores = {}
+    candidate_index = embedding_index.get_index("candidates") if update_embeddings else None
+    new_embeddings = [] # (candidate_id, vector), written to the index once the run is over
+    try:
+        for filename in resume_files:
+            future = pdf_pool.submit(metrics.timed_call, "hash", pdf_parser.compute_file_hash, os.path.join(folder, filename))
+            pending[future] = ("hash", filename, None)
+
+        # Already-ingested resumes go straight to scoring with their stored profile
+        profiles = database.get_candidate_profiles(set(known_candidates.values()))
+        for filename, candidate_id in known_candidates.items():
+            if candidate_id in profiles:
+                queue_for_scoring(filename, candidate_id, profiles[candidate_id])
+            else:
+                on_issue("warning", f"Candidate for {filename} is no longer in the database. Skipping.")
+                finish(filename)
+
+        while pending or to_score:
+            if not pending:
+                # Ingestion is over: pre-rank the pool if enabled, then score whatever is still queued
+                if use_prefilter:
+                    apply_prefilter()
+                queued_ids = list(to_score)
+                for start in range(0, len(queued_ids), batch_size):
+                    submit_score_batch(queued_ids[start:start + batch_size])
+                if not pending:
+                    continue
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, filename, payload = pending.pop(future)
+                try:
+                    result, seconds = future.result()
+                except Exception as e:
+                    metrics.record(stage, error=f"{type(e).__name__}: {e}")
+                    if stage == "score":
+                        on_issue("error", f"Unexpected error while scoring a batch: {e}")
+                        for _, _, filenames in payload.values():
+                            for batch_filename in filenames:
+                                finish(batch_filename)
+                    elif stage == "embed":
+                        on_issue("warning", f"Could not embed {filename} for semantic search: {e}")
+                    else:
+                        fail(filename, "error", f"Unexpected error during {stage} of {filename}: {e}")
+                        if stage == "extract":
+                            release_duplicates(filename, None)
+                    continue
+                # CV extraction reports failure in its result rather than by raising
+                metrics.record(stage, seconds, error=result.get("error") if stage == "extract" else None)
+
+                # a. File hashed -> reuse cached text/extraction, or parse the PDF
+                if stage == "hash":
+                    content_hash = content_hashes[filename] = result
+                    cached = database.get_cached_resume(content_hash)
+                    if not cached:
+                        future = pdf_pool.submit(metrics.timed_call, "parse", pdf_parser.extract_text_from_pdf,
+                                                 os.path.join(folder, filename))
+                        pending[future] = ("parse", filename, content_hash)
+                    elif (cached['extracted_data']
+                          and cached['extraction_model'] in model_router.models_for("extract")
+                          and cached['extraction_prompt_version'] == cv_agent.PROMPT_VERSION):
+                        store_candidate(filename, cached['cv_text'],
+                                        {**json.loads(cached['extracted_data']), "model": cached['extraction_model']},
+                                        from_cache=True)
+                    else:
+                        submit_extract(filename, content_hash, cached['cv_text'])
+
+                # b. PDF parsed -> cache the text and hand it to the CV agent
+                elif stage == "parse":
+                    content_hash, cv_text = payload, result
+                    if not cv_text:
+                        fail(filename, "warning", f"Could not extract text from {filename}. Skipping.")
+                        continue
+                    with metrics.stage("db_write"):
+                        database.cache_resume_text(content_hash, cv_text)
+                    submit_extract(filename, content_hash, cv_text)
+
+                # c. CV details extracted -> cache them, store the candidate, then score
+                elif stage == "extract":
+                    (content_hash, cv_text), extracted_data = payload, result
+                    if extracted_data.get("prompt_dropped"):
+                        dropped = ", ".join(f"{section} (~{tokens} tokens)" for section, tokens in extracted_data["prompt_dropped"].items())
+                        on_issue("info", f"{filename} was over the CV prompt budget; left out of extraction: {dropped}")
+                    if extracted_data.get("error"):
+                        on_issue("warning", f"CV Parsing Error for {filename}: {extracted_data['error']}")
+                        # Continue processing but may lack some data
+                    else:
+                        with metrics.stage("db_write"):
+                            database.cache_resume_extraction(content_hash, extracted_data,
+                                                             extracted_data.get("model") or model_router.model_for("extract"),
+                                                             cv_agent.PROMPT_VERSION)
+                    release_duplicates(filename, store_candidate(filename, cv_text, extracted_data))
+
+                # Embedding computed -> keep it for the semantic index (not part of per-file progress)
+                elif stage == "embed":
+                    if result is not None:
+                        new_embeddings.append((payload, result))
+
+                # d. Batch scored -> shortlist and store the batch's matches in one transaction
+                elif stage == "score":
+                    match_rows, saved_filenames = [], []
+                    for candidate_id, (extracted_data, fingerprint, filenames) in payload.items():
+                        score, score_model = result.get(candidate_id, (-1, None))
+                        if score == -1:
+                            on_issue("warning", f"Could not calculate match score for {', '.join(filenames)}. Skipping match.")
+                            continue
+                        is_shortlisted = score >= config.MATCH_THRESHOLD
+                        match_rows.append((jd_id, candidate_id, score, is_shortlisted, fingerprint,
+                                           prefilter_scores.get(candidate_id), score_model))
+                        saved_filenames += filenames
+                    with metrics.stage("db_write"):
+                        saved = database.add_matches_bulk(match_rows)
+                    if saved:
+                        processed_count += len(saved_filenames)
+                    else:
+                        on_issue("error", f"Failed to save {len(match_rows)} matches for JD {jd_id}")
+                    for _, _, filenames in payload.values():
+                        for batch_filename in filenames:
+                            finish(batch_filename)
+        if new_embeddings:
+            with metrics.stage("index_write"):
+                candidate_index.upsert_many(new_embeddings)
+    finally:
+        pdf_pool.shutdown(cancel_futures=True)
+        llm_pool.shutdown(cancel_futures=True)
+        metrics.end_run()
+
+    return processed_count
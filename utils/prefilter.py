@@ -0,0 +1,78 @@
+import re
+import numpy as np
+from scipy import sparse
+from utils.config import PREFILTER_TOP_K, PREFILTER_MIN_SCORE
+
+# Words that carry no signal about fit, including the headings jd_agent puts in every summary
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is", "it",
+    "of", "on", "or", "the", "to", "with", "will", "years", "year", "experience", "key", "required",
+    "responsibilities", "skills", "qualifications", "candidate", "education", "n/a", "none",
+}
+
+TOKEN_REGEX = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9+#]+)*") # Keeps c++, c#, node.js, asp.net
+
+def tokenize(text):
+    """Lower-cases text and splits it into searchable terms, dropping stop words."""
+    if not text:
+        return []
+    return [token for token in TOKEN_REGEX.findall(text.lower()) if token not in STOP_WORDS]
+
+def candidate_document(candidate_data):
+    """Builds the text the pre-filter indexes for a candidate."""
+    return " ".join(str(candidate_data.get(field) or "") for field in ("skills", "experience", "education"))
+
+def bm25_scores(query_text, documents, k1=1.5, b=0.75):
+    """
+    Scores every document against the query with Okapi BM25.
+    The corpus is held as a sparse documents x vocabulary term-frequency matrix,
+    so scoring the whole pool is a handful of vectorized operations.
+    Returns a float array aligned with documents.
+    """
+    scores = np.zeros(len(documents))
+    if not documents:
+        return scores
+
+    vocabulary = {}
+    rows, cols = [], []
+    doc_lengths = np.zeros(len(documents))
+    for row, document in enumerate(documents):
+        tokens = tokenize(document)
+        doc_lengths[row] = len(tokens)
+        for token in tokens:
+            rows.append(row)
+            cols.append(vocabulary.setdefault(token, len(vocabulary)))
+    query_cols = sorted({vocabulary[token] for token in tokenize(query_text) if token in vocabulary})
+    if not query_cols:
+        return scores
+
+    # Duplicate (row, col) entries are summed, giving raw term frequencies
+    tf = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(documents), len(vocabulary)))
+    doc_freq = np.bincount(tf.indices, minlength=len(vocabulary))
+    idf = np.log(1 + (len(documents) - doc_freq + 0.5) / (doc_freq + 0.5))
+
+    query_tf = tf[:, query_cols].tocoo()
+    avg_length = doc_lengths.mean() or 1.0
+    length_norm = k1 * (1 - b + b * doc_lengths[query_tf.row] / avg_length)
+    weights = idf[query_cols][query_tf.col] * query_tf.data * (k1 + 1) / (query_tf.data + length_norm)
+    np.add.at(scores, query_tf.row, weights)
+    return scores
+
+def rank_candidates(jd_summary, candidates, top_k=None, min_score=None):
+    """
+    Lexically ranks candidates against a JD summary before any LLM scoring.
+    candidates maps candidate_id -> candidate_data. Returns ({candidate_id: prefilter_score},
+    set of candidate_ids to send to the LLM): those scoring above min_score, capped at the
+    top_k best (top_k of 0 means no cap).
+    """
+    top_k = PREFILTER_TOP_K if top_k is None else top_k
+    min_score = PREFILTER_MIN_SCORE if min_score is None else min_score
+    candidate_ids = list(candidates)
+    scores = bm25_scores(jd_summary, [candidate_document(candidates[cid]) for cid in candidate_ids])
+
+    order = np.argsort(-scores, kind="stable")
+    order = order[scores[order] > min_score]
+    if top_k:
+        order = order[:top_k]
+    prefilter_scores = {cid: round(float(score), 3) for cid, score in zip(candidate_ids, scores)}
+    return prefilter_scores, {candidate_ids[i] for i in order}
@@ -0,0 +1,143 @@
+import re
+from utils import cv_rules
+
+# Bounds how much CV text goes into an extraction prompt. Long academic CVs and PDFs with
+# duplicated text layers would otherwise overflow the model's context window (Ollama then
+# silently drops the start of the prompt) and make per-CV latency unpredictable. Text is
+# first cleaned of page furniture; only if it is over budget are repeated long lines dropped
+# too, then sections are packed by how much they tell the extraction prompt, and what was
+# cut is reported.
+
+CHARS_PER_TOKEN = 4 # Rough size estimate for llama-style tokenizers on English text
+REPEATED_LINE_MIN = 3 # A short line seen verbatim this often is a running header or footer...
+PAGE_MIN_LINES = 20 # ...if its repeats are at least this many lines apart, as on successive pages...
+PAGE_GAP_SPREAD = 1.5 # ...and evenly spaced: the widest gap is at most this times the narrowest
+REPEATED_LINE_MAX_CHARS = 80
+DUPLICATE_LINE_MIN_CHARS = 12 # Over budget, lines at least this long repeated verbatim (e.g. a duplicated text layer) are dropped
+MIN_SECTION_TOKENS = 16 # A section that would get less than this is dropped rather than cut to a stub
+PAGE_NUMBER_REGEX = re.compile(r"^(?:page\s*)?\d{1,3}(?:\s*(?:of|/)\s*\d{1,3})?$", re.I)
+# A page marker inside a line ("Jane Doe - CV - Page 3", "... 3/5"); such a line repeating at all is a footer
+PAGE_MARKER_REGEX = re.compile(r"\bpage\s*\d{1,3}(?:\s*(?:of|/)\s*\d{1,3})?\b|(?:^|\s)\d{1,3}\s*(?:of|/)\s*\d{1,3}$", re.I)
+
+# Share of the budget each section may claim when not everything fits (relative weights)
+SECTION_WEIGHTS = {
+    "header": 1, "summary": 1, "skills": 3, "experience": 3, "education": 2,
+    "projects": 1, "certifications": 1, "other": 0.5,
+}
+
+def estimate_tokens(text):
+    """Estimates the number of tokens in text."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN if text else 0
+
+def _shape(line):
+    """The line normalized for spotting repeats; only a page marker is generalized, other digits count."""
+    return PAGE_MARKER_REGEX.sub(" #", " ".join(line.lower().split())).strip()
+
+def _is_running(shape, indexes, marked):
+    """True if a line recurring at `indexes` is a running header or footer."""
+    if len(shape) > REPEATED_LINE_MAX_CHARS:
+        return False
+    if marked:
+        return len(indexes) >= 2
+    gaps = [b - a for a, b in zip(indexes, indexes[1:])]
+    return (len(indexes) >= REPEATED_LINE_MIN and min(gaps) >= PAGE_MIN_LINES
+            and max(gaps) <= min(gaps) * PAGE_GAP_SPREAD)
+
+def strip_boilerplate(text, drop_duplicates=False):
+    """
+    Removes page numbers and running headers/footers, keeping the first: short lines with a page
+    marker that recur (e.g. "Jane Doe - CV - Page 3"), or that recur verbatim at page-like,
+    evenly spaced intervals. Collapses blank runs. With drop_duplicates, later copies
+    of long lines are removed as well; a CV can legitimately repeat one (the same bullet under
+    two roles), so that is left for when the text does not fit.
+    Returns (cleaned text, number of lines removed).
+    """
+    lines = (text or "").splitlines()
+    positions, marked = {}, set()
+    for index, line in enumerate(lines):
+        shape = _shape(line)
+        positions.setdefault(shape, []).append(index)
+        if PAGE_MARKER_REGEX.search(line):
+            marked.add(shape)
+    running_shapes = {shape for shape, indexes in positions.items() if _is_running(shape, indexes, shape in marked)}
+    kept, seen_shapes, seen_lines, removed = [], set(), set(), 0
+    for line in lines:
+        stripped = line.strip()
+        if not stripped:
+            if kept and kept[-1]:
+                kept.append("")
+            continue
+        shape, normalized = _shape(stripped), " ".join(stripped.lower().split())
+        if (PAGE_NUMBER_REGEX.match(stripped)
+                or (shape in running_shapes and shape in seen_shapes)
+                or (drop_duplicates and len(normalized) >= DUPLICATE_LINE_MIN_CHARS and normalized in seen_lines)):
+            removed += 1
+            continue
+        seen_shapes.add(shape)
+        seen_lines.add(normalized)
+        kept.append(stripped)
+    return "\n".join(kept).strip(), removed
+
+def _allocate(sizes, budget):
+    """Splits budget across sections by weight; sections smaller than their share get all they need."""
+    allocation, remaining, open_sections = {}, budget, dict(sizes)
+    while open_sections:
+        total_weight = sum(SECTION_WEIGHTS.get(section, 0.5) for section in open_sections)
+        fitting = [section for section, size in open_sections.items()
+                   if size <= remaining * SECTION_WEIGHTS.get(section, 0.5) / total_weight]
+        if not fitting:
+            for section in open_sections:
+                allocation[section] = int(remaining * SECTION_WEIGHTS.get(section, 0.5) / total_weight)
+            break
+        for section in fitting:
+            allocation[section] = open_sections.pop(section)
+            remaining -= allocation[section]
+    return allocation
+
+def _truncate(text, tokens):
+    """Keeps whole lines from the start of text up to about `tokens` tokens."""
+    limit = tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    kept, used = [], 0
+    for line in text.splitlines():
+        if used + len(line) > limit:
+            if not kept:
+                kept.append(line[:limit])
+            break
+        kept.append(line)
+        used += len(line) + 1
+    return "\n".join(kept)
+
+def fit_cv_text(cv_text, budget):
+    """
+    Cleans cv_text and, if it is still over `budget` tokens (0 = unlimited), drops repeated long
+    lines and packs its sections into the budget in document order, cutting each from the end.
+    Returns (text for the prompt, report) where report has 'tokens' (before), 'packed_tokens',
+    'boilerplate_lines' removed and 'dropped': {section: tokens cut}.
+    """
+    text, removed = strip_boilerplate(cv_text)
+    if budget and estimate_tokens(text) > budget:
+        text, removed = strip_boilerplate(cv_text, drop_duplicates=True)
+    report = {"tokens": estimate_tokens(cv_text), "packed_tokens": estimate_tokens(text),
+              "boilerplate_lines": removed, "dropped": {}}
+    if not budget or report["packed_tokens"] <= budget:
+        return text, report
+
+    sections = cv_rules.find_sections(text)
+    # Each packed section gets its heading back; reserve room for them
+    headings = {section: "" if section == "header" else f"{section.title()}:" for section in sections}
+    overhead = sum(estimate_tokens(heading) + 1 for heading in headings.values())
+    sizes = {section: estimate_tokens(body) for section, body in sections.items() if body}
+    allocation = _allocate(sizes, max(budget - overhead, 0))
+    parts = []
+    for section, body in sections.items():
+        share = allocation.get(section, 0)
+        packed = _truncate(body, share) if share >= MIN_SECTION_TOKENS or share >= sizes.get(section, 0) else ""
+        if sizes.get(section, 0) > estimate_tokens(packed):
+            report["dropped"][section] = sizes[section] - estimate_tokens(packed)
+        if packed:
+            parts.append(f"{headings[section]}\n{packed}" if headings[section] else packed)
+    text = "\n\n".join(parts)
+    report["packed_tokens"] = estimate_tokens(text)
+    return text, report
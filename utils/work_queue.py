@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+from utils import config, database, ingest, llm_client, pipeline
+from utils.jobs import default_worker_id
+
+# Sharded ingestion: a folder is split into one (file, JD) task per resume in the work_tasks
+# table, and any number of worker processes lease batches of tasks, run them through the
+# pipeline against their own Ollama host and record the outcome. The SQLite file stays on the
+# machine that runs the workers (SQLite locking is not safe over network filesystems); the
+# model hosts are the remote part, so throughput grows with the number of Ollama servers.
+
+def enqueue_folder(jd_id=None, folder=None):
+    """
+    Queues a task for every resume in the folder that needs work: new, modified or previously
+    failed files, plus (when scoring against a JD) the already-ingested ones.
+    Returns (scan result, number of tasks queued).
+    """
+    folder = os.path.abspath(folder or config.RESUME_FOLDER)
+    scan = ingest.scan_folder(folder)
+    filenames = scan["to_process"] + (list(scan["unchanged"]) if jd_id is not None else [])
+    queued = database.enqueue_work_tasks(jd_id, [os.path.join(folder, filename) for filename in filenames])
+    return scan, queued
+
+def _renew_leases(worker_id, task_ids, stop):
+    # Keeps the batch leased through long LLM calls; a crashed worker stops renewing and its tasks expire
+    while not stop.wait(config.WORK_HEARTBEAT_INTERVAL):
+        owned = database.extend_work_leases(worker_id, task_ids, config.WORK_LEASE_SECONDS)
+        if owned < len(task_ids):
+            print(f"Worker {worker_id} lost the lease on {len(task_ids) - owned} task(s); their results will be ignored.")
+    database.close_db_connection()
+
+def _run_folder(jd_id, jd_summary, folder, tasks, pipeline_options):
+    """Runs one folder's tasks through the pipeline and returns (done_ids, [(task_id, error)])."""
+    entries = database.get_ledger_entries(folder)
+    resume_files, known_candidates, errors = [], {}, {}
+    for task in tasks:
+        filename = os.path.basename(task['path'])
+        try:
+            stat = os.stat(task['path'])
+        except OSError:
+            errors[task['id']] = "File no longer exists."
+            continue
+        entry = entries.get(task['path'])
+        if (jd_id is not None and entry and entry['status'] == 'done' and entry['candidate_id']
+                and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime):
+            known_candidates[filename] = entry['candidate_id'] # Ingested already, only needs scoring
+        else:
+            resume_files.append(filename)
+
+    # Per-file pipeline issues are only printed; the outcome is read back from the ledger and matches
+    pipeline.process_resumes(
+        jd_id, jd_summary, resume_files, folder=folder, known_candidates=known_candidates,
+        use_prefilter=False, update_embeddings=False, **pipeline_options
+    )
+    entries = database.get_ledger_entries(folder)
+    scored = database.get_match_fingerprints(jd_id) if jd_id is not None else {}
+    done_ids, failed = [], []
+    for task in tasks:
+        entry = entries.get(task['path'])
+        if task['id'] in errors:
+            failed.append((task['id'], errors[task['id']]))
+        elif not entry or entry['status'] != 'done':
+            failed.append((task['id'], (entry['error'] if entry else None) or "Resume could not be ingested."))
+        elif jd_id is not None and entry['candidate_id'] not in scored:
+            failed.append((task['id'], "Candidate could not be scored."))
+        else:
+            done_ids.append(task['id'])
+    return done_ids, failed
+
+def process_tasks(worker_id, batch_size=None, **pipeline_options):
+    """
+    Leases one batch of due tasks (all for the same JD), processes them and records each task
+    as done, queued again, or failed once it has used WORK_MAX_ATTEMPTS claims.
+    Returns the number of tasks claimed.
+    """
+    tasks = database.claim_work_tasks(worker_id, batch_size or config.WORK_BATCH_SIZE,
+                                      config.WORK_LEASE_SECONDS, config.WORK_MAX_ATTEMPTS)
+    if not tasks:
+        return 0
+    jd_id = tasks[0]['jd_id']
+    task_ids = [task['id'] for task in tasks]
+    jd_summary = database.get_jd_summary(jd_id) if jd_id is not None else None
+    if jd_id is not None and not jd_summary:
+        database.finish_work_tasks(worker_id, [], [], [(task_id, f"Job description {jd_id} has no summary.")
+                                                       for task_id in task_ids])
+        return len(tasks)
+
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_renew_leases, args=(worker_id, task_ids, stop), daemon=True)
+    heartbeat.start()
+    done_ids, retries, failures = [], [], []
+    attempts = {task['id']: task['attempts'] for task in tasks}
+    try:
+        by_folder = {}
+        for task in tasks:
+            by_folder.setdefault(os.path.dirname(task['path']), []).append(task)
+        for folder, folder_tasks in by_folder.items():
+            try:
+                folder_done, folder_failed = _run_folder(jd_id, jd_summary, folder, folder_tasks, pipeline_options)
+            except Exception as e:
+                folder_done, folder_failed = [], [(task['id'], f"{type(e).__name__}: {e}") for task in folder_tasks]
+            done_ids += folder_done
+            for task_id, error in folder_failed:
+                (failures if attempts[task_id] >= config.WORK_MAX_ATTEMPTS else retries).append((task_id, error))
+    finally:
+        stop.set()
+        heartbeat.join()
+    database.finish_work_tasks(worker_id, done_ids, retries, failures)
+    print(f"Worker {worker_id}: {len(done_ids)} done, {len(retries)} to retry, {len(failures)} failed "
+          f"(JD {jd_id}, Ollama at {llm_client.OLLAMA_BASE_URL}).")
+    return len(tasks)
+
+def run_task_worker(worker_id=None, ollama_url=None, batch_size=None, poll_interval=None, drain=False,
+                    **pipeline_options):
+    """
+    Leases and processes task batches until interrupted, sending LLM calls to ollama_url
+    (default OLLAMA_BASE_URL). With drain, returns once no task is due instead of waiting for more.
+    """
+    worker_id = worker_id or default_worker_id()
+    if ollama_url:
+        llm_client.set_base_url(ollama_url)
+    poll_interval = config.WORK_POLL_INTERVAL if poll_interval is None else poll_interval
+    print(f"Task worker {worker_id} using Ollama at {llm_client.OLLAMA_BASE_URL}, "
+          f"polling every {poll_interval}s (Ctrl+C to stop)...")
+    try:
+        while True:
+            if process_tasks(worker_id, batch_size, **pipeline_options):
+                continue
+            if drain:
+                return
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        print(f"Stopped task worker {worker_id}.")